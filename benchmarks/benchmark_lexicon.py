@@ -0,0 +1,102 @@
+"""
+Module name: benchmark_lexicon.py
+Author: Michele Grieco
+Description:
+    Benchmark of the fallback sentiment analysis against the size of the lexicon. For each size a synthetic
+    lexicon (one term in five being a prefix term) is written to a temporary TSV file and compiled by
+    LexiconSentimentEngine, then a batch of synthetic texts is scored with the original substring scan
+    (one "word in text" test per lexicon term) and with the compiled engine. The substring scan grows
+    linearly with the lexicon, the compiled trie does not.
+Usage:
+    python -m benchmarks.benchmark_lexicon
+    python -m benchmarks.benchmark_lexicon --sizes 1000 50000 --texts 500
+"""
+
+import argparse
+import logging
+import os
+import random
+import string
+import tempfile
+import time
+from tools.lexicon import LexiconSentimentEngine
+
+
+def make_lexicon(rng: random.Random, size: int) -> dict:
+    """
+    Build a synthetic lexicon of random words with weights between -1 and 1.
+    """
+    lexicon = {}
+    while len(lexicon) < size:
+        term = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12)))
+        if len(lexicon) % 5 == 0:
+            term += '*'
+        lexicon[term] = round(rng.uniform(-1.0, 1.0), 2) or 0.5
+    return lexicon
+
+
+def make_texts(rng: random.Random, lexicon: dict, count: int, words: int) -> list:
+    """
+    Build texts where one word in twenty comes from the lexicon.
+    """
+    terms = [term.rstrip('*') for term in lexicon]
+    filler = ["enel", "energia", "rete", "bolletta", "clienti", "piano", "mercato", "governo", "non"]
+    return [
+        ' '.join(rng.choice(terms) if rng.random() < 0.05 else rng.choice(filler) for _ in range(words))
+        for _ in range(count)
+    ]
+
+
+def substring_scan(lexicon: dict, texts: list) -> list:
+    """
+    The original fallback: a substring test per positive and negative term.
+    """
+    positive = [term.rstrip('*') for term, weight in lexicon.items() if weight > 0]
+    negative = [term.rstrip('*') for term, weight in lexicon.items() if weight < 0]
+    scores = []
+    for text in texts:
+        text = text.lower()
+        positive_count = sum(1 for word in positive if word in text)
+        negative_count = sum(1 for word in negative if word in text)
+        total = positive_count + negative_count
+        scores.append((positive_count - negative_count) / total if total else 0.0)
+    return scores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark substring vs compiled lexicon sentiment scoring')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000, 50000])
+    parser.add_argument('--texts', type=int, default=200, help='Texts scored per lexicon size')
+    parser.add_argument('--words', type=int, default=400, help='Words per text')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    rng = random.Random(42)
+
+    print(f"{'terms':>8} {'compile_s':>10} {'substring_s':>12} {'engine_s':>10} {'speedup':>8} {'texts/s':>10}")
+    for size in args.sizes:
+        lexicon = make_lexicon(rng, size)
+        texts = make_texts(rng, lexicon, args.texts, args.words)
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False, encoding='utf-8') as f:
+            f.writelines(f"{term}\t{weight}\n" for term, weight in lexicon.items())
+        try:
+            start = time.perf_counter()
+            engine = LexiconSentimentEngine(f.name)
+            compile_time = time.perf_counter() - start
+        finally:
+            os.remove(f.name)
+
+        start = time.perf_counter()
+        substring_scan(lexicon, texts)
+        substring_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        engine.score_batch(texts)
+        engine_time = time.perf_counter() - start
+
+        print(f"{size:>8} {compile_time:>10.3f} {substring_time:>12.3f} {engine_time:>10.3f} "
+              f"{substring_time / engine_time:>8.1f} {len(texts) / engine_time:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
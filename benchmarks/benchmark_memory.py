@@ -0,0 +1,134 @@
+"""
+Module name: benchmark_memory.py
+Author: Michele Grieco
+Description:
+    Memory benchmark for the article representation. It pushes synthetic articles through the shape of
+    the analysis pipeline (collection, preprocessing, mention extraction, scoring) in two modes:
+      - legacy: a fully collected list of dicts whose raw and processed text stays alive until the end
+      - streaming: Article records streamed one at a time and released right after analysis
+    Each mode runs in a fresh process and reports peak RSS growth, the tracemalloc peak and the bytes
+    retained per article after processing. The NLP models are not loaded, so the numbers isolate the
+    cost of the representation itself.
+Usage:
+    python -m benchmarks.benchmark_memory
+    python -m benchmarks.benchmark_memory --sizes 1000 10000 --content-bytes 12000
+"""
+
+import argparse
+import multiprocessing
+import random
+import resource
+import sys
+import tracemalloc
+from tools.article import Article
+
+WORDS = ["enel", "energia", "rete", "bolletta", "clienti", "investimenti", "piano", "mercato",
+         "governo", "rinnovabili", "utili", "titolo", "borsa", "sindacati", "sciopero", "tariffe"]
+
+
+def make_text(rng: random.Random, size: int) -> str:
+    """
+    Build a pseudo-article of roughly the given size.
+    """
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def make_raw(rng: random.Random, index: int, content_bytes: int) -> dict:
+    """
+    Build the raw fields of a collected article.
+    """
+    return {
+        'title': f"Enel notizia numero {index}",
+        'link': f"https://example.com/articolo/{index}",
+        'published': "Mon, 13 Oct 2025 07:00:00 GMT",
+        'summary': make_text(rng, 300),
+        'content': make_text(rng, rng.randint(content_bytes // 2, content_bytes * 3 // 2)),
+        'date': "2025-10-13 08:00:00"
+    }
+
+
+def analyze(processed: str) -> tuple:
+    """
+    Stand-in for NER and sentiment: three mention contexts and a score.
+    """
+    mentions = [{'text': 'Enel', 'context': processed[i * 100:i * 100 + 110], 'type': 'ORG'} for i in range(3)]
+    return mentions, (len(processed) % 200) / 100.0 - 1.0
+
+
+def run_legacy(size: int, content_bytes: int) -> list:
+    rng = random.Random(0)
+    articles = [make_raw(rng, i, content_bytes) for i in range(size)]
+    for article in articles:
+        article['processed_content'] = article['content'].upper()
+        article['processed_title'] = article['title'].upper()
+        article['company_mentions'], article['sentiment_score'] = analyze(article['processed_content'])
+    return articles
+
+
+def run_streaming(size: int, content_bytes: int) -> list:
+    rng = random.Random(0)
+
+    def stream():
+        for i in range(size):
+            yield Article(**make_raw(rng, i, content_bytes))
+
+    relevant = []
+    for article in stream():
+        article.processed_content = article.content.upper()
+        article.processed_title = article.title.upper()
+        article.company_mentions, article.sentiment_score = analyze(article.processed_content)
+        article.release_raw()
+        relevant.append(article)
+    return relevant
+
+
+MODES = {'legacy': run_legacy, 'streaming': run_streaming}
+
+
+def measure(mode: str, size: int, content_bytes: int, results: multiprocessing.Queue) -> None:
+    """
+    Run one mode in the current (fresh) process and report its memory usage.
+    """
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is in KiB on Linux, bytes on macOS
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    tracemalloc.start()
+    articles = MODES[mode](size, content_bytes)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    results.put({
+        'mode': mode,
+        'articles': len(articles),
+        'peak_rss_mb': (peak_rss - baseline_rss) / 2 ** 20,
+        'traced_peak_mb': peak / 2 ** 20,
+        'retained_bytes_per_article': retained / max(len(articles), 1)
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark memory of the article representation')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--content-bytes', type=int, default=8000, help='Average article content size')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'mode':>10} {'articles':>9} {'peak_rss_mb':>12} {'traced_peak_mb':>15} {'bytes/article':>14}")
+    for size in args.sizes:
+        for mode in MODES:
+            results = context.Queue()
+            process = context.Process(target=measure, args=(mode, size, args.content_bytes, results))
+            process.start()
+            row = results.get()
+            process.join()
+            print(f"{row['mode']:>10} {row['articles']:>9} {row['peak_rss_mb']:>12.1f} "
+                  f"{row['traced_peak_mb']:>15.1f} {row['retained_bytes_per_article']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
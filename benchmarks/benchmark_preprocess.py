@@ -0,0 +1,114 @@
+"""
+Module name: benchmark_preprocess.py
+Author: Michele Grieco
+Description:
+    Benchmark and regression check of the text cleaning of TextPreprocessor. A corpus of synthetic articles
+    (Italian and ASCII-only English words, accented and typographic characters, emoji, HTML markup, URLs next
+    to punctuation and symbols) plus a set of hand-written edge cases is cleaned with the original step-by-step implementation
+    (BeautifulSoup, URL regex compiled per call, NFKD, special character and whitespace passes) and with
+    clean_batch, in one process and with worker processes. The run fails if any output differs by a byte.
+Usage:
+    python -m benchmarks.benchmark_preprocess
+    python -m benchmarks.benchmark_preprocess --texts 20000 --workers 4
+"""
+
+import argparse
+import logging
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+from bs4 import BeautifulSoup
+from preprocessing.preprocess import clean_batch
+
+EDGE_CASES = [
+    "", " ", "\n\t ", "a", "&amp;", "<p></p>", "   Enel   ", "Enel!!! ???", "Enel @ # b",
+    "prezzo: 10€ (+5%)", "caffè perché così", "ﬁnanza ﬂusso", "x² ½ ①", "Ｅｎｅｌ", "café", "é",
+    "a b c​d", "linea\r\nnuova\x0bvert\x0cff", "😀 Enel 👍🏽 ok", "snake_case under_score",
+    "a @https://enel.it/x?y=1 # b", "(www.enel.it)", "vedi:http://x.it,ora", "HTTP://MAIUSCOLO.it", "wwwXenel",
+    "<a href='https://enel.it'>link</a> testo", "1&lt;2 &gt; 0 &nbsp;ok", "<b>Enel</b>&mdash;utili",
+    "« citazione » “virgolette” ‘apici’ – trattino — lungo…", "٣ أرقام", "日本語のテキスト", "ǅ ǈ ǋ",
+    " separatore paragrafo", "tab\tseparated\tvalues", "-- -- --", "....", "a - b", "@@@",
+    "\r", "\r\n", " \x85 ", "\u3000", "riga\rritorno", "  spazi  \t misti \n ", "prezzo > costo"
+]
+
+WORDS = ["Enel", "energia", "bollette", "clienti", "perché", "più", "così", "città", "società", "l'azienda",
+         "utili", "crescita", "trimestre", "ﬁnanziario", "dell’anno", "2025", "e", "la", "di", "per", "il"]
+ASCII_WORDS = ["Enel", "energy", "bills", "customers", "profits", "growth", "quarter", "the", "of", "and", "to"]
+SYMBOLS = ["€", "%", "–", "—", "«", "»", "😀", "👍🏽", "…", "(", ")", "&", "@", "#", "\t", "Ｅ", '"', "-"]
+
+
+def legacy_clean(text: str) -> str:
+    """
+    The original cleaning steps of TextPreprocessor.preprocess.
+    """
+    if not text:
+        return ""
+    text = BeautifulSoup(text, "html.parser").get_text()
+    url_pattern = re.compile(r'https?://\S+|www\.\S+')
+    text = url_pattern.sub('', text)
+    text = unicodedata.normalize('NFKD', text)
+    text = re.sub(r'[^\w\s\.,;:!?]', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def make_texts(rng: random.Random, count: int, words: int) -> list:
+    """
+    Build synthetic articles, one in three in ASCII only, one in four with HTML markup and one in three with URLs.
+    Three tokens in a hundred are symbols.
+    """
+    texts = []
+    for _ in range(count):
+        vocabulary = ASCII_WORDS if rng.random() < 0.33 else WORDS
+        tokens = [rng.choice(SYMBOLS) if rng.random() < 0.03 else rng.choice(vocabulary)
+                  for _ in range(rng.randint(1, words))]
+        if rng.random() < 0.33:
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(
+                ["https://www.enel.it/news?id=1", "(http://x.it/a)", "www.enel.it,", "@https://t.co/x#"]))
+        separator = rng.choice([" ", " ", " ", "  ", "\n", " , "])
+        text = separator.join(tokens)
+        if rng.random() < 0.25:
+            text = f"<p>{text}</p> <b>{rng.choice(vocabulary)}</b> &amp; &egrave;"
+        texts.append(text)
+    return texts
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark and regression check of the text cleaning")
+    parser.add_argument("--texts", type=int, default=5000, help="Synthetic texts cleaned")
+    parser.add_argument("--words", type=int, default=400, help="Maximum words per synthetic text")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes of the parallel run")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    texts = EDGE_CASES + make_texts(random.Random(args.seed), args.texts, args.words)
+    expected, legacy_time = timed(lambda: [legacy_clean(text) for text in texts])
+    runs = [("legacy", expected, legacy_time)]
+    runs.append(("batch", *timed(clean_batch, texts, 1)))
+    runs.append((f"batch x{args.workers}", *timed(clean_batch, texts, args.workers)))
+
+    print(f"{len(texts)} texts, {sum(map(len, texts)) / 1e6:.1f}M chars")
+    print(f"{'engine':>12} {'seconds':>9} {'speedup':>8} {'identical':>10}")
+    failed = False
+    for name, result, seconds in runs:
+        mismatches = [i for i, (a, b) in enumerate(zip(expected, result)) if a.encode() != b.encode()]
+        identical = len(result) == len(expected) and not mismatches
+        failed = failed or not identical
+        print(f"{name:>12} {seconds:>9.3f} {legacy_time / seconds:>7.1f}x {str(identical):>10}")
+        for i in mismatches[:5]:
+            print(f"  mismatch on {texts[i]!r}: {expected[i]!r} != {result[i]!r}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Module name: benchmark_scoring.py
+Author: Michele Grieco
+Description:
+    Benchmark comparing the original list-based ReputationScoreCalculator.calculate_reputation_score
+    with the vectorized VectorizedScoreCalculator on synthetic article sets from 10^3 to 10^7 articles,
+    and timing grouped per-hour/day/company scores. The legacy path needs one dictionary per article,
+    so it is skipped above --legacy-limit to keep memory in check.
+Usage:
+    python -m benchmarks.benchmark_scoring
+    python -m benchmarks.benchmark_scoring --sizes 1000 100000 --legacy-limit 100000
+"""
+
+import argparse
+import logging
+import time
+import numpy as np # for synthetic data
+import pandas as pd # for columnar input
+from tools.score_calculator import ReputationScoreCalculator
+from tools.vectorized_scoring import VectorizedScoreCalculator
+
+COMPANIES = ["Enel", "Eni", "Leonardo", "Stellantis"]
+
+# Shared pool of contents, so the legacy dicts don't allocate a string per article
+CONTENT_POOL = [("x" * length) for length in range(0, 8000, 125)]
+
+
+def make_frame(size: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Build a synthetic columnar article set.
+
+    Args:
+        size (int): Number of articles
+        seed (int): Random seed
+
+    Returns:
+        pandas.DataFrame: Articles with score, length, duplicate factor, company and event time columns
+    """
+    rng = np.random.default_rng(seed)
+    pool_index = rng.integers(0, len(CONTENT_POOL), size)
+    start = np.datetime64('2025-01-01T00:00:00')
+    return pd.DataFrame({
+        'sentiment_score': rng.uniform(-1.0, 1.0, size),
+        'content_length': pool_index * 125,
+        # About one article in five is a near-duplicate copy, scaled down by the duplicate policy
+        'dedup_weight': np.where(rng.random(size) < 0.2, 0.5, 1.0),
+        'pool_index': pool_index,
+        'company': rng.choice(COMPANIES, size),
+        'event_time': start + rng.integers(0, 365 * 24 * 3600, size).astype('timedelta64[s]')
+    })
+
+
+def to_legacy(frame: pd.DataFrame) -> list:
+    """
+    Convert the synthetic frame to the list of dictionaries used by the original calculator.
+    """
+    return [
+        {'sentiment_score': score, 'content': CONTENT_POOL[index], 'dedup_weight': dedup}
+        for score, index, dedup in zip(frame['sentiment_score'].tolist(), frame['pool_index'].tolist(),
+                                       frame['dedup_weight'].tolist())
+    ]
+
+
+def timed(function, *args) -> tuple:
+    """
+    Run a function once and return its result and elapsed seconds.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark legacy vs vectorized reputation scoring')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10 ** k for k in range(3, 8)])
+    parser.add_argument('--legacy-limit', type=int, default=10 ** 6,
+                        help='Largest size for which the legacy implementation is run')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    legacy = ReputationScoreCalculator()
+    vectorized = VectorizedScoreCalculator()
+
+    print(f"{'articles':>10} {'legacy_s':>10} {'vector_s':>10} {'speedup':>8} "
+          f"{'hour_s':>8} {'day_s':>8} {'company_s':>9} {'abs_diff':>10}")
+    for size in args.sizes:
+        frame = make_frame(size)
+
+        vector_score, vector_time = timed(vectorized.score, frame)
+        _, hour_time = timed(vectorized.grouped_scores, frame, 'h', True)
+        _, day_time = timed(vectorized.grouped_scores, frame, 'D', True)
+        _, company_time = timed(vectorized.grouped_scores, frame, None, True)
+
+        legacy_time = float('nan')
+        diff = float('nan')
+        if size <= args.legacy_limit:
+            articles = to_legacy(frame)
+            legacy_score, legacy_time = timed(legacy.calculate_reputation_score, articles)
+            diff = abs(legacy_score - vector_score)
+            del articles
+
+        speedup = legacy_time / vector_time if vector_time > 0 else float('nan')
+        print(f"{size:>10} {legacy_time:>10.4f} {vector_time:>10.4f} {speedup:>8.1f} "
+              f"{hour_time:>8.3f} {day_time:>8.3f} {company_time:>9.3f} {diff:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
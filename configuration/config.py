@@ -14,7 +14,10 @@ import os
 # General configurations
 TARGET_COMPANY = "Enel" # Target company for reputation monitoring
 RSS_FEED_URL = f"https://news.google.com/rss/search?q={TARGET_COMPANY}&hl=it&gl=IT&ceid=IT:it"
+FEED_URLS = [RSS_FEED_URL]  # Feeds polled by the adaptive scheduler
 ALERT_THRESHOLD = -0.3  # Alert threshold for sentiment score
+COMPANY_ALIASES = [TARGET_COMPANY, "Enel Energia", "Enel X", "Enel Green Power"]  # Names matched by the relevance prefilter
+RELEVANCE_AUDIT_SAMPLE_RATE = 0.05  # Fraction of prefilter-dropped entries still analyzed for recall auditing
 
 # Email configurations
 EMAIL_SENDER = os.environ.get("EMAIL_SENDER")
@@ -22,17 +25,179 @@ EMAIL_PASSWORD = os.environ.get("EMAIL_PASSWORD")
 EMAIL_RECIPIENT = os.environ.get("EMAIL_RECIPIENT", "admin@example.com")
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
+SMTP_USE_TLS = True  # Upgrade the SMTP connection with STARTTLS
+SMTP_TIMEOUT = 30  # seconds
 
 # Sentiment analysis configurations
 SENTIMENT_MODEL = "dbmdz/bert-base-italian-uncased-sentiment"
+SENTIMENT_MODE = "article"  # "article": score the article start, "targeted": score sentences mentioning the company
+SENTIMENT_POSITIVE_THRESHOLD = 0.2  # Scores above are labeled Positive
+SENTIMENT_NEGATIVE_THRESHOLD = -0.2  # Scores below are labeled Negative
+TARGET_SENTENCE_NEIGHBORS = 0  # Sentences kept around each sentence mentioning the company
+TARGET_MAX_SENTENCES = 20  # Maximum sentences scored per article
+SENTIMENT_LEXICON_FILE = os.path.join(os.path.dirname(__file__), "lexicon_it.tsv")  # Weighted terms of the fallback analyzer
+LEXICON_NEGATORS = ("non", "mai", "nessun*", "niente", "nulla", "senza", "neanche", "nemmeno", "neppure")  # Words flipping the polarity of the following terms
+LEXICON_NEGATION_WINDOW = 3  # Words after a negator whose polarity is flipped
+SENTIMENT_CASCADE = False  # Score with a cheap first stage, escalating uncertain texts to SENTIMENT_MODEL
+CASCADE_FIRST_STAGE = "lexicon"  # First stage: "lexicon" or the name of a small transformer model
+CASCADE_CONFIDENCE_THRESHOLD = 0.6  # First-stage confidence below which a text is escalated
+CASCADE_LEXICON_EVIDENCE = 2.0  # Matched lexicon weight giving ~63% of the full confidence
+CASCADE_AUDIT_RATE = 0.05  # Fraction of confident texts also scored by the full model to measure agreement
 
 # Data storage configurations
 DATA_DIRECTORY = "data"
 RESULTS_FILE = os.path.join(DATA_DIRECTORY, "reputation_scores.csv")
+JOURNAL_DIRECTORY = os.path.join(DATA_DIRECTORY, "journal")  # Per-run article checkpoints
+
+# Logging configurations
+LOG_LEVEL = "INFO"  # Level of the root logger, "DEBUG" shows the sampled per-article events
+LOG_FORMAT = "text"  # "text" for humans, "json" for one JSON object per line with run and article ids
+LOG_FILE = os.path.join(DATA_DIRECTORY, "repscan.log")  # Log file, written by a background thread
+LOG_SAMPLE_RATE = 10  # Per-article events: one call in N is logged
+LOG_RATE_LIMIT = 20  # Per-article events: maximum records per second for each logger
+
+# Alert dispatcher configurations
+ALERT_STATE_FILE = os.path.join(DATA_DIRECTORY, "alert_state.json")  # Persisted dedup/cooldown state
+ALERT_COOLDOWN_SECONDS = 6 * 3600  # Minimum delay before re-sending the same alert
+ALERT_ESCALATION_DELTA = 0.2  # Score drop that bypasses the cooldown
+ALERT_DIGEST_WINDOW = 5.0  # seconds to wait for more alerts before sending a digest
+ALERT_MAX_RETRIES = 3  # Send attempts after the first failure
+ALERT_RETRY_BACKOFF = 2.0  # Base delay (seconds) for exponential backoff
+
+# Anomaly detection configurations
+ANOMALY_STATE_FILE = os.path.join(DATA_DIRECTORY, "anomaly_state.json")  # Persisted EWMA/CUSUM state per company
+ANOMALY_SMOOTHING = 0.1  # Weight of the latest score in the moving mean and variance
+ANOMALY_Z_THRESHOLD = 3.0  # Standard deviations below the moving mean that fire an alert
+ANOMALY_CUSUM_SLACK = 0.5  # Standardized drop per run tolerated by the CUSUM
+ANOMALY_CUSUM_THRESHOLD = 4.0  # Accumulated standardized drop that fires an alert
+ANOMALY_CLIP = 3.0  # Residuals are clipped to this many standard deviations before updating the baseline
+ANOMALY_MIN_STD = 0.02  # Floor of the standard deviation, so a flat series does not turn noise into alerts
+ANOMALY_WARMUP_RUNS = 10  # Runs needed before the detector replaces ALERT_THRESHOLD
+ANOMALY_SEED_RUNS = 100  # Latest scores of RESULTS_FILE used to seed a company without state
+ANOMALY_SENSITIVITY = {}  # Per-company overrides, e.g. {"Enel": {"z_threshold": 2.5, "cusum_threshold": 3.0}}
+
+# Incremental score configurations
+SCORE_STATE_FILE = os.path.join(DATA_DIRECTORY, "score_state.json")  # Persisted running aggregates
+SCORE_DECAY_HALF_LIFE_HOURS = 72  # Half-life of the exponentially decayed score
+SCORE_WINDOWS = {"24h": 24, "7d": 7 * 24, "30d": 30 * 24}  # Sliding windows in hours
+
+# Download configurations
+REQUEST_CONNECT_TIMEOUT = 3.05  # seconds to establish a connection
+REQUEST_READ_TIMEOUT = 10  # seconds between bytes received
+DOWNLOAD_MAX_BYTES = 2 * 1024 * 1024  # Byte budget per article page
+DOWNLOAD_CHUNK_SIZE = 16 * 1024  # bytes read per streamed chunk
+DOWNLOAD_TEXT_BUDGET = 20000  # Stop downloading once this much paragraph text has been seen
+ALLOWED_CONTENT_TYPES = ("text/html", "application/xhtml+xml")  # Other content types are not downloaded
+SCRAPER_MODE = "live"  # "live": fetch from the network, "record": fetch and archive, "replay": serve from the archive
+ARCHIVE_DIRECTORY = os.path.join(DATA_DIRECTORY, "archive")  # Recorded feeds and pages
+REPLAY_LATENCY_SCALE = 0.0  # Factor applied to recorded latency on replay, 0 serves immediately
+
+# Resilient fetch configurations
+FETCH_RATE_PER_HOST = 1.0  # Requests per second per host
+FETCH_BURST = 3  # Requests allowed in a burst per host
+FETCH_HOST_LIMITS = {"news.google.com": (10.0, 10)}  # Per-host (rate, burst) overrides
+FETCH_MAX_RETRIES = 3  # Retries after the first attempt
+FETCH_BACKOFF_BASE = 1.0  # Base delay (seconds) of the jittered exponential backoff
+FETCH_BACKOFF_MAX = 30.0  # Maximum delay (seconds) between attempts, Retry-After included
+FETCH_RETRY_STATUSES = (429, 500, 502, 503, 504)  # Statuses worth retrying
+CIRCUIT_FAILURE_THRESHOLD = 3  # Consecutive failures opening the circuit of a host
+CIRCUIT_COOLDOWN_SECONDS = 3600  # Time a host is skipped once its circuit is open
+CIRCUIT_STATE_FILE = os.path.join(DATA_DIRECTORY, "circuit_state.json")  # Persisted circuit breakers
+
+# URL resolution configurations
+RESOLVER_REDIRECT_HOSTS = ("news.google.com",)  # Hosts whose links redirect to the publisher
+RESOLVER_WORKERS = 8  # Concurrent resolutions
+RESOLVER_MAX_HOPS = 5  # Maximum redirects followed per link
+URL_CACHE_FILE = os.path.join(DATA_DIRECTORY, "url_cache.db")  # Persistent link -> publisher URL cache
+URL_CACHE_TTL_SECONDS = 30 * 24 * 3600  # Validity of a cached resolution
+
+# Near-duplicate detection configurations
+DEDUP_INDEX_FILE = os.path.join(DATA_DIRECTORY, "dedup_index.db")  # Persistent SimHash/LSH index
+DEDUP_MAX_DISTANCE = 6  # Maximum Hamming distance between 64-bit SimHashes of near-duplicates (at most 7)
+DEDUP_SHINGLE_SIZE = 3  # Words per shingle
+DEDUP_MIN_TOKENS = 30  # Shorter texts are not deduplicated
+DEDUP_RETENTION_DAYS = 30  # Fingerprints older than this are pruned
+DUPLICATE_POLICY = "once"  # "once": copies don't count in the score, "reduced": copies count with DUPLICATE_WEIGHT
+DUPLICATE_WEIGHT = 0.25  # Weight of a copy under the "reduced" policy
+
+# Story clustering configurations
+EMBEDDING_DIRECTORY = os.path.join(DATA_DIRECTORY, "embeddings")  # Memory-mapped article embeddings and their index
+EMBEDDING_MAX_CHARS = 2000  # Characters of title and content embedded per article
+EMBEDDING_GROWTH_ROWS = 65536  # Rows added to the embedding matrix file when it is full
+STORY_SIMILARITY = 0.8  # Cosine similarity with the first article of a story needed to join it
+STORY_WINDOW_HOURS = 72  # Age of the oldest negative article grouped into stories
+STORY_GROWTH_HOURS = 6  # Window over which the growth rate of a story is measured
+STORY_MAX_ARTICLES = 5000  # Most recent negative articles clustered at most
+ALERT_MAX_STORIES = 5  # Stories listed in an alert
+
+# Extraction configurations
+EXTRACTION_ENGINE = "lxml"  # HTML extraction engine: "lxml" or "soup"
+EXTRACTION_MIN_BODY_CHARS = 200  # Minimum paragraph text for a container to count as article body
+
+# Backfill configurations
+BACKFILL_WORKERS = os.cpu_count() or 1  # Analysis processes
+BACKFILL_BATCH_SIZE = 64  # Articles sent to a worker at a time
+BACKFILL_MAX_IN_FLIGHT = 2  # Pending batches per worker, bounds memory
+BACKFILL_CHECKPOINT_FILE = os.path.join(DATA_DIRECTORY, "backfill_checkpoint.json")  # Resume state
+BACKFILL_SCORES_FILE = os.path.join(DATA_DIRECTORY, "backfill_scores.csv")  # Per-day rescored history
+BACKFILL_PROGRESS_INTERVAL = 10  # seconds between progress reports
+
+# Scheduler configurations
+SCHEDULER_STATE_FILE = os.path.join(DATA_DIRECTORY, "scheduler_state.json")  # Persisted feed rates and intervals
+SCHEDULER_MIN_INTERVAL = 5 * 60  # Shortest poll interval (seconds)
+SCHEDULER_MAX_INTERVAL = 6 * 3600  # Longest poll interval (seconds)
+SCHEDULER_TARGET_NEW_ENTRIES = 3  # New entries expected per poll, sets the interval from the feed rate
+SCHEDULER_SMOOTHING = 0.3  # Weight of the latest poll in the smoothed feed rate
+SCHEDULER_SATURATION = 0.8  # Share of new entries suggesting missed entries, halves the interval
+SCHEDULER_SEEN_LIMIT = 1000  # Entry ids remembered per feed
+SCHEDULER_SURGE_DROP = 0.2  # Drop of the decayed score that triggers faster polling
+SCHEDULER_SURGE_FACTOR = 0.25  # Interval multiplier during a surge
+SCHEDULER_SURGE_DURATION = 2 * 3600  # Duration of a surge (seconds)
+
+# Work queue configurations
+QUEUE_FILE = os.path.join(DATA_DIRECTORY, "work_queue.db")  # Shared task queue of producers, workers and aggregator
+QUEUE_JOURNAL_MODE = "WAL"  # "WAL" for processes on one host, "DELETE" for hosts sharing a volume
+QUEUE_LEASE_SECONDS = 300  # Time a leased task stays invisible to other workers
+QUEUE_MAX_ATTEMPTS = 3  # Attempts before a task is dead-lettered
+QUEUE_RETRY_BACKOFF = 30.0  # Base delay (seconds) before retrying a failed task
+QUEUE_POLL_INTERVAL = 5.0  # seconds an idle worker waits before looking for tasks again
+QUEUE_AGGREGATE_BATCH = 1000  # Results folded into the scores per aggregation run
+QUEUE_RETENTION_DAYS = 30  # Completed tasks are kept this long to skip already analyzed links
 
 # SpaCy configurations
 SPACY_MODEL = "it_core_news_sm"
 
+# Preprocessing configurations
+PREPROCESS_WORKERS = 1  # Processes cleaning the texts of a large batch, 1 to clean them in the calling process
+PREPROCESS_PARALLEL_MIN_TEXTS = 2000  # Smallest batch fanned out across processes
+PREPROCESS_CHUNK_SIZE = 64  # Texts sent to a worker process at a time
+
+# Language configurations
+DEFAULT_LANGUAGE = "it"  # Language of the feed, assumed when an article's language cannot be identified
+LANGUAGE_MODELS = {  # Analysis models per language, loaded on first use; articles in other languages are skipped
+    "it": {"spacy": SPACY_MODEL, "sentiment": SENTIMENT_MODEL},
+    "en": {"spacy": "en_core_web_sm", "sentiment": "distilbert-base-uncased-finetuned-sst-2-english"}
+}
+LANGUAGE_MIN_HITS = 2.0  # Stopword evidence needed to identify a language
+LANGUAGE_MIN_MARGIN = 0.3  # Share of the evidence by which the best language must lead the second
+LANGUAGE_SAMPLE_WORDS = 300  # Words of a text examined by the language identifier
+
 # Dashboard configurations
 DASHBOARD_TITLE = f"RepScan - Reputation Monitoring Dashboard for {TARGET_COMPANY}"
-DASHBOARD_REFRESH_RATE = 3600  # seconds (1 hour)
\ No newline at end of file
+DASHBOARD_REFRESH_RATE = 3600  # seconds (1 hour)
+
+# API configurations
+API_HOST = "127.0.0.1"  # Address the JSON API listens on
+API_PORT = 8502  # Port of the JSON API
+API_PAGE_SIZE = 50  # Default articles per page
+API_MAX_PAGE_SIZE = 500  # Maximum articles per page
+API_REVALIDATE_SECONDS = 1.0  # Minimum delay between two checks of the result files for changes
+
+# Push ingestion configurations
+PUSH_HOST = "127.0.0.1"  # Address the push endpoint listens on (behind a reverse proxy for public hubs)
+PUSH_PORT = 8503  # Port of the push endpoint
+PUSH_SECRET = os.environ.get("PUSH_SECRET")  # HMAC key of the X-Hub-Signature header, pushes are refused without it
+PUSH_CALLBACK_URL = os.environ.get("PUSH_CALLBACK_URL")  # Public URL of the /websub path, no hub subscription if None
+PUSH_SUBSCRIPTIONS = {}  # Feed URL -> WebSub hub URL, the feeds whose notifications are accepted
+PUSH_LEASE_SECONDS = 864000  # Lease requested from the hubs, renewed at 80% of the granted lease
+PUSH_MAX_BODY_BYTES = 2_000_000  # Largest notification accepted
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+Module name: logging_setup.py
+Author: Michele Grieco
+Description:
+    This module configures logging once for the whole application. Records are put on an in-memory queue
+    by a single QueueHandler on the root logger and written to the console and the log file by a background
+    QueueListener thread, so logging calls never wait for disk or terminal I/O. Records are formatted as
+    text or, with LOG_FORMAT = "json", as one JSON object per line. The run and article being processed are
+    kept in context variables (see log_context) and added to every record.
+    Per-article events go through a SampledLogger, which logs one call in LOG_SAMPLE_RATE and at most
+    LOG_RATE_LIMIT records per second, so the logging cost does not grow with the number of articles.
+    Hot-path messages should pass their arguments separately ("%s") so that dropped records are never formatted.
+Usage:
+    from configuration.logging_setup import setup_logging, log_context, SampledLogger
+    setup_logging()
+    with log_context(run_id="20250101_120000"):
+        sampled = SampledLogger(__name__)
+        sampled.debug("Company %s found in text", company)
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+from configuration.config import LOG_LEVEL, LOG_FORMAT, LOG_FILE, LOG_SAMPLE_RATE, LOG_RATE_LIMIT
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+run_id_var = contextvars.ContextVar('run_id', default=None)
+article_id_var = contextvars.ContextVar('article_id', default=None)
+
+# Attributes of every LogRecord, anything else was passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+# Listener of the current process; a forked child must start its own
+_state = {'pid': None, 'listener': None}
+
+
+class ContextFilter(logging.Filter):
+    """
+    Filter adding the run and article ids of the calling context to each record.
+    It runs in the thread that logs, before the record is queued.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = run_id_var.get()
+        record.article_id = article_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatter writing each record as a single-line JSON object.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'run_id': getattr(record, 'run_id', None),
+            'article_id': getattr(record, 'article_id', None)
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler merging the message arguments before queuing, but keeping the traceback
+    apart from the message so that formatters can place it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, log_file: Optional[str] = LOG_FILE) -> None:
+    """
+    Route all logging through a queue to a background writer. Calling it again in the same process
+    does nothing; in a forked child process it starts the child's own writer.
+
+    Args:
+        level (str): Level of the root logger
+        log_format (str): "text" or "json"
+        log_file (str, optional): Path of the log file, console only if None
+    """
+    if _state['pid'] == os.getpid():
+        return
+
+    formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    _state.update(pid=os.getpid(), listener=listener)
+    # Pool worker processes leave through os._exit, which skips atexit but runs multiprocessing finalizers
+    atexit.register(_stop_listener)
+    multiprocessing.util.Finalize(None, _stop_listener, exitpriority=0)
+
+
+def _stop_listener() -> None:
+    """
+    Write the queued records before the process exits.
+    """
+    listener = _state['listener']
+    if listener is not None and _state['pid'] == os.getpid():
+        _state['listener'] = None
+        listener.stop()
+
+
+@contextmanager
+def log_context(run_id: Optional[str] = None, article_id: Optional[str] = None):
+    """
+    Attach a run id and/or an article id to the records logged inside the block.
+
+    Args:
+        run_id (str, optional): Run identifier, unchanged if None
+        article_id (str, optional): Article identifier, unchanged if None
+    """
+    tokens = []
+    if run_id is not None:
+        tokens.append((run_id_var, run_id_var.set(run_id)))
+    if article_id is not None:
+        tokens.append((article_id_var, article_id_var.set(article_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class SampledLogger:
+    """
+    Class logging one call in sample_rate, at most max_per_second records per second.
+    Emitted records carry the number of calls suppressed since the previous one.
+    """
+
+    def __init__(self, name: str, sample_rate: int = LOG_SAMPLE_RATE, max_per_second: float = LOG_RATE_LIMIT) -> None:
+        """
+        Initialize the sampled logger.
+
+        Args:
+            name (str): Name of the underlying logger
+            sample_rate (int): One call in sample_rate is considered for logging
+            max_per_second (float): Maximum records per second
+        """
+        self.logger = logging.getLogger(name)
+        self.sample_rate = max(int(sample_rate), 1)
+        self.max_per_second = max_per_second
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.suppressed = 0
+        self.tokens = float(max_per_second)
+        self.updated = time.monotonic()
+
+    def _allow(self) -> Optional[int]:
+        """
+        Decide whether the current call is logged.
+
+        Returns:
+            int: Calls suppressed since the last logged one, or None if this call is suppressed
+        """
+        with self.lock:
+            self.calls += 1
+            if self.calls % self.sample_rate:
+                self.suppressed += 1
+                return None
+            now = time.monotonic()
+            self.tokens = min(self.tokens + (now - self.updated) * self.max_per_second, self.max_per_second)
+            self.updated = now
+            if self.tokens < 1:
+                self.suppressed += 1
+                return None
+            self.tokens -= 1
+            suppressed, self.suppressed = self.suppressed, 0
+            return suppressed
+
+    def log(self, level: int, msg: str, *args, **kwargs) -> None:
+        """
+        Log a message if the level is enabled and the call is sampled.
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        suppressed = self._allow()
+        if suppressed is None:
+            return
+        extra = dict(kwargs.pop('extra', None) or {})
+        extra['suppressed'] = suppressed
+        self.logger.log(level, msg, *args, extra=extra, stacklevel=3, **kwargs)
+
+    def debug(self, msg: str, *args, **kwargs) -> None:
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg: str, *args, **kwargs) -> None:
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg: str, *args, **kwargs) -> None:
+        self.log(logging.WARNING, msg, *args, **kwargs)
@@ -12,140 +12,437 @@ Usage:
         python main.py
     To launch the Streamlit dashboard:
         python main.py --dashboard
+    To resume a run that was interrupted, using its journal:
+        python main.py --run-id 20250101_120000
+    To record fetched feeds and pages, and to replay a run on the recorded inputs:
+        python main.py --scraper-mode record --archive data/archive
+        python main.py --scraper-mode replay --archive data/archive --replay-latency 1.0
+    To rescore archived articles (JSONL or Parquet), resuming from the last checkpoint:
+        python main.py --backfill archive/articles.jsonl --workers 8
+    To poll the configured feeds continuously, each at an interval adapted to its update rate:
+        python main.py --schedule
+    To split the pipeline over a shared work queue: a producer polling the feeds (once, or continuously
+    with --schedule), any number of analysis workers, and an aggregator folding their results into the scores:
+        python main.py --produce --schedule
+        python main.py --worker
+        python main.py --aggregate
+    To enqueue articles as soon as they are published, from WebSub hubs or webhooks, polling as a fallback:
+        python main.py --push --schedule
+    To serve scores and article results as a read-only JSON API:
+        python main.py --api
     Ensure that all dependencies are installed and configured properly.
     The module uses various tools and configurations defined in other parts of the application.
 """
 
 import logging
 import os
+import socket
+import time
 import argparse
 import pandas as pd
 from datetime import datetime
 
-from configuration.config import DATA_DIRECTORY, TARGET_COMPANY
+from configuration.config import (
+    DATA_DIRECTORY, TARGET_COMPANY, DUPLICATE_POLICY, DUPLICATE_WEIGHT, SENTIMENT_MODE, SENTIMENT_CASCADE, FEED_URLS,
+    QUEUE_FILE, QUEUE_POLL_INTERVAL, QUEUE_AGGREGATE_BATCH
+)
+from configuration.logging_setup import setup_logging, log_context, SampledLogger
+from tools.article import Article
 from tools.scraper import ArticleScraper
+from tools.archive import ResponseArchive
 from preprocessing.preprocess import TextPreprocessor
 from tools.ner import NamedEntityRecognizer
-from tools.sentiment_analysis import SentimentAnalyzer
+from tools.sentiment_analysis import SentimentAnalyzer, CascadeSentimentAnalyzer
 from tools.score_calculator import ReputationScoreCalculator
 from tools.alert import AlertSystem
+from tools.alert_dispatcher import AlertDispatcher
+from tools.anomaly import ScoreAnomalyDetector
+from tools.dedup import NearDuplicateDetector
+from tools.embedding_store import EmbeddingStore
+from tools.relevance import RelevanceFilter
+from tools.language import LanguageRouter
+from tools.incremental_score import IncrementalScoreEngine, parse_event_time
+from tools.backfill import BackfillRunner
+from tools.journal import RunJournal, article_record, article_from_record
+from tools.scheduler import FeedScheduler, poll_id
+from tools.work_queue import WorkQueue
+from tools.push_ingest import PushReceiver
+
+# Weight of a near-duplicate copy in the score, per duplicate policy
+DUPLICATE_WEIGHT_BY_POLICY = {
+    'once': 0.0,
+    'reduced': DUPLICATE_WEIGHT
+}
 
 class RepScanAnalyzer:
     """
     Main class for RepScan analysis execution.
     """
     
-    def __init__(self):
+    def __init__(self, run_id: str = None, scraper: ArticleScraper = None):
         """
         Initialize RepScanAnalyzer with its configs and dependencies.
+        Args:
+            run_id (str, optional): Identifier of the run journal, a new run is started if None.
+            scraper (ArticleScraper, optional): Scraper to use, e.g. in record or replay mode.
         """
         # Logging config
         self._setup_logging()
-        self.scraper = ArticleScraper()
+        self.scraper = scraper or ArticleScraper()
         self.preprocessor = TextPreprocessor()
         self.ner = NamedEntityRecognizer()
-        self.sentiment_analyzer = SentimentAnalyzer()
+        self.sentiment_analyzer = CascadeSentimentAnalyzer() if SENTIMENT_CASCADE else SentimentAnalyzer()
         self.score_calculator = ReputationScoreCalculator()
-        self.alert_system = AlertSystem()
+        self.score_engine = IncrementalScoreEngine()
+        self.dedup = NearDuplicateDetector()
+        self.embedding_store = EmbeddingStore()
+        self.relevance_filter = RelevanceFilter()
+        # Articles in other languages go to their own models, loaded on first use
+        self.language_router = LanguageRouter(
+            default_stages=(self.preprocessor, self.ner, self.sentiment_analyzer)
+        )
+        self.alert_system = AlertSystem(dispatcher=AlertDispatcher(), detector=ScoreAnomalyDetector())
+        self.articles_processed = 0
+        self.journal = RunJournal(run_id)
         
     def _setup_logging(self):
         """
         Setup logging configuration.
         """
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(os.path.join(DATA_DIRECTORY, "repscan.log")),
-                logging.StreamHandler()
-            ]
-        )
+        setup_logging()
         self.logger = logging.getLogger(__name__)
+        self.sampled_logger = SampledLogger(__name__)
 
 
-    def run_analysis(self) -> float:
+    def run_analysis(self, entries: list = None) -> float:
         """
         Perform the entire analysis workflow: article collection, preprocessing,
         entity recognition, sentiment analysis, reputation scoring,
         and sending alerts if necessary.
+        Args:
+            entries (list, optional): Feed entries to analyze, the scraper's feed is parsed if None.
         
         Returns:
             float: Reputational score calculated
         """
+        with log_context(run_id=self.journal.run_id):
+            return self._run_analysis(entries)
+
+    def _run_analysis(self, entries: list = None) -> float:
+        """
+        Analysis workflow of run_analysis, with the run id set in the logging context.
+        """
         # Check and create data directory if it doesn't exist
         if not os.path.exists(DATA_DIRECTORY):
             os.makedirs(DATA_DIRECTORY)
 
-        self.logger.info(f"=== Starting RepScan analisys for {TARGET_COMPANY} ===")
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.logger.info(f"=== Starting RepScan analisys for {TARGET_COMPANY} (run {self.journal.run_id}) ===")
+        if self.journal.completed is not None:
+            self.logger.info(f"Run {self.journal.run_id} already completed")
+            return self.journal.completed['score']
+        timestamp = self.journal.timestamp
 
-        # Step 1: Collecting articles
+        # Step 1 and 2: Articles are collected from the RSS feed and analyzed as they are downloaded,
+        # so raw content of at most one article is held at a time. Articles journaled by an
+        # interrupted attempt of this run are restored instead of being fetched again.
         self.logger.info("Step 1: Articles collection from RSS feed")
-        articles = self.scraper.collect_articles()
-        if not articles:
-            self.logger.warning("No article collected. The analysis will be stopped.")
-            return 0.0
-        
-        # Step 2: Preprocessing and analysis
         self.logger.info("Step 2: Preprocessing and articles analysis")
-        relevant_articles = self._process_articles(articles)
+        articles = self.scraper.iter_articles(self.relevance_filter, skip_links=self.journal.links, entries=entries,
+                                              language_router=self.language_router)
+        relevant_articles = self._process_articles(articles, self.journal.restore())
+        self.relevance_filter.log_report()
+        self.language_router.log_report()
+        if SENTIMENT_CASCADE:
+            self.sentiment_analyzer.log_report()
         
         # Step 3: Score calculation
-        if not relevant_articles:
+        if self.articles_processed == 0:
+            self.logger.warning("No article collected. The analysis will be stopped.")
+            score = 0.0
+        elif not relevant_articles:
             self.logger.warning(f"No relevant articles found with {TARGET_COMPANY} mentions.")
-            return 0.0
+            score = 0.0
+        else:
+            score = self._calculate_and_save_score(relevant_articles, timestamp)
         
-        return self._calculate_and_save_score(relevant_articles, timestamp)
+        self.journal.complete(score)
+        return score
+
+    def run_scheduled(self, scheduler: FeedScheduler) -> None:
+        """
+        Poll the feeds when the scheduler says they are due and analyze their new entries, until interrupted.
+        Each poll with new entries is a separate run, whose journal is named after the entries: if the run fails
+        or is interrupted its entries are not marked as seen, and the next poll returning them resumes the journal.
+        Args:
+            scheduler (FeedScheduler): Scheduler deciding when each feed is polled.
+        """
+        self.journal.discard()
+        try:
+            while True:
+                for feed_url in scheduler.due():
+                    entries = scheduler.observe(feed_url, self.scraper.parse_rss_feed(feed_url))
+                    if entries:
+                        self.journal = RunJournal(poll_id(feed_url, entries))
+                        try:
+                            self.run_analysis(entries)
+                        except BaseException:
+                            scheduler.forget(feed_url, entries)
+                            raise
+                        finally:
+                            self.journal.close()
+                        scheduler.notify_score(self.score_engine.snapshot()['decayed_score'])
+                    scheduler.save()
 
-    def _process_articles(self, articles: list) -> list:
+                wait = scheduler.seconds_until_next()
+                self.logger.info(f"Next feed poll in {wait:.0f}s")
+                time.sleep(wait)
+        finally:
+            scheduler.save()
+
+    def run_worker(self, queue: WorkQueue, exit_when_empty: bool = False) -> int:
+        """
+        Lease articles from the work queue, download and analyze them, and store their results in the queue.
+        Articles whose download fails are retried, and analyzed with what was collected on their last attempt.
+        Args:
+            queue (WorkQueue): Shared work queue.
+            exit_when_empty (bool): Return when no task is available instead of waiting for new ones.
+        Returns:
+            int: Number of articles analyzed.
+        """
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.journal.discard()
+        self.logger.info(f"Worker {worker_id} started")
+        analyzed = 0
+        while True:
+            task = queue.lease(worker_id)
+            if task is None:
+                if exit_when_empty:
+                    return analyzed
+                time.sleep(QUEUE_POLL_INTERVAL)
+                continue
+
+            with log_context(run_id=worker_id, article_id=task['payload']['link']):
+                analyzed += self._run_task(queue, task, worker_id, analyzed)
+
+    def _run_task(self, queue: WorkQueue, task: dict, worker_id: str, analyzed: int) -> int:
+        """
+        Download and analyze the article of a leased task, storing its result in the queue.
+        Args:
+            queue (WorkQueue): Shared work queue.
+            task (dict): Leased task.
+            worker_id (str): Identifier of the worker holding the lease.
+            analyzed (int): Number of articles analyzed so far by the worker.
+        Returns:
+            int: 1 if the result was stored, 0 otherwise.
+        """
+        try:
+            article = self.scraper.fetch_article(task['payload'])
+            if not article.content and task['attempts'] < queue.max_attempts:
+                queue.fail(task, "no content downloaded")
+                return 0
+            if not queue.extend(task):
+                self.logger.warning(f"Lease of task {task['id']} lost during download, skipping it")
+                return 0
+            # Duplicate weights depend on the other articles of the batch, the aggregator sets them
+            relevant = self._process_article(article, set())
+            article.release_raw()
+        except Exception as e:
+            self.logger.error(f"Error while analyzing task {task['id']}: {e}")
+            queue.fail(task, str(e))
+            return 0
+
+        if not queue.complete(task, article_record(article, relevant)):
+            return 0
+        self.sampled_logger.info("Article %d analyzed by %s: %s", analyzed + 1, worker_id, article.title)
+        return 1
+
+    def aggregate_results(self, queue: WorkQueue) -> int:
+        """
+        Fold the results stored by the workers into the scores, one leased batch at a time: each batch is
+        scored, saved and alerted on like a run. A batch interrupted before being marked aggregated is
+        handed out again with the same timestamp, and every write is skipped or overwritten for a batch
+        already written (score row by timestamp, detailed results file named after it, anomaly update by
+        key, running scores and embeddings by article), so each batch lands in the scores exactly once.
+        Args:
+            queue (WorkQueue): Shared work queue.
+        Returns:
+            int: Number of results aggregated.
+        """
+        self.journal.discard()
+        aggregator_id = f"{socket.gethostname()}:{os.getpid()}"
+        aggregated = 0
+        while True:
+            batch = queue.claim_results(QUEUE_AGGREGATE_BATCH, aggregator_id)
+            if batch is None:
+                return aggregated
+            batch_id, records = batch['id'], batch['results']
+
+            relevant_articles = []
+            seen_clusters = set()
+            for record in records:
+                article = article_from_record(record)
+                # Same duplicate policy as in a run: copies of a cluster already counted are down-weighted
+                if article.cluster_id is not None:
+                    if article.duplicate and article.cluster_id in seen_clusters:
+                        article.dedup_weight = DUPLICATE_WEIGHT_BY_POLICY[DUPLICATE_POLICY]
+                    seen_clusters.add(article.cluster_id)
+                if record['relevant']:
+                    relevant_articles.append(article)
+
+            with log_context(run_id=f"batch_{batch_id}"):
+                self.logger.info(f"Aggregating batch {batch_id}: {len(relevant_articles)}/{len(records)} relevant articles")
+                if relevant_articles:
+                    self._calculate_and_save_score(relevant_articles, batch['timestamp'], once=True)
+            if queue.finish_batch(batch):
+                aggregated += len(records)
+
+    def _process_articles(self, articles: list, restored: list = ()) -> list:
         """
         Process the articles applying preprocessing, NER and sentiment analysis.
+        Raw and intermediate text is released as soon as each article is analyzed,
+        and each analyzed article is checkpointed in the run journal.
+        Irrelevant articles are not retained.
         Args:
-            articles (list): List of articles to process.
+            articles (iterable): Article records to process, e.g. streamed from the scraper.
+            restored (list): (Article, relevant) tuples restored from the run journal.
         Returns:
             list: List of articles that mention the target company with sentiment scores.
         """
-        relevant_articles = []
+        relevant_articles = [article for article, relevant in restored if relevant]
+        seen_clusters = {article.cluster_id for article, _ in restored if article.cluster_id is not None}
+        duplicates = sum(article.duplicate for article, _ in restored)
+        self.articles_processed = len(restored)
         
-        for i, article in enumerate(articles):
-            self.logger.info(f"Article {i+1}/{len(articles)} analysis: {article['title']}")
-            
-            # Preprocessing
-            article['processed_content'] = self.preprocessor.preprocess(article['content'])
-            article['processed_title'] = self.preprocessor.preprocess(article['title'])
-            
-            # Verify company mentions
-            full_text = f"{article['processed_title']} {article['processed_content']}"
-            if self.ner.is_company_mentioned(full_text):
-                article['company_mentions'] = self.ner.get_company_mentions(
-                    article['processed_content'], TARGET_COMPANY
-                )
-                
-                # Sentiment analysis
-                article['sentiment_score'] = self.sentiment_analyzer.analyze_sentiment(
-                    article['processed_content']
-                )
-                article['sentiment_label'] = self.sentiment_analyzer.get_sentiment_label(
-                    article['sentiment_score']
-                )
-                
+        for article in articles:
+            self.articles_processed += 1
+            with log_context(article_id=article.link):
+                self.sampled_logger.info("Article %d analysis: %s", self.articles_processed, article.title)
+                relevant = self._process_article(article, seen_clusters)
+            article.release_raw()
+            self.journal.append(article, relevant)
+            duplicates += article.duplicate
+            self.relevance_filter.record('ner', relevant)
+            if article.audit_sample:
+                self.relevance_filter.record('audit', relevant)
+            if relevant:
                 relevant_articles.append(article)
+        
+        self.logger.info(f"{duplicates}/{self.articles_processed} articles were near-duplicates "
+                         f"and reused cluster results")
         return relevant_articles
+
+    def _process_article(self, article: Article, seen_clusters: set) -> bool:
+        """
+        Process a single article. Near-duplicates of an already analyzed story reuse
+        the results of their cluster instead of running NER and sentiment analysis again.
+        Args:
+            article (Article): Article to process, updated in place.
+            seen_clusters (set): Clusters already counted in this run.
+        Returns:
+            bool: True if the article mentions the target company.
+        """
+        # Language routing: the content confirms or corrects the language identified on the feed entry
+        article.language = self.language_router.identify_content(article.content, article.language)
+        stages = self.language_router.get_stages(article.language)
+        if stages is None:
+            return False
+        preprocessor, ner, sentiment_analyzer = stages
+
+        # Preprocessing
+        article.processed_content = preprocessor.preprocess(article.content)
+        article.processed_title = preprocessor.preprocess(article.title)
+        
+        # Near-duplicate lookup
+        fingerprint = self.dedup.fingerprint(article.processed_content)
+        match = self.dedup.find(fingerprint)
+        if match is not None:
+            cluster_id = match['cluster_id']
+            article.cluster_id = cluster_id
+            article.duplicate = True
+            article.dedup_weight = DUPLICATE_WEIGHT_BY_POLICY[DUPLICATE_POLICY] if cluster_id in seen_clusters else 1.0
+            seen_clusters.add(cluster_id)
+            self.dedup.add(fingerprint, article.canonical_url, match['relevant'],
+                           match['sentiment_score'], match['sentiment_label'], cluster_id)
+            if match['relevant']:
+                article.sentiment_score = match['sentiment_score']
+                article.sentiment_label = match['sentiment_label']
+            return match['relevant']
+        
+        # Verify company mentions
+        full_text = f"{article.processed_title} {article.processed_content}"
+        relevant = ner.is_company_mentioned(full_text)
+        if relevant and SENTIMENT_MODE == 'targeted':
+            # Mentions and target sentences from a single parse; only those sentences are scored.
+            # Articles mentioning the company in the title only fall back to the article start.
+            article.company_mentions, sentences = ner.analyze_company_context(
+                article.processed_content, TARGET_COMPANY
+            )
+            if sentences:
+                article.sentiment_score = sentiment_analyzer.analyze_targeted(sentences)
+            else:
+                article.sentiment_score = sentiment_analyzer.analyze_sentiment(
+                    article.processed_content
+                )
+        elif relevant:
+            article.company_mentions = ner.get_company_mentions(
+                article.processed_content, TARGET_COMPANY
+            )
+            
+            # Sentiment analysis
+            article.sentiment_score = sentiment_analyzer.analyze_sentiment(
+                article.processed_content
+            )
+        if relevant:
+            article.sentiment_label = sentiment_analyzer.get_sentiment_label(
+                article.sentiment_score
+            )
+            # Copies found by the near-duplicate lookup reuse this vector in the embedding store.
+            # Vectors of different models are not comparable, stories are built in the feed language only
+            if ner is self.ner:
+                article.embedding = self.ner.embed(full_text)
+        
+        article.cluster_id = self.dedup.add(
+            fingerprint, article.canonical_url, relevant,
+            article.sentiment_score, article.sentiment_label
+        )
+        if article.cluster_id is not None:
+            seen_clusters.add(article.cluster_id)
+        return relevant
+
+    @staticmethod
+    def _article_weight(article: Article) -> float:
+        """
+        Weight of an article in the running scores: its content length, scaled by the duplicate policy.
+        Args:
+            article (Article): Analyzed article.
+        Returns:
+            float: Article weight, 0 for copies that must not count.
+        """
+        return max(article.content_length, 1) * article.dedup_weight
             
-    def _calculate_and_save_score(self, relevant_articles: list, timestamp: str) -> float:
+    def _calculate_and_save_score(self, relevant_articles: list, timestamp: str, once: bool = False) -> float:
         """
         Calculate, save score and handle alerts.
         Args:
             relevant_articles (list): List of relevant articles with sentiment scores.
             timestamp (str): Analysis timestamp.
+            once (bool): The timestamp identifies the articles (a work queue batch): a score already
+                saved with it is not saved or folded into the anomaly baseline again.
         Returns:
             float: Reputational score calculated.
         """
         reputation_score = self.score_calculator.calculate_reputation_score(relevant_articles)
-        self.score_calculator.save_reputation_score(reputation_score, timestamp)
+        self.score_calculator.save_reputation_score(reputation_score, timestamp, skip_existing=once)
+        self._update_running_scores(relevant_articles, timestamp)
         
-        # Alert handling
-        self.alert_system.send_alert_email(reputation_score, relevant_articles)
+        # Alert handling (delivered in background by the dispatcher), with the negative
+        # articles of this and previous runs grouped into stories
+        self.embedding_store.add_articles(relevant_articles)
+        triggered = self.alert_system.should_send_alert(reputation_score)
+        stories = self.embedding_store.stories() if triggered else None
+        self.alert_system.dispatch_alert(reputation_score, relevant_articles, stories=stories, triggered=triggered)
+        # Scores are folded into the anomaly baseline after being assessed
+        self.alert_system.record_score(reputation_score, key=timestamp if once else None)
         
         # Save detailed results
         self._save_detailed_results(relevant_articles, reputation_score, timestamp)
@@ -153,6 +450,32 @@ class RepScanAnalyzer:
         self.logger.info(f"Analysis completed. Reputational score: {reputation_score:.2f}")
         return reputation_score
 
+    def _update_running_scores(self, articles: list, timestamp: str) -> dict:
+        """
+        Fold the run's articles into the incremental score engine and persist it.
+        Args:
+            articles (list): List of analyzed articles.
+            timestamp (str): Analysis timestamp.
+        Returns:
+            dict: Snapshot of the decayed and windowed scores.
+        """
+        run_time = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+        for article in articles:
+            self.score_engine.update(
+                article.sentiment_score,
+                weight=self._article_weight(article),
+                timestamp=parse_event_time(article.published, run_time),
+                key=article.canonical_url
+            )
+        self.score_engine.save()
+
+        snapshot = self.score_engine.snapshot()
+        self.logger.info(
+            "Running scores: decayed {decayed_score:.2f}, 24h {score_24h:.2f}, "
+            "7d {score_7d:.2f}, 30d {score_30d:.2f}".format(**snapshot)
+        )
+        return snapshot
+
     def _save_detailed_results(self, articles: list, score: float, timestamp: str) -> None:
         """
         Save analysis detailed results.
@@ -165,20 +488,88 @@ class RepScanAnalyzer:
         """
         results = [{
             'timestamp': timestamp,
-            'title': article['title'],
-            'link': article['link'],
-            'sentiment_score': article['sentiment_score'],
-            'sentiment_label': article['sentiment_label'],
+            'title': article.title,
+            'link': article.link,
+            'canonical_url': article.canonical_url,
+            'sentiment_score': article.sentiment_score,
+            'sentiment_label': article.sentiment_label,
             'score': score,
-            'published': article.get('published', 'N/A')
+            'published': article.published or 'N/A',
+            'weight': self._article_weight(article),
+            'cluster_id': article.cluster_id,
+            'language': article.language
         } for article in articles]
         
         if results:
             df = pd.DataFrame(results)
-            filename = f"detailed_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            # Named after the analysis timestamp, so saving the same results again replaces the file
+            run_time = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+            filename = f"detailed_results_{run_time.strftime('%Y%m%d_%H%M%S')}.csv"
             filepath = os.path.join(DATA_DIRECTORY, filename)
-            df.to_csv(filepath, index=False)
-            self.logger.info(f"")
+            # Written under a temporary name and renamed, so readers never see a partial file
+            tmp_file = f"{filepath}.tmp"
+            df.to_csv(tmp_file, index=False)
+            os.replace(tmp_file, filepath)
+            self.logger.info(f"Detailed results saved to {filepath}")
+
+    def close(self) -> None:
+        """
+        Release resources held by the analyzer, waiting for pending alerts to be delivered.
+        """
+        self.alert_system.close()
+        self.scraper.close()
+        self.dedup.close()
+        self.embedding_store.close()
+        self.journal.close()
+
+
+def run_producer(queue: WorkQueue, scheduler: FeedScheduler = None, scraper: ArticleScraper = None) -> None:
+    """
+    Poll the feeds and enqueue their relevant entries for the analysis workers: each configured feed
+    once, or continuously at adaptive intervals when a scheduler is given. Links already enqueued
+    (by previous polls or other feeds) are skipped by the queue.
+    Args:
+        queue (WorkQueue): Shared work queue.
+        scheduler (FeedScheduler, optional): Scheduler deciding when each feed is polled.
+        scraper (ArticleScraper, optional): Scraper used to read the feeds and resolve links.
+    """
+    logger = logging.getLogger(__name__)
+    scraper = scraper or ArticleScraper()
+    relevance_filter = RelevanceFilter()
+    language_router = LanguageRouter()
+
+    def enqueue(feed_url: str, entries: list) -> None:
+        candidates = scraper.select_candidates(relevance_filter, entries=entries, language_router=language_router)
+        added = queue.enqueue_many([(candidate['url'], candidate) for candidate in candidates])
+        logger.info(f"{added}/{len(candidates)} new articles enqueued from {feed_url}")
+
+    try:
+        if scheduler is None:
+            for feed_url in FEED_URLS:
+                enqueue(feed_url, scraper.parse_rss_feed(feed_url))
+            queue.prune()
+            return
+
+        while True:
+            for feed_url in scheduler.due():
+                entries = scheduler.observe(feed_url, scraper.parse_rss_feed(feed_url))
+                if entries:
+                    try:
+                        enqueue(feed_url, entries)
+                    except BaseException:
+                        scheduler.forget(feed_url, entries)
+                        raise
+                scheduler.save()
+            # The aggregator updates the running scores, a sharp drop speeds up polling
+            scheduler.notify_score(IncrementalScoreEngine().snapshot()['decayed_score'])
+            queue.prune()
+            logger.info(f"Queue: {queue.stats()}")
+            time.sleep(scheduler.seconds_until_next())
+    finally:
+        if scheduler is not None:
+            scheduler.save()
+        scraper.close()
+
             
 def main():
     """
@@ -187,14 +578,99 @@ def main():
     """
     parser = argparse.ArgumentParser(description='RepScan - Reputational Score Monitoring')
     parser.add_argument('--dashboard', action='store_true', help='Run Streamlit dashboard')
+    parser.add_argument('--api', action='store_true', help='Serve scores and article results as a JSON API')
+    parser.add_argument('--rebuild-scores', action='store_true',
+                        help='Rebuild the running score state from detailed results')
+    parser.add_argument('--run-id', help='Run identifier, resumes the journal of an interrupted run')
+    parser.add_argument('--schedule', action='store_true',
+                        help='Poll the configured feeds continuously at adaptive intervals')
+    parser.add_argument('--produce', action='store_true', help='Poll the feeds and enqueue articles for the workers')
+    parser.add_argument('--worker', action='store_true', help='Analyze articles from the work queue')
+    parser.add_argument('--aggregate', action='store_true', help='Fold the workers\' results into the scores')
+    parser.add_argument('--push', action='store_true',
+                        help='Enqueue articles from WebSub/webhook notifications (with --schedule, also poll the feeds)')
+    parser.add_argument('--queue', default=QUEUE_FILE, help='Work queue database, on a volume shared by all roles')
+    parser.add_argument('--scraper-mode', choices=['live', 'record', 'replay'], default=None,
+                        help='Fetch live, record fetched responses, or replay them from the archive')
+    parser.add_argument('--archive', default=None, help='Response archive directory for record/replay')
+    parser.add_argument('--replay-latency', type=float, default=None,
+                        help='Factor applied to recorded latency on replay (0 serves immediately)')
+    parser.add_argument('--backfill', metavar='PATH',
+                        help='Rescore archived articles from a JSONL or Parquet file')
+    parser.add_argument('--workers', type=int, default=None, help='Number of backfill worker processes')
+    parser.add_argument('--restart', action='store_true', help='Ignore the backfill checkpoint and start over')
     args = parser.parse_args()
+    setup_logging()
     
     if args.dashboard:
         from view.dashboard import run_dashboard
         run_dashboard()
+    elif args.api:
+        from view.api import run_api
+        run_api()
+    elif args.rebuild_scores:
+        engine = IncrementalScoreEngine()
+        engine.rebuild_from_results()
+        print(engine.snapshot())
+    elif args.backfill:
+        runner = BackfillRunner(args.backfill) if args.workers is None \
+            else BackfillRunner(args.backfill, workers=args.workers)
+        print(runner.run(restart=args.restart))
+    elif args.push:
+        receiver = PushReceiver(args.queue)
+        try:
+            if args.schedule:
+                # Polling as a fallback for missed notifications and feeds without a hub
+                receiver.start()
+                queue = WorkQueue(args.queue)
+                try:
+                    run_producer(queue, FeedScheduler())
+                finally:
+                    queue.close()
+            else:
+                receiver.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            receiver.stop()
+    elif args.produce:
+        queue = WorkQueue(args.queue)
+        try:
+            run_producer(queue, FeedScheduler() if args.schedule else None)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            queue.close()
     else:
-        analyzer = RepScanAnalyzer()
-        analyzer.run_analysis()
+        scraper = None
+        if args.scraper_mode is not None:
+            archive = None
+            if args.scraper_mode != 'live':
+                archive_args = {}
+                if args.archive is not None:
+                    archive_args['directory'] = args.archive
+                if args.replay_latency is not None:
+                    archive_args['latency_scale'] = args.replay_latency
+                archive = ResponseArchive(**archive_args)
+            scraper = ArticleScraper(mode=args.scraper_mode, archive=archive)
+        analyzer = RepScanAnalyzer(run_id=args.run_id, scraper=scraper)
+        queue = WorkQueue(args.queue) if args.worker or args.aggregate else None
+        try:
+            if args.worker:
+                analyzer.run_worker(queue)
+            elif args.aggregate:
+                print(analyzer.aggregate_results(queue))
+            elif args.schedule:
+                analyzer.run_scheduled(FeedScheduler())
+            else:
+                analyzer.run_analysis()
+        except KeyboardInterrupt:
+            if not (args.schedule or args.worker):
+                raise
+        finally:
+            analyzer.close()
+            if queue is not None:
+                queue.close()
         
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""
+Module name: conftest.py
+Author: Michele Grieco
+Description:
+    Shared pytest fixtures. The repository root is put on sys.path, so the tests import the application
+    modules the same way main.py does. smtp_server is an in-process SMTP stand-in: it accepts any sender and
+    recipient, keeps the received messages, and can answer DATA with a temporary failure a number of times.
+    websub_hub is a WebSub hub stand-in: it accepts subscription requests, verifies the intent of the
+    subscriber like a hub, and publishes signed content to the verified subscribers.
+Usage:
+    python -m pytest -q tests
+"""
+
+import email
+import hashlib
+import hmac
+import os
+import secrets
+import socketserver
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """
+    One SMTP session: enough of RFC 5321 for smtplib without authentication or TLS.
+    """
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self) -> None:
+        server = self.server
+        self.reply("220 localhost SMTP stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode('ascii', errors='replace').strip()[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply("250 localhost")
+            elif verb in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                with server.lock:
+                    failing = server.failures > 0
+                    if failing:
+                        server.failures -= 1
+                if failing:
+                    self.reply("451 Temporary failure, try again later")
+                    continue
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                with server.lock:
+                    server.messages.append(email.message_from_bytes(b"".join(lines)))
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    SMTP stand-in listening on a free local port.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.failures = 0  # DATA commands answered with a temporary failure
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+@pytest.fixture
+def smtp_server():
+    server = LocalSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class _HubHandler(BaseHTTPRequestHandler):
+    """
+    Subscription endpoint of the hub: requests are accepted with a 202 and their intent verified afterwards.
+    """
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode('utf-8')
+        params = {name: values[-1] for name, values in parse_qs(body).items()}
+        if not {'hub.mode', 'hub.topic', 'hub.callback'} <= params.keys():
+            self.send_response(400)
+            self.end_headers()
+            return
+        self.send_response(202)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        threading.Thread(target=self.server.verify_intent, args=(params,), daemon=True).start()
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class LocalWebSubHub(ThreadingHTTPServer):
+    """
+    WebSub hub stand-in listening on a free local port.
+    """
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), _HubHandler)
+        self.lock = threading.Lock()
+        self.subscribers = {}  # topic -> (callback URL, secret) of the verified subscriptions
+        self.verified = threading.Event()  # set after each verification of intent, failed or not
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def verify_intent(self, params: dict) -> None:
+        """
+        Ask the subscriber to confirm a request by echoing a random challenge.
+        """
+        challenge = secrets.token_hex(8)
+        response = requests.get(params['hub.callback'], params={
+            'hub.mode': params['hub.mode'],
+            'hub.topic': params['hub.topic'],
+            'hub.challenge': challenge,
+            'hub.lease_seconds': params.get('hub.lease_seconds', '3600')
+        }, timeout=5)
+        with self.lock:
+            if response.status_code == 200 and response.text == challenge:
+                if params['hub.mode'] == 'subscribe':
+                    self.subscribers[params['hub.topic']] = (params['hub.callback'], params.get('hub.secret'))
+                else:
+                    self.subscribers.pop(params['hub.topic'], None)
+        self.verified.set()
+
+    def publish(self, topic: str, body: bytes, content_type: str = 'application/atom+xml') -> requests.Response:
+        """
+        Deliver content to the subscriber of a topic, signed with its secret.
+        """
+        with self.lock:
+            callback, secret = self.subscribers[topic]
+        headers = {'Content-Type': content_type}
+        if secret:
+            headers['X-Hub-Signature'] = "sha256=" + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+        return requests.post(callback, data=body, headers=headers, timeout=5)
+
+
+@pytest.fixture
+def websub_hub():
+    hub = LocalWebSubHub()
+    thread = threading.Thread(target=hub.serve_forever, daemon=True)
+    thread.start()
+    yield hub
+    hub.shutdown()
+    hub.server_close()
@@ -0,0 +1,123 @@
+"""
+Module name: test_alert_dispatcher.py
+Author: Michele Grieco
+Description:
+    Tests of AlertDispatcher against the in-process SMTP stand-in: digest batching, retry with exponential
+    backoff, cooldown persisted across dispatcher instances, and escalation through the cooldown.
+Usage:
+    python -m pytest -q tests/test_alert_dispatcher.py
+"""
+
+import time
+import pytest
+from configuration.config import ALERT_ESCALATION_DELTA
+from tools.alert_dispatcher import AlertDispatcher
+
+
+@pytest.fixture
+def make_dispatcher(smtp_server, tmp_path):
+    dispatchers = []
+
+    def make(**kwargs):
+        options = {
+            'smtp_server': '127.0.0.1',
+            'smtp_port': smtp_server.port,
+            'sender': 'repscan@example.com',
+            'password': None,
+            'recipient': 'admin@example.com',
+            'use_tls': False,
+            'state_file': str(tmp_path / "alert_state.json"),
+            'cooldown': 3600,
+            'digest_window': 0.3,
+            'max_retries': 3,
+            'retry_backoff': 0.1
+        }
+        options.update(kwargs)
+        dispatcher = AlertDispatcher(**options)
+        dispatchers.append(dispatcher)
+        return dispatcher
+
+    yield make
+    for dispatcher in dispatchers:
+        dispatcher.close(timeout=5)
+
+
+def alert(company: str = "Enel", score: float = -0.5) -> dict:
+    return {'company': company, 'threshold': -0.3, 'score': score, 'articles': []}
+
+
+def test_alerts_within_the_digest_window_are_sent_as_one_email(make_dispatcher, smtp_server):
+    dispatcher = make_dispatcher()
+    for company in ("Enel", "Eni", "Terna"):
+        assert dispatcher.submit(alert(company))
+    assert dispatcher.flush(timeout=5)
+
+    assert len(smtp_server.messages) == 1
+    message = smtp_server.messages[0]
+    assert message['Subject'] == "[ALERT] 3 reputation alert(s)"
+    body = message.get_payload()[0].get_payload(decode=True).decode('utf-8')
+    for company in ("Enel", "Eni", "Terna"):
+        assert company in body
+
+
+def test_temporary_failures_are_retried_with_exponential_backoff(make_dispatcher, smtp_server):
+    smtp_server.failures = 2
+    dispatcher = make_dispatcher(digest_window=0)
+    start = time.monotonic()
+    assert dispatcher.submit(alert())
+    assert dispatcher.flush(timeout=5)
+
+    assert len(smtp_server.messages) == 1
+    assert smtp_server.failures == 0
+    # Waits of 0.1 s and 0.2 s before the second and third attempts
+    assert time.monotonic() - start >= 0.3
+
+
+def test_alert_is_dropped_after_the_last_retry(make_dispatcher, smtp_server):
+    smtp_server.failures = 10
+    dispatcher = make_dispatcher(digest_window=0, max_retries=1, retry_backoff=0.01)
+    assert dispatcher.submit(alert())
+    assert dispatcher.flush(timeout=5)
+
+    assert smtp_server.messages == []
+    assert smtp_server.failures == 8
+    # Not recorded as sent, so the next run alerts again
+    assert not dispatcher.is_suppressed(alert())
+
+
+def test_cooldown_is_persisted_across_dispatchers(make_dispatcher, smtp_server):
+    first = make_dispatcher(digest_window=0)
+    assert first.submit(alert())
+    assert first.flush(timeout=5)
+    first.close(timeout=5)
+
+    second = make_dispatcher(digest_window=0)
+    assert not second.submit(alert())
+    assert second.flush(timeout=5)
+    assert len(smtp_server.messages) == 1
+    # Another company is not in cooldown
+    assert second.submit(alert("Eni"))
+    assert second.flush(timeout=5)
+    assert len(smtp_server.messages) == 2
+
+
+def test_escalation_bypasses_the_cooldown(make_dispatcher, smtp_server):
+    dispatcher = make_dispatcher(digest_window=0)
+    assert dispatcher.submit(alert(score=-0.4))
+    assert dispatcher.flush(timeout=5)
+
+    assert not dispatcher.submit(alert(score=-0.4 - ALERT_ESCALATION_DELTA / 2))
+    assert dispatcher.submit(alert(score=-0.4 - ALERT_ESCALATION_DELTA * 2))
+    assert dispatcher.flush(timeout=5)
+    assert len(smtp_server.messages) == 2
+
+
+def test_cooldown_expires(make_dispatcher, smtp_server):
+    dispatcher = make_dispatcher(digest_window=0, cooldown=0.2)
+    assert dispatcher.submit(alert())
+    assert dispatcher.flush(timeout=5)
+    assert not dispatcher.submit(alert())
+    time.sleep(0.3)
+    assert dispatcher.submit(alert())
+    assert dispatcher.flush(timeout=5)
+    assert len(smtp_server.messages) == 2
@@ -0,0 +1,93 @@
+"""
+Module name: test_fetcher.py
+Author: Michele Grieco
+Description:
+    Tests of ResilientFetcher against a local HTTP server reached under two host names (localhost and
+    127.0.0.1), so that a redirect crosses hosts: failures after a redirect are charged to the host that
+    answered them, and the circuit of the redirecting host stays closed.
+Usage:
+    python -m pytest -q tests/test_fetcher.py
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from tools.fetcher import CircuitOpenError, ResilientFetcher
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    /go/<path> redirects to 127.0.0.1/<path>, /fail answers 503 and /ok answers 200.
+    """
+
+    def do_GET(self) -> None:
+        port = self.server.server_address[1]
+        if self.path.startswith('/go/'):
+            self.send_response(302)
+            self.send_header('Location', f"http://127.0.0.1:{port}/{self.path[len('/go/'):]}")
+            body = b""
+        elif self.path == '/ok':
+            self.send_response(200)
+            body = b"ok"
+        else:
+            self.send_response(503)
+            body = b"unavailable"
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_address[1]}", f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    fetcher = ResilientFetcher(rate=1000, burst=1000, host_limits={}, max_retries=1, backoff_base=0.01,
+                               backoff_max=0.01, failure_threshold=3, cooldown=3600,
+                               state_file=str(tmp_path / "circuit_state.json"))
+    yield fetcher
+    fetcher.close()
+
+
+def test_redirect_is_followed_with_its_history(fetcher, server):
+    source, target = server
+    response = fetcher.get(f"{source}/go/ok")
+    assert response.status_code == 200
+    assert response.url == f"{target}/ok"
+    assert [hop.status_code for hop in response.history] == [302]
+
+    response = fetcher.get(f"{source}/go/ok", allow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers['Location'] == f"{target}/ok"
+
+
+def test_failures_after_a_redirect_open_the_circuit_of_the_target_host(fetcher, server):
+    source, target = server
+    for _ in range(3):
+        assert fetcher.get(f"{source}/go/fail").status_code == 503
+
+    assert fetcher.circuits['127.0.0.1']['opened_at'] is not None
+    assert 'localhost' not in fetcher.circuits
+    # The redirecting host is still reachable, the failing one is skipped, also after a redirect
+    assert fetcher.get(f"{source}/ok").status_code == 200
+    with pytest.raises(CircuitOpenError):
+        fetcher.get(f"{target}/ok")
+    with pytest.raises(CircuitOpenError):
+        fetcher.get(f"{source}/go/ok")
+    assert 'localhost' not in fetcher.circuits
+
+    # The persisted state only blocks the failing host
+    reloaded = ResilientFetcher(state_file=fetcher.state_file)
+    assert set(reloaded.circuits) == {'127.0.0.1'}
+    reloaded.close()
@@ -0,0 +1,92 @@
+"""
+Module name: test_lexicon.py
+Author: Michele Grieco
+Description:
+    Tests of LexiconSentimentEngine: terms match whole words only ("buono" is not found inside "buonuscita"),
+    prefix terms match the words they start, and a negator flips the polarity of the terms that follow it
+    within the negation window and the same clause. Most tests use a small lexicon written to a temporary
+    file, the shipped lexicon is checked on the same cases.
+Usage:
+    python -m pytest -q tests/test_lexicon.py
+"""
+
+import pytest
+from tools.lexicon import LexiconSentimentEngine
+
+LEXICON = "# term\tweight\nbuono\t0.5\nottim*\t0.8\nscandal*\t-0.9\nperdita\t-0.6\ncrescita netta\t0.7\n"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    lexicon_file = tmp_path / "lexicon.tsv"
+    lexicon_file.write_text(LEXICON, encoding='utf-8')
+    return LexiconSentimentEngine(str(lexicon_file), negators=("non", "mai", "nessun*"), negation_window=3)
+
+
+def matched(engine: LexiconSentimentEngine, text: str) -> float:
+    """
+    Sum of the absolute weights of the lexicon terms matched in a text.
+    """
+    return float(engine.analyze_batch([text])[1][0])
+
+
+def test_terms_match_whole_words_only(engine):
+    assert engine.score("Un buono risultato") == 1.0
+    assert engine.score("Buono, anzi BUONO!") == 1.0
+    # "buono" is not found inside longer words
+    for text in ["La buonuscita del manager", "buonissimo", "abbuono", "buono_sconto", "buono2"]:
+        assert matched(engine, text) == 0.0, text
+        assert engine.score(text) == 0.0, text
+    # Terms of several words match as a whole
+    assert matched(engine, "una crescita netta dei ricavi") == pytest.approx(0.7)
+    assert matched(engine, "una crescita nettamente inferiore") == 0.0
+
+
+def test_prefix_terms_match_the_words_they_start(engine):
+    assert engine.score("Risultati ottimi") == 1.0
+    assert matched(engine, "Un certo ottimismo") == pytest.approx(0.8)
+    assert engine.score("Lo scandalo delle bollette") == -1.0
+    assert engine.score("Prezzi scandalosamente alti") == -1.0
+    # A prefix is anchored on the start of a word
+    assert matched(engine, "Un quadro pessimo e antiscandalistico") == 0.0
+
+
+def test_accents_and_case_are_ignored(tmp_path):
+    lexicon_file = tmp_path / "lexicon.tsv"
+    lexicon_file.write_text("perché no\t-0.5\nqualità\t0.5\n", encoding='utf-8')
+    engine = LexiconSentimentEngine(str(lexicon_file), negators=(), negation_window=3)
+    assert engine.score("PERCHE NO") == -1.0
+    assert engine.score("Qualita del servizio") == 1.0
+
+
+def test_negator_flips_the_polarity(engine):
+    assert engine.score("Il risultato non buono") == -1.0
+    assert engine.score("non è buono") == -1.0
+    assert engine.score("Non c'è stata nessuna perdita") == 1.0
+    assert engine.score("Mai uno scandalo") == 1.0
+    # Every term within the window is negated
+    assert engine.score("non buono né ottimo") == -1.0
+    # Negated and plain terms of the same text
+    assert engine.score("non buono, ma alla fine ottimo") == pytest.approx((-0.5 + 0.8) / 1.3)
+
+
+def test_negation_stops_at_the_window_and_at_the_clause(engine):
+    # Within three words of the negator
+    assert engine.score("non ha dato buono") == -1.0
+    # Three words between the negator and the term are too many
+    assert engine.score("non ha dato un buono") == 1.0
+    # A clause break ends the negation
+    assert engine.score("Non lo sapevo. Buono il trimestre") == 1.0
+    assert engine.score("non male; buono") == 1.0
+    # A negator does not negate itself, "non" inside a word is not a negator
+    assert engine.score("nonostante tutto buono") == 1.0
+
+
+def test_shipped_lexicon():
+    engine = LexiconSentimentEngine()
+    assert engine.score("Un buono risultato per Enel") > 0
+    assert matched(engine, "La buonuscita dell'amministratore") == 0.0
+    assert engine.score("Il risultato non è buono") < 0
+    assert engine.score("Enel non ha registrato perdite nel trimestre") > 0
+    assert engine.score("Scandalo sulle bollette") < 0
+    assert list(engine.score_batch(["", None, "testo neutro"])) == [0.0, 0.0, 0.0]
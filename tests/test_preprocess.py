@@ -0,0 +1,112 @@
+"""
+Module name: test_preprocess.py
+Author: Michele Grieco
+Description:
+    Tests of the text cleaning of preprocessing/preprocess.py: clean_text and clean_batch must return exactly
+    what the original step-by-step cleaning returns (BeautifulSoup on every text, URL removal, NFKD, special
+    characters, whitespace) on HTML, URLs, entities, whitespace, non-ASCII text and the plain texts for which
+    the parse is skipped. The cleaning does not need spaCy, so where it is not installed the module is imported
+    with a placeholder; only the stopword test needs the real library. benchmarks/benchmark_preprocess.py
+    times the cleaning.
+Usage:
+    python -m pytest -q tests/test_preprocess.py
+"""
+
+import importlib.util
+import random
+import re
+import sys
+import types
+import unicodedata
+from unittest import mock
+import pytest
+from bs4 import BeautifulSoup
+
+SPACY_AVAILABLE = importlib.util.find_spec("spacy") is not None
+
+if SPACY_AVAILABLE:
+    from benchmarks.benchmark_preprocess import EDGE_CASES, make_texts
+    from preprocessing import preprocess
+else:
+    # Placeholder of the names preprocess.py reads from spaCy at import time
+    spacy_stub = types.ModuleType("spacy")
+    spacy_stub.language = types.SimpleNamespace(Language=object)
+    download_stub = types.ModuleType("spacy.cli.download")
+    download_stub.download = None
+    with mock.patch.dict(sys.modules, {"spacy": spacy_stub, "spacy.cli": types.ModuleType("spacy.cli"),
+                                       "spacy.cli.download": download_stub}):
+        from benchmarks.benchmark_preprocess import EDGE_CASES, make_texts
+        from preprocessing import preprocess
+
+
+def reference_clean(text: str) -> str:
+    """
+    The cleaning steps one by one, as TextPreprocessor.preprocess originally ran them.
+    """
+    if not text:
+        return ""
+    text = BeautifulSoup(text, "html.parser").get_text()
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    text = unicodedata.normalize('NFKD', text)
+    text = re.sub(r'[^\w\s\.,;:!?]', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+CASES = {
+    'html': [
+        "<p>Enel <b>chiude</b> l'anno</p>", "<div><p></p></div>", "<a href='https://enel.it'>link</a> testo",
+        "<script>var x = 1;</script>Enel", "<br/>riga<br>nuova", "1 < 2 e 3 > 2", "<p>non chiuso"
+    ],
+    'urls': [
+        "vedi https://www.enel.it/news?id=1 ora", "(http://x.it/a)", "www.enel.it, e altro", "wwwXenel",
+        "HTTP://MAIUSCOLO.it", "a @https://t.co/x# b", "vedi:http://x.it,ora", "http", "www."
+    ],
+    'entities': [
+        "&amp;", "1&lt;2 &gt; 0 &nbsp;ok", "<b>Enel</b>&mdash;utili", "perch&eacute; &egrave;", "&#233;&#x20AC;",
+        "AT&T", "&unknown; entity", "a & b"
+    ],
+    'whitespace': [
+        "", " ", "\n\t ", "   Enel   ", "linea\r\nnuova\x0bvert\x0cff", "tab\tseparated\tvalues",
+        "a\u00a0b", "a\u2009b\u202fc", "a\u200bb", "\u3000ideografico\u3000", "fine\u2029paragrafo"
+    ],
+    'plain': [
+        # No tags or entities: the HTML parse is skipped
+        "Enel chiude l'anno in utile", "a", "Enel!!! ???", "1 + 1 = 2", "prezzo > costo", "50% in più",
+        "  spazi  \t misti \n ", "riga\rritorno", "riga\r\nfinestre", "\u00a0Enel\u00a0", "fine.\u2028riga"
+    ],
+    'only_whitespace': [
+        # Whitespace-only texts are always parsed
+        "\r", "\r\n", " \r ", "\t", "\n\n", "\x0b\x0c", "\u00a0", "\u3000", "\u2028\u2029", " \x85 "
+    ],
+    'non_ascii': [
+        "caffè perché così", "ﬁnanza ﬂusso", "x² ½ ①", "Ｅｎｅｌ", "😀 Enel 👍🏽 ok", "« citazione » “virgolette”",
+        "– trattino — lungo…", "٣ أرقام", "日本語のテキスト", "ǅ ǈ ǋ", "prezzo: 10€ (+5%)", "Ünïcödé Ñ"
+    ]
+}
+
+
+@pytest.mark.parametrize("text", [text for texts in CASES.values() for text in texts])
+def test_clean_text_matches_the_step_by_step_cleaning(text):
+    assert preprocess.clean_text(text) == reference_clean(text)
+
+
+def test_clean_batch_matches_the_step_by_step_cleaning():
+    texts = EDGE_CASES + make_texts(random.Random(7), 500, 60)
+    assert preprocess.clean_batch(texts, workers=1) == [reference_clean(text) for text in texts]
+
+
+@pytest.mark.skipif(not SPACY_AVAILABLE, reason="spaCy is not installed")
+def test_stopwords_are_removed_after_cleaning(monkeypatch):
+    import spacy
+    # A blank Italian pipeline has the stopword list, without downloading a model
+    monkeypatch.setattr(preprocess.spacy, 'load', lambda name: spacy.blank("it"))
+    preprocessor = preprocess.TextPreprocessor()
+    texts = ["<p>Enel e la rete</p>", "", "Gli utili di Enel"]
+
+    tokens = preprocessor.preprocess(texts[0], remove_stops=True).split()
+    assert "Enel" in tokens and "rete" in tokens
+    assert "la" not in tokens
+    assert preprocessor.preprocess_batch(texts, remove_stops=True, workers=1) == [
+        preprocessor.preprocess(text, remove_stops=True) for text in texts
+    ]
@@ -0,0 +1,191 @@
+"""
+Module name: test_push_ingest.py
+Author: Michele Grieco
+Description:
+    Tests of PushReceiver against the WebSub hub stand-in: subscription and verification of intent, signed
+    Atom notifications enqueued for the workers, redeliveries and bad signatures, and notifications staged
+    durably until their entries are enqueued.
+Usage:
+    python -m pytest -q tests/test_push_ingest.py
+"""
+
+import hashlib
+import hmac
+import json
+import time
+import pytest
+from tools import push_ingest
+from tools.push_ingest import PushReceiver
+from tools.relevance import RelevanceFilter
+from tools.scraper import ArticleScraper
+from tools.work_queue import WorkQueue
+
+SECRET = "test-secret"
+TOPIC = "https://example.com/feed.atom"
+
+ATOM_FEED = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Notizie</title>
+  <id>urn:repscan:test</id>
+  <updated>2026-10-19T08:00:00Z</updated>
+  <entry>
+    <title>Enel presenta il nuovo piano per la rete elettrica</title>
+    <link href="https://example.com/enel-piano"/>
+    <id>urn:repscan:test:1</id>
+    <updated>2026-10-19T08:00:00Z</updated>
+    <summary>Il gruppo ha annunciato che gli investimenti nella rete saranno di oltre dieci miliardi.</summary>
+  </entry>
+  <entry>
+    <title>Le previsioni del tempo per il fine settimana</title>
+    <link href="https://example.com/meteo"/>
+    <id>urn:repscan:test:2</id>
+    <updated>2026-10-19T08:00:00Z</updated>
+    <summary>Sono attese piogge al nord e sole con temperature miti nel resto della penisola.</summary>
+  </entry>
+</feed>
+"""
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def signed(body: bytes, secret: str = SECRET) -> dict:
+    return {'X-Hub-Signature': "sha256=" + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()}
+
+
+def queued(queue_file: str) -> dict:
+    work_queue = WorkQueue(queue_file)
+    try:
+        rows = work_queue.conn.execute("SELECT key, payload FROM tasks ORDER BY id").fetchall()
+        return {key: json.loads(payload) for key, payload in rows}
+    finally:
+        work_queue.close()
+
+
+@pytest.fixture
+def queue_file(tmp_path, monkeypatch):
+    # The scraper's link cache goes to the data directory of the working directory
+    monkeypatch.chdir(tmp_path)
+    # No audit sampling of the dropped entries, so the selection is deterministic
+    monkeypatch.setattr(push_ingest, 'RelevanceFilter', lambda: RelevanceFilter(sample_rate=0))
+    return str(tmp_path / "work_queue.db")
+
+
+@pytest.fixture
+def make_receiver(queue_file):
+    receivers = []
+
+    def make(**kwargs):
+        options = {'queue_file': queue_file, 'host': '127.0.0.1', 'port': 0, 'secret': SECRET,
+                   'subscriptions': {}, 'callback_url': None}
+        options.update(kwargs)
+        receiver = PushReceiver(**options)
+        receivers.append(receiver)
+        return receiver
+
+    yield make
+    for receiver in receivers:
+        receiver.stop()
+
+
+def test_hub_subscription_and_signed_atom_notification(make_receiver, websub_hub, queue_file):
+    receiver = make_receiver(subscriptions={TOPIC: websub_hub.url})
+    receiver.start()
+    receiver.callback_url = f"http://127.0.0.1:{receiver.port}/websub"
+
+    assert receiver.subscribe(TOPIC)
+    assert websub_hub.verified.wait(5)
+    assert TOPIC in websub_hub.subscribers
+
+    response = websub_hub.publish(TOPIC, ATOM_FEED)
+    assert response.status_code == 202
+    assert response.text == "Accepted"
+    assert wait_for(lambda: receiver.report().get('enqueued') == 1)
+
+    tasks = queued(queue_file)
+    # The weather entry does not mention the company and is dropped by the prefilter
+    assert list(tasks) == ["https://example.com/enel-piano"]
+    task = tasks["https://example.com/enel-piano"]
+    assert task['title'] == "Enel presenta il nuovo piano per la rete elettrica"
+    assert task['language'] == "it"
+    assert not task['audit_sample']
+
+    # A redelivery is recognized by its digest
+    response = websub_hub.publish(TOPIC, ATOM_FEED)
+    assert response.status_code == 202
+    assert response.text == "Already received"
+    assert receiver.report()['redelivered'] == 1
+    assert len(queued(queue_file)) == 1
+
+
+def test_unknown_topic_is_not_verified(make_receiver, websub_hub):
+    receiver = make_receiver(subscriptions={TOPIC: websub_hub.url})
+    receiver.start()
+    assert receiver.verify_intent('/websub', {'hub.mode': ['subscribe'], 'hub.topic': ["https://example.com/other"],
+                                              'hub.challenge': ["abc"]})[0] == 404
+    assert receiver.verify_intent('/websub', {'hub.mode': ['subscribe'], 'hub.topic': [TOPIC],
+                                              'hub.challenge': ["abc"]}) == (200, "abc")
+
+
+def test_notification_with_a_bad_signature_is_refused(make_receiver, queue_file):
+    receiver = make_receiver()
+    body = json.dumps({'urls': ["https://example.com/article"]}).encode('utf-8')
+    assert receiver.receive('/webhook', signed(body, "wrong-secret"), body)[0] == 403
+    assert receiver.receive('/webhook', {}, body)[0] == 403
+    assert receiver.report() == {'rejected': 2}
+    work_queue = WorkQueue(queue_file)
+    assert work_queue.stats()['notifications_pending'] == 0
+    work_queue.close()
+
+
+def test_acknowledged_notification_survives_a_restart(make_receiver, queue_file):
+    body = json.dumps({'urls': ["https://example.com/article"]}).encode('utf-8')
+    # Received but not enqueued: the receiver stops before its ingest thread runs
+    assert make_receiver().receive('/webhook', signed(body), body) == (202, "Accepted")
+    assert queued(queue_file) == {}
+
+    receiver = make_receiver()
+    receiver.start()
+    assert wait_for(lambda: "https://example.com/article" in queued(queue_file))
+    # The digest is kept after the entries are enqueued
+    assert receiver.receive('/webhook', signed(body), body) == (202, "Already received")
+
+
+def test_failed_notification_stays_staged(make_receiver, queue_file, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("resolver unavailable")
+
+    monkeypatch.setattr(ArticleScraper, 'select_candidates', broken)
+    receiver = make_receiver()
+    receiver.start()
+    body = json.dumps({'urls': ["https://example.com/article"]}).encode('utf-8')
+    assert receiver.receive('/webhook', signed(body), body) == (202, "Accepted")
+    assert wait_for(lambda: receiver.report().get('failed') == 1)
+
+    work_queue = WorkQueue(queue_file)
+    assert work_queue.stats()['notifications_pending'] == 1
+    work_queue.close()
+    assert queued(queue_file) == {}
+
+
+def test_notification_dropped_after_the_last_attempt_is_accepted_again(queue_file):
+    work_queue = WorkQueue(queue_file, max_attempts=2, retry_backoff=0)
+    payload = {'source': '/webhook', 'entries': [], 'urls': []}
+    assert work_queue.stage_notification("digest", payload)
+    assert not work_queue.stage_notification("digest", payload)
+
+    notification, = work_queue.staged_notifications()
+    assert not work_queue.fail_notification(notification, "error")
+    notification, = work_queue.staged_notifications()
+    assert notification['attempts'] == 1
+    assert work_queue.fail_notification(notification, "error")
+
+    assert work_queue.staged_notifications() == []
+    assert work_queue.stage_notification("digest", payload)
+    work_queue.close()
@@ -3,9 +3,10 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import logging
 from datetime import datetime
+from typing import Optional
 from configuration.config import (
     EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_RECIPIENT,
-    SMTP_SERVER, SMTP_PORT, ALERT_THRESHOLD, TARGET_COMPANY
+    SMTP_SERVER, SMTP_PORT, ALERT_THRESHOLD, TARGET_COMPANY, ALERT_MAX_STORIES, STORY_GROWTH_HOURS
 )
 
 
@@ -14,47 +15,131 @@ class AlertSystem:
     Class for managing reputation score alerts via email
     """
     
-    def __init__(self) -> None:
+    def __init__(self, dispatcher=None, detector=None) -> None:
         """
         Initialize the AlertSystem with logging configuration
+        
+        Args:
+            dispatcher (AlertDispatcher, optional): Background dispatcher used by dispatch_alert
+            detector (ScoreAnomalyDetector, optional): Detector of significant drops of the score series
         """
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        self.dispatcher = dispatcher
+        self.detector = detector
+        self.last_check = None
+        if dispatcher is not None:
+            dispatcher.message_builder = self.create_digest_message
 
     def should_send_alert(self, score: float) -> bool:
         """
         Determine if an alert should be sent based on the reputational score.
+        With an anomaly detector, alerts fire on a significant drop of the score series,
+        and on the alert threshold only until the detector has a baseline.
+        The score is not recorded, see record_score.
         
         Args:
             score (float): Reputational score to evaluate
             
         Returns:
-            bool: True if the score is below the alert threshold, False otherwise
+            bool: True if an alert should be sent, False otherwise
         """
-        return score < ALERT_THRESHOLD
+        if self.detector is None:
+            return score < ALERT_THRESHOLD
+        self.last_check = self.detector.check(score)
+        if not self.last_check['ready']:
+            return score < ALERT_THRESHOLD
+        return self.last_check['anomaly']
 
-    def create_alert_message(self, score: float, articles: list) -> str:
+    def record_score(self, score: float, key: Optional[str] = None) -> Optional[dict]:
+        """
+        Fold the score of a run into the anomaly detector and persist its state.
+        
+        Args:
+            score (float): Reputational score of the run
+            key (str, optional): Identifier of the score; the last score recorded with the same key is not folded in again
+            
+        Returns:
+            dict: Assessment of the score (see ScoreAnomalyDetector.check), None without a detector
+                or if the score was already recorded
+        """
+        if self.detector is None:
+            return None
+        if key is not None and self.detector.state.get('last_key') == key:
+            self.logger.info(f"Score {key} already folded into the anomaly baseline, skipped")
+            return None
+        result = self.detector.update(score)
+        if key is not None:
+            self.detector.state['last_key'] = key
+        self.detector.save()
+        if result['anomaly']:
+            self.logger.warning(
+                f"Significant drop of the reputation score ({result['reason']}): {score:.2f} against "
+                f"{result['mean']:.2f} ± {result['std']:.2f}, z-score {result['zscore']:.1f}"
+            )
+        return result
+
+    def create_alert_message(self, score: float, articles: list,
+                             company: str = TARGET_COMPANY, threshold: float = ALERT_THRESHOLD,
+                             stories: Optional[list] = None, anomaly: Optional[dict] = None) -> str:
         """
         Create an HTML alert message for low reputational scores.
         
         Args:
             score (float): Reputational score that triggered the alert
             articles (list): List of dictionaries containing analyzed articles
+            company (str): Company the alert refers to
+            threshold (float): Threshold that was crossed
+            stories (list, optional): Negative stories (see EmbeddingStore.stories), listed instead of the articles
+            anomaly (dict, optional): Assessment of the anomaly detector that fired the alert
             
         Returns:
             str: HTML formatted alert message
         """
-        score_str = f"{score:.2f}"
+        html = self._html_header("⚠️ Alert - Low Reputational Score")
+        html += self._render_alert(score, articles, company, threshold, stories, anomaly)
+        html += self._html_footer()
+        return html
 
-        negative_articles = sorted(
-            [a for a in articles if a.get('sentiment_score', 0) < 0],
-            key=lambda x: x.get('sentiment_score', 0)
-        )
+    def create_digest_message(self, alerts: list) -> tuple:
+        """
+        Create a single email covering one or more alerts.
+        
+        Args:
+            alerts (list): List of alert dictionaries with 'company', 'threshold', 'score' and 'articles'
+            
+        Returns:
+            tuple: (subject, html) of the email
+        """
+        if len(alerts) == 1:
+            alert = alerts[0]
+            subject = f"[ALERT] Low Reputation Score for {alert['company']}: {alert['score']:.2f}"
+            html = self.create_alert_message(alert['score'], alert.get('articles', []),
+                                             alert['company'], alert['threshold'], alert.get('stories'),
+                                             alert.get('anomaly'))
+            return subject, html
 
-        html = f"""
+        companies = ", ".join(sorted({alert['company'] for alert in alerts}))
+        subject = f"[ALERT] Reputation digest: {len(alerts)} alerts ({companies})"
+        html = self._html_header(f"⚠️ Reputation Digest - {len(alerts)} alerts")
+        for alert in sorted(alerts, key=lambda a: a['score']):
+            html += self._render_alert(alert['score'], alert.get('articles', []),
+                                       alert['company'], alert['threshold'], alert.get('stories'),
+                                       alert.get('anomaly'))
+        html += self._html_footer()
+        return subject, html
+
+    @staticmethod
+    def _html_header(heading: str) -> str:
+        """
+        Build the opening of an alert email.
+        
+        Args:
+            heading (str): Main heading of the email
+            
+        Returns:
+            str: HTML head and heading
+        """
+        return f"""
         <html>
         <head>
             <style>
@@ -64,19 +149,73 @@ class AlertSystem:
                 .score {{ font-weight: bold; color: #dc3545; }}
                 .title {{ font-weight: bold; }}
                 .link {{ color: #0066cc; }}
+                .story {{ margin-bottom: 20px; padding: 10px; border-left: 4px solid #dc3545; background-color: #fdf2f3; }}
             </style>
         </head>
         <body>
-            <h2>⚠️ Alert - Low Reputational Score</h2>
+            <h2>{heading}</h2>
+        """
+
+    @staticmethod
+    def _html_footer() -> str:
+        """
+        Build the closing of an alert email.
+        
+        Returns:
+            str: HTML footer
+        """
+        return """
+            <p>This is an automatic message generated by RepScan. Please do not reply to this email.</p>
+        </body>
+        </html>
+        """
+
+    @staticmethod
+    def _render_alert(score: float, articles: list, company: str, threshold: float,
+                      stories: Optional[list] = None, anomaly: Optional[dict] = None) -> str:
+        """
+        Render the body section of a single alert.
+        
+        Args:
+            score (float): Reputational score that triggered the alert
+            articles (list): List of dictionaries containing analyzed articles
+            company (str): Company the alert refers to
+            threshold (float): Threshold that was crossed
+            stories (list, optional): Negative stories, listed instead of the articles
+            anomaly (dict, optional): Assessment of the anomaly detector that fired the alert
+            
+        Returns:
+            str: HTML section describing the alert
+        """
+        score_str = f"{score:.2f}"
+        if anomaly and anomaly.get('reason') == 'zscore':
+            cause = (f"{abs(anomaly['zscore']):.1f} standard deviations below its recent average "
+                     f"({anomaly['mean']:.2f} ± {anomaly['std']:.2f})")
+        elif anomaly and anomaly.get('reason') == 'cusum':
+            cause = (f"the latest of several runs below its recent average "
+                     f"({anomaly['mean']:.2f} ± {anomaly['std']:.2f})")
+        else:
+            cause = f"under the alert threshold ({threshold})"
+
+        negative_articles = sorted(
+            [a for a in articles if a.get('sentiment_score', 0) < 0],
+            key=lambda x: x.get('sentiment_score', 0)
+        )
+
+        html = f"""
             <div class="alert">
-                <p>The reputational score for <strong>{TARGET_COMPANY}</strong> is <span class="score">{score_str}</span>, 
-                which is under the alert threshold ({ALERT_THRESHOLD}).</p>
+                <p>The reputational score for <strong>{company}</strong> is <span class="score">{score_str}</span>, 
+                which is {cause}.</p>
                 <p>Date and time of the analysis: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
             </div>
-            
-            <h3>Negative articles detected:</h3>
         """
 
+        if stories:
+            return html + AlertSystem._render_stories(stories)
+
+        html += """
+            <h3>Negative articles detected:</h3>
+        """
         for article in negative_articles[:5]:
             sentiment_score = article.get('sentiment_score', 0)
             sentiment_label = article.get('sentiment_label', 'N/A')
@@ -91,26 +230,56 @@ class AlertSystem:
             </div>
             """
 
-        html += """
-            <p>This is an automatic message generated by RepScan. Please do not reply to this email.</p>
-        </body>
-        </html>
-        """
+        return html
 
+    @staticmethod
+    def _render_stories(stories: list) -> str:
+        """
+        Render the negative stories of an alert, with their size and growth.
+        
+        Args:
+            stories (list): Story dictionaries as returned by EmbeddingStore.stories
+            
+        Returns:
+            str: HTML section listing the stories
+        """
+        html = """
+            <h3>Negative stories detected:</h3>
+        """
+        for story in stories[:ALERT_MAX_STORIES]:
+            articles = "".join(
+                f'<li><a href="{article["link"]}" class="link">{article["title"]}</a> '
+                f'({article["sentiment_score"]:.2f})</li>'
+                for article in story['articles']
+            )
+            html += f"""
+            <div class="story">
+                <p class="title">{story['title']}</p>
+                <p>{story['size']} articles since {story['first_seen']}, {story['recent']} in the last
+                {STORY_GROWTH_HOURS}h ({story['growth_rate']:.1f}/h). Average sentiment:
+                <span class="score">{story['sentiment_score']:.2f}</span></p>
+                <ul>{articles}</ul>
+            </div>
+            """
         return html
 
-    def send_alert_email(self, score: float, articles: list) -> bool:
+    def send_alert_email(self, score: float, articles: list, stories: Optional[list] = None,
+                         triggered: Optional[bool] = None) -> bool:
         """
         Send an alert email when the reputation score is too low
         
         Args:
             score (float): Reputation score
             articles (list): List of dictionaries containing analyzed articles
+            stories (list, optional): Negative stories listed instead of the articles
+            triggered (bool, optional): Result of should_send_alert for this score, if already checked
             
         Returns:
             bool: True if email was sent successfully, False otherwise
         """
-        if not self.should_send_alert(score):
+        if triggered is None:
+            triggered = self.should_send_alert(score)
+        if not triggered:
             self.logger.info("Reputation score above alert threshold, no alert sent.")
             return False
 
@@ -128,7 +297,8 @@ class AlertSystem:
             msg['To'] = EMAIL_RECIPIENT
 
             # Create message body
-            html_content = self.create_alert_message(score, articles)
+            anomaly = self.last_check if self.last_check is not None and self.last_check['anomaly'] else None
+            html_content = self.create_alert_message(score, articles, stories=stories, anomaly=anomaly)
             msg.attach(MIMEText(html_content, 'html'))
 
             # Send the email
@@ -141,4 +311,61 @@ class AlertSystem:
             return True
         except Exception as e:
             self.logger.error(f"Error sending alert: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def dispatch_alert(self, score: float, articles: list, company: str = TARGET_COMPANY,
+                       stories: Optional[list] = None, triggered: Optional[bool] = None) -> bool:
+        """
+        Queue an alert on the background dispatcher instead of sending it synchronously.
+        Falls back to send_alert_email when no dispatcher is configured.
+        
+        Args:
+            score (float): Reputation score
+            articles (list): List of dictionaries containing analyzed articles
+            company (str): Company the score refers to
+            stories (list, optional): Negative stories listed instead of the articles
+            triggered (bool, optional): Result of should_send_alert for this score, checked here if None
+            
+        Returns:
+            bool: True if the alert was queued (or sent), False otherwise
+        """
+        if triggered is None:
+            triggered = self.should_send_alert(score)
+        if self.dispatcher is None:
+            return self.send_alert_email(score, articles, stories, triggered=triggered)
+
+        if not triggered:
+            self.logger.info("Reputation score above alert threshold, no alert sent.")
+            return False
+
+        # Keep only what the message needs, so queued alerts don't pin full articles in memory
+        negative_articles = sorted(
+            [a for a in articles if a.get('sentiment_score', 0) < 0],
+            key=lambda x: x.get('sentiment_score', 0)
+        )[:5]
+        alert = {
+            'company': company,
+            'threshold': ALERT_THRESHOLD,
+            'score': score,
+            'articles': [{
+                'title': a.get('title', 'Title not available'),
+                'link': a.get('link', '#'),
+                'sentiment_score': a.get('sentiment_score', 0),
+                'sentiment_label': a.get('sentiment_label', 'N/A')
+            } for a in negative_articles]
+        }
+        if stories:
+            alert['stories'] = stories[:ALERT_MAX_STORIES]
+        if self.last_check is not None and self.last_check['anomaly']:
+            alert['anomaly'] = self.last_check
+        return self.dispatcher.submit(alert)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush pending alerts and release the dispatcher's SMTP connection.
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait for pending alerts
+        """
+        if self.dispatcher is not None:
+            self.dispatcher.close(timeout)
@@ -0,0 +1,369 @@
+"""
+Module name: alert_dispatcher.py
+Author: Michele Grieco
+Description:
+    This module provides an AlertDispatcher class that delivers alert emails from a background thread.
+    Alerts are queued, batched into digests when several arrive within a short window, and sent over a
+    persistent SMTP connection with retry and exponential backoff. Deduplication and cooldown state is
+    persisted to disk so that a sustained low score does not re-send the same alert on every run.
+    SMTP host, port, TLS and credentials are injectable, so the dispatcher can be pointed at a local
+    SMTP stand-in for testing (see tests/test_alert_dispatcher.py).
+Usage:
+    from tools.alert_dispatcher import AlertDispatcher
+    dispatcher = AlertDispatcher()
+    dispatcher.submit({'company': 'Enel', 'threshold': -0.3, 'score': -0.5, 'articles': []})
+    dispatcher.close()
+"""
+
+import json
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, Optional
+from configuration.config import (
+    EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_RECIPIENT,
+    SMTP_SERVER, SMTP_PORT, SMTP_USE_TLS, SMTP_TIMEOUT,
+    ALERT_STATE_FILE, ALERT_COOLDOWN_SECONDS, ALERT_ESCALATION_DELTA,
+    ALERT_DIGEST_WINDOW, ALERT_MAX_RETRIES, ALERT_RETRY_BACKOFF
+)
+
+
+class AlertDispatcher:
+    """
+    Background alert sender with a persistent SMTP connection, digests, retries and persisted cooldown.
+    """
+
+    def __init__(self,
+                 smtp_server: str = SMTP_SERVER,
+                 smtp_port: int = SMTP_PORT,
+                 sender: Optional[str] = EMAIL_SENDER,
+                 password: Optional[str] = EMAIL_PASSWORD,
+                 recipient: str = EMAIL_RECIPIENT,
+                 use_tls: bool = SMTP_USE_TLS,
+                 state_file: str = ALERT_STATE_FILE,
+                 cooldown: float = ALERT_COOLDOWN_SECONDS,
+                 digest_window: float = ALERT_DIGEST_WINDOW,
+                 max_retries: int = ALERT_MAX_RETRIES,
+                 retry_backoff: float = ALERT_RETRY_BACKOFF,
+                 message_builder: Optional[Callable[[list], tuple]] = None) -> None:
+        """
+        Initialize the dispatcher. The worker thread is started lazily on the first submitted alert.
+
+        Args:
+            smtp_server (str): SMTP host
+            smtp_port (int): SMTP port
+            sender (str, optional): Sender address
+            password (str, optional): SMTP password, login is skipped when None
+            recipient (str): Recipient address
+            use_tls (bool): Whether to upgrade the connection with STARTTLS
+            state_file (str): Path of the JSON file holding dedup/cooldown state
+            cooldown (float): Seconds before the same alert can be sent again
+            digest_window (float): Seconds to wait for further alerts to batch into a digest
+            max_retries (int): Number of retries after a failed send
+            retry_backoff (float): Base delay in seconds for exponential backoff
+            message_builder (callable, optional): Function mapping a list of alerts to (subject, html)
+        """
+        self.logger = logging.getLogger(__name__)
+
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.sender = sender
+        self.password = password
+        self.recipient = recipient
+        self.use_tls = use_tls
+        self.state_file = state_file
+        self.cooldown = cooldown
+        self.digest_window = digest_window
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.message_builder = message_builder or self._default_message
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_keys = set()
+        self._thread = None
+        self._smtp = None
+        self._state = self._load_state()
+
+    @staticmethod
+    def alert_key(alert: dict) -> str:
+        """
+        Build the dedup key of an alert.
+
+        Args:
+            alert (dict): Alert with 'company' and 'threshold' keys
+
+        Returns:
+            str: Key identifying alerts of the same kind
+        """
+        return f"{alert.get('company')}:{alert.get('threshold')}"
+
+    def _load_state(self) -> dict:
+        """
+        Load the persisted dedup/cooldown state.
+
+        Returns:
+            dict: Mapping of alert key to last sent time and score
+        """
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.error(f"Error loading alert state, starting empty: {e}")
+            return {}
+
+    def _save_state(self) -> None:
+        """
+        Atomically persist the dedup/cooldown state.
+        """
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._state, f)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            self.logger.error(f"Error saving alert state: {e}")
+
+    def is_suppressed(self, alert: dict, now: Optional[float] = None) -> bool:
+        """
+        Check whether an alert is a duplicate or still in cooldown.
+        An alert in cooldown is still sent if the score worsened by more than the escalation delta.
+
+        Args:
+            alert (dict): Alert to check
+            now (float, optional): Current time as a UNIX timestamp
+
+        Returns:
+            bool: True if the alert should not be sent
+        """
+        now = time.time() if now is None else now
+        key = self.alert_key(alert)
+        with self._lock:
+            if key in self._pending_keys:
+                return True
+            last = self._state.get(key)
+        if not last:
+            return False
+        in_cooldown = now - last.get('last_sent', 0) < self.cooldown
+        escalated = alert.get('score', 0.0) < last.get('score', 0.0) - ALERT_ESCALATION_DELTA
+        return in_cooldown and not escalated
+
+    def submit(self, alert: dict) -> bool:
+        """
+        Queue an alert for background delivery.
+
+        Args:
+            alert (dict): Alert with 'company', 'threshold', 'score' and 'articles' keys
+
+        Returns:
+            bool: True if the alert was queued, False if it was suppressed
+        """
+        if self.is_suppressed(alert):
+            self.logger.info(f"Alert {self.alert_key(alert)} suppressed by dedup/cooldown")
+            return False
+
+        alert.setdefault('timestamp', time.time())
+        with self._lock:
+            self._pending_keys.add(self.alert_key(alert))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="AlertDispatcher", daemon=True)
+                self._thread.start()
+        self._queue.put(alert)
+        self.logger.info(f"Alert {self.alert_key(alert)} queued for delivery")
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued alert has been processed.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            bool: True if the queue was drained within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                self.logger.warning("Timeout while flushing pending alerts")
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Deliver pending alerts without waiting for the digest window, stop the worker thread
+        and close the SMTP connection.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait for pending alerts
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                self.logger.warning("Timeout while delivering pending alerts")
+        self._disconnect()
+
+    def _run(self) -> None:
+        """
+        Worker loop: collect alerts into batches and deliver them.
+        """
+        while True:
+            alert = self._queue.get()
+            if alert is None:
+                self._queue.task_done()
+                return
+
+            batch = [alert]
+            stop = False
+            deadline = time.monotonic() + self.digest_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                self._deliver(batch)
+            except Exception as e:
+                self.logger.error(f"Unexpected error delivering alerts: {e}")
+            finally:
+                with self._lock:
+                    for item in batch:
+                        self._pending_keys.discard(self.alert_key(item))
+                for _ in batch:
+                    self._queue.task_done()
+
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _deliver(self, batch: list) -> bool:
+        """
+        Send a batch of alerts as a single email and record them in the cooldown state.
+
+        Args:
+            batch (list): Alerts to send
+
+        Returns:
+            bool: True if the email was sent
+        """
+        if not self.sender:
+            self.logger.error("Email sender not configured. Cannot send alert.")
+            return False
+
+        subject, html_content = self.message_builder(batch)
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.sender
+        msg['To'] = self.recipient
+        msg.attach(MIMEText(html_content, 'html'))
+
+        if not self._send_with_retry(msg):
+            self.logger.error(f"Giving up on {len(batch)} alert(s) after {self.max_retries} retries")
+            return False
+
+        now = time.time()
+        with self._lock:
+            for alert in batch:
+                self._state[self.alert_key(alert)] = {
+                    'last_sent': now,
+                    'score': alert.get('score', 0.0)
+                }
+            self._save_state()
+        self.logger.info(f"Alert email with {len(batch)} alert(s) sent to {self.recipient}")
+        return True
+
+    def _send_with_retry(self, msg: MIMEMultipart) -> bool:
+        """
+        Send a message, reconnecting and backing off exponentially on failures.
+
+        Args:
+            msg (MIMEMultipart): Message to send
+
+        Returns:
+            bool: True if the message was sent
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._connection().send_message(msg)
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                self.logger.warning(f"Alert send attempt {attempt + 1} failed: {e}")
+                self._disconnect()
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_backoff * (2 ** attempt))
+        return False
+
+    def _connection(self) -> smtplib.SMTP:
+        """
+        Return the persistent SMTP connection, reconnecting if it was dropped.
+
+        Returns:
+            smtplib.SMTP: Connected (and authenticated) SMTP client
+        """
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._disconnect()
+
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=SMTP_TIMEOUT)
+        server.ehlo()
+        if self.use_tls:
+            server.starttls()
+            server.ehlo()
+        if self.password:
+            server.login(self.sender, self.password)
+        self._smtp = server
+        self.logger.info(f"SMTP connection opened to {self.smtp_server}:{self.smtp_port}")
+        return server
+
+    def _disconnect(self) -> None:
+        """
+        Close the SMTP connection if open.
+        """
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+    @staticmethod
+    def _default_message(batch: list) -> tuple:
+        """
+        Build a plain subject and HTML body when no message builder is provided.
+
+        Args:
+            batch (list): Alerts to describe
+
+        Returns:
+            tuple: (subject, html) of the email
+        """
+        items = "".join(
+            f"<li>{a.get('company')}: {a.get('score', 0.0):.2f} (threshold {a.get('threshold')})</li>"
+            for a in batch
+        )
+        return f"[ALERT] {len(batch)} reputation alert(s)", f"<html><body><ul>{items}</ul></body></html>"
@@ -0,0 +1,219 @@
+"""
+Module name: anomaly.py
+Author: Michele Grieco
+Description:
+    This module provides a ScoreAnomalyDetector class that flags statistically significant shifts of the
+    reputation score series, instead of comparing each run with a fixed threshold.
+    For each company it keeps an exponentially weighted mean and variance of the run scores and a lower
+    CUSUM of their standardized residuals, all updated in O(1) per score. A run is anomalous when its
+    z-score falls below -z_threshold (a sharp drop) or when the CUSUM exceeds cusum_threshold (a smaller
+    drop that persists over several runs). Residuals are clipped before they update the baseline, so a
+    single noisy run neither fires on its own nor inflates the variance. Until warmup_runs scores have been
+    seen there is no reliable baseline and check() reports the detector as not ready.
+    The state of every company is persisted as JSON between runs. A company without state is seeded from
+    the last ANOMALY_SEED_RUNS scores of the score file, read from its end, not from the full history.
+    Sensitivity can be set per company with ANOMALY_SENSITIVITY.
+Usage:
+    from tools.anomaly import ScoreAnomalyDetector
+    detector = ScoreAnomalyDetector("Enel")
+    result = detector.check(score)
+    if result['anomaly']:
+        print(result['reason'], result['zscore'])
+    detector.update(score)
+    detector.save()
+"""
+
+import json
+import logging
+import math
+import os
+from configuration.config import (
+    RESULTS_FILE, TARGET_COMPANY, ANOMALY_STATE_FILE, ANOMALY_SMOOTHING, ANOMALY_Z_THRESHOLD,
+    ANOMALY_CUSUM_SLACK, ANOMALY_CUSUM_THRESHOLD, ANOMALY_CLIP, ANOMALY_WARMUP_RUNS, ANOMALY_SEED_RUNS,
+    ANOMALY_MIN_STD, ANOMALY_SENSITIVITY
+)
+
+
+def tail_scores(results_file: str, count: int, block_size: int = 8192) -> list:
+    """
+    Read the last scores of a score CSV file ('timestamp,score' rows) by seeking from its end.
+
+    Args:
+        results_file (str): Path of the score file
+        count (int): Number of scores to read
+        block_size (int): Bytes read per step
+
+    Returns:
+        list: Up to count scores, oldest first
+    """
+    if count <= 0 or not os.path.exists(results_file):
+        return []
+    with open(results_file, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        # One more line than needed, the first one read may be cut
+        while position > 0 and data.count(b'\n') <= count + 1:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+
+    scores = []
+    for line in data.decode('utf-8', errors='replace').splitlines()[-(count + 1):]:
+        try:
+            scores.append(float(line.rsplit(',', 1)[1]))
+        except (IndexError, ValueError):
+            continue  # header, cut first line or malformed row
+    return scores[-count:]
+
+
+class ScoreAnomalyDetector:
+    """
+    Class detecting significant drops of a company's score series with EWMA z-scores and CUSUM.
+    """
+
+    def __init__(self, company: str = TARGET_COMPANY,
+                 state_file: str = ANOMALY_STATE_FILE,
+                 results_file: str = RESULTS_FILE) -> None:
+        """
+        Initialize the detector, loading the persisted state or seeding it from the score file.
+
+        Args:
+            company (str): Company whose score series is monitored
+            state_file (str): Path of the JSON state file, shared by all companies
+            results_file (str): Score file used to seed a company without state
+        """
+        self.logger = logging.getLogger(__name__)
+        self.company = company
+        self.state_file = state_file
+        self.results_file = results_file
+
+        sensitivity = ANOMALY_SENSITIVITY.get(company, {})
+        self.smoothing = sensitivity.get('smoothing', ANOMALY_SMOOTHING)
+        self.z_threshold = sensitivity.get('z_threshold', ANOMALY_Z_THRESHOLD)
+        self.cusum_slack = sensitivity.get('cusum_slack', ANOMALY_CUSUM_SLACK)
+        self.cusum_threshold = sensitivity.get('cusum_threshold', ANOMALY_CUSUM_THRESHOLD)
+        self.warmup_runs = sensitivity.get('warmup_runs', ANOMALY_WARMUP_RUNS)
+
+        self.companies = {}  # state of every company in the file, saved together
+        self.load()
+        if self.company not in self.companies:
+            self.reset()
+            self.seed()
+
+    def reset(self) -> None:
+        """
+        Forget the score series of the company.
+        """
+        self.companies[self.company] = {'mean': 0.0, 'variance': 0.0, 'cusum': 0.0, 'runs': 0}
+
+    @property
+    def state(self) -> dict:
+        """
+        State of the monitored company.
+        """
+        return self.companies[self.company]
+
+    def seed(self) -> int:
+        """
+        Fold the last scores of the score file into the state.
+
+        Returns:
+            int: Number of scores folded in
+        """
+        scores = tail_scores(self.results_file, ANOMALY_SEED_RUNS)
+        for score in scores:
+            self.update(score)
+        if scores:
+            self.logger.info(f"Anomaly detector for {self.company} seeded with {len(scores)} scores")
+        return len(scores)
+
+    def _std(self) -> float:
+        return max(math.sqrt(self.state['variance']), ANOMALY_MIN_STD)
+
+    def check(self, score: float) -> dict:
+        """
+        Assess a new score against the baseline, without changing the state.
+
+        Args:
+            score (float): Latest score of the company
+
+        Returns:
+            dict: 'anomaly' (bool), 'reason' ('zscore', 'cusum' or None), 'ready' (baseline available),
+                'zscore', 'cusum', and the baseline 'mean' and 'std'
+        """
+        state = self.state
+        ready = state['runs'] >= self.warmup_runs
+        zscore = (score - state['mean']) / self._std() if state['runs'] else 0.0
+        cusum = max(0.0, state['cusum'] - zscore - self.cusum_slack) if ready else 0.0
+
+        reason = None
+        if ready and zscore <= -self.z_threshold:
+            reason = 'zscore'
+        elif cusum > self.cusum_threshold:
+            reason = 'cusum'
+        return {
+            'anomaly': reason is not None,
+            'reason': reason,
+            'ready': ready,
+            'zscore': zscore,
+            'cusum': cusum,
+            'mean': state['mean'],
+            'std': self._std()
+        }
+
+    def update(self, score: float) -> dict:
+        """
+        Fold a new score into the baseline and the CUSUM.
+
+        Args:
+            score (float): Latest score of the company
+
+        Returns:
+            dict: Assessment of the score, as returned by check
+        """
+        result = self.check(score)
+        state = self.state
+        if state['runs'] == 0:
+            state['mean'] = score
+        else:
+            # Clipped residuals keep a single outlier from dragging the baseline
+            std = self._std()
+            residual = min(max(score - state['mean'], -ANOMALY_CLIP * std), ANOMALY_CLIP * std)
+            state['mean'] += self.smoothing * residual
+            state['variance'] = (1 - self.smoothing) * (state['variance'] + self.smoothing * residual ** 2)
+        # The CUSUM restarts once it has signalled a shift
+        state['cusum'] = 0.0 if result['reason'] == 'cusum' else result['cusum']
+        state['runs'] += 1
+        return result
+
+    def load(self) -> None:
+        """
+        Load the persisted state, if present.
+        """
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self.companies = json.load(f)
+            if self.company in self.companies:
+                self.logger.info(f"Loaded anomaly detector state for {self.company} ({self.state['runs']} runs)")
+        except Exception as e:
+            self.logger.error(f"Error loading anomaly detector state: {e}")
+            self.companies = {}
+
+    def save(self) -> None:
+        """
+        Atomically persist the state of all companies.
+        """
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.companies, f)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            self.logger.error(f"Error saving anomaly detector state: {e}")
@@ -0,0 +1,212 @@
+"""
+Module name: archive.py
+Author: Michele Grieco
+Description:
+    This module provides a ResponseArchive class that stores fetched feeds and article pages (status, headers
+    and gzip-compressed body) in a local directory, so runs can be replayed on exactly the same inputs without
+    network access. Network failures are archived too, so a replay reproduces them. Archived responses expose
+    the subset of the requests.Response interface used by the scraper and can optionally simulate the recorded
+    latency (time to first byte and transfer time), scaled by a factor, for realistic benchmarks.
+Usage:
+    from tools.archive import ResponseArchive
+    archive = ResponseArchive("data/archive")
+    archive.record(url, 200, headers, body, elapsed=0.12, duration=0.30)
+    response = archive.get(url)
+    for chunk in response.iter_content(16384):
+        ...
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Optional
+import requests # for compatible exceptions and header handling
+from requests.structures import CaseInsensitiveDict
+from configuration.config import ARCHIVE_DIRECTORY, REPLAY_LATENCY_SCALE
+
+
+class ArchivedResponse:
+    """
+    Response served from the archive, compatible with the parts of requests.Response used by the scraper.
+    """
+
+    def __init__(self, url: str, status_code: int, headers: dict, body: bytes,
+                 elapsed: float = 0.0, duration: float = 0.0, latency_scale: float = 0.0) -> None:
+        """
+        Args:
+            url (str): Final URL of the response
+            status_code (int): HTTP status
+            headers (dict): Response headers
+            body (bytes): Response body
+            elapsed (float): Recorded time to first byte in seconds
+            duration (float): Recorded body transfer time in seconds
+            latency_scale (float): Factor applied to the recorded latency, 0 to disable the simulation
+        """
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = body
+        self.elapsed = elapsed
+        self.duration = duration
+        self.latency_scale = latency_scale
+
+    def raise_for_status(self) -> None:
+        """
+        Raise requests.HTTPError for error statuses, as requests does.
+        """
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def iter_content(self, chunk_size: int = 1):
+        """
+        Yield the body in chunks, spreading the recorded transfer time over them when simulating latency.
+
+        Args:
+            chunk_size (int): Bytes per chunk
+
+        Yields:
+            bytes: Body chunks
+        """
+        total = len(self.content)
+        for start in range(0, total, chunk_size):
+            chunk = self.content[start:start + chunk_size]
+            if self.latency_scale > 0 and total:
+                time.sleep(self.duration * self.latency_scale * len(chunk) / total)
+            yield chunk
+
+    def close(self) -> None:
+        """
+        Nothing to release, kept for compatibility with requests.Response.
+        """
+
+
+class ResponseArchive:
+    """
+    Class for recording and replaying HTTP responses in a local directory.
+    """
+
+    def __init__(self, directory: str = ARCHIVE_DIRECTORY, latency_scale: float = REPLAY_LATENCY_SCALE) -> None:
+        """
+        Open (or create) the archive and load its index.
+
+        Args:
+            directory (str): Archive directory, holding index.jsonl and gzip-compressed bodies
+            latency_scale (float): Factor applied to the recorded latency on replay, 0 to serve immediately
+        """
+        # Logger configuration
+        self.logger = logging.getLogger(__name__)
+
+        self.directory = directory
+        self.latency_scale = latency_scale
+        self.index_file = os.path.join(directory, "index.jsonl")
+        os.makedirs(os.path.join(directory, "bodies"), exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self) -> dict:
+        """
+        Load the index, the latest recording of a URL winning over older ones.
+        """
+        index = {}
+        if not os.path.exists(self.index_file):
+            return index
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    self.logger.warning(f"Ignoring malformed entry in {self.index_file}")
+                    continue
+                index[entry['url']] = entry
+        self.logger.info(f"Loaded response archive with {len(index)} entries from {self.directory}")
+        return index
+
+    def _body_path(self, url: str) -> str:
+        """
+        Path of the compressed body of a URL.
+        """
+        return os.path.join(self.directory, "bodies", hashlib.sha256(url.encode('utf-8')).hexdigest() + ".gz")
+
+    def _append(self, entry: dict) -> None:
+        """
+        Add an entry to the index.
+        """
+        with open(self.index_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        self.index[entry['url']] = entry
+
+    def record(self, url: str, status_code: int, headers: dict, body: bytes,
+               elapsed: float = 0.0, duration: float = 0.0, final_url: Optional[str] = None) -> None:
+        """
+        Store a response.
+
+        Args:
+            url (str): Requested URL
+            status_code (int): HTTP status
+            headers (dict): Response headers
+            body (bytes): Response body
+            elapsed (float): Time to first byte in seconds
+            duration (float): Body transfer time in seconds
+            final_url (str, optional): URL reached after redirects, if different
+        """
+        # Bodies are stored decoded, so transfer encodings no longer apply
+        headers = {name: value for name, value in headers.items()
+                   if name.lower() not in ('content-encoding', 'transfer-encoding')}
+        path = self._body_path(url)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(gzip.compress(body))
+        os.replace(tmp_file, path)
+        self._append({
+            'url': url,
+            'status_code': status_code,
+            'headers': headers,
+            'body': os.path.basename(path),
+            'elapsed': elapsed,
+            'duration': duration,
+            'final_url': final_url or url
+        })
+
+    def record_error(self, url: str, error: Exception, elapsed: float = 0.0) -> None:
+        """
+        Store a network failure, so that replays reproduce it.
+
+        Args:
+            url (str): Requested URL
+            error (Exception): Raised exception
+            elapsed (float): Time until the failure in seconds
+        """
+        self._append({'url': url, 'error': str(error), 'elapsed': elapsed})
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.index
+
+    def get(self, url: str) -> Optional[ArchivedResponse]:
+        """
+        Serve a recorded response.
+
+        Args:
+            url (str): Requested URL
+
+        Returns:
+            ArchivedResponse: Recorded response, or None if the URL was not recorded
+
+        Raises:
+            requests.ConnectionError: If a network failure was recorded for the URL
+        """
+        entry = self.index.get(url)
+        if entry is None:
+            return None
+        if self.latency_scale > 0:
+            time.sleep(entry['elapsed'] * self.latency_scale)
+        if 'error' in entry:
+            raise requests.ConnectionError(f"Recorded failure: {entry['error']}")
+
+        with open(os.path.join(self.directory, "bodies", entry['body']), 'rb') as f:
+            body = gzip.decompress(f.read())
+        return ArchivedResponse(
+            entry.get('final_url', url), entry['status_code'], entry['headers'], body,
+            elapsed=entry['elapsed'], duration=entry['duration'], latency_scale=self.latency_scale
+        )
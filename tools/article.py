@@ -0,0 +1,155 @@
+"""
+Module name: article.py
+Author: Michele Grieco
+Description:
+    This module provides the Article record that moves through the analysis pipeline. It uses __slots__
+    instead of a per-instance dict, keeps the content length when the raw content is released, and
+    offers release_raw() so raw HTML/text, processed text and mention contexts can be freed as soon as
+    downstream stages no longer need them. Dictionary-style access (article['title'], article.get(...))
+    is supported for consumers written against the former dict representation. sentiment_label converts a
+    score to its label without loading the sentiment models, e.g. for the dashboard and the API.
+Usage:
+    from tools.article import Article, sentiment_label
+    article = Article(title=entry.title, link=entry.link, published=entry.published, content=text)
+    ...
+    article.release_raw()
+    label = sentiment_label(-0.35)  # "Negative"
+"""
+
+from typing import Optional
+from configuration.config import SENTIMENT_POSITIVE_THRESHOLD, SENTIMENT_NEGATIVE_THRESHOLD
+
+
+def sentiment_label(score: float) -> str:
+    """
+    Convert a sentiment score to a label.
+
+    Args:
+        score (float): Sentiment score between -1 and 1
+
+    Returns:
+        str: Sentiment label (Positive, Neutral, Negative)
+    """
+    if score > SENTIMENT_POSITIVE_THRESHOLD:
+        return "Positive"
+    elif score < SENTIMENT_NEGATIVE_THRESHOLD:
+        return "Negative"
+    else:
+        return "Neutral"
+
+
+class Article:
+    """
+    Slotted record for a single article and its analysis results.
+    """
+
+    __slots__ = (
+        'title', 'link', 'canonical_url', 'published', 'summary', 'date', 'audit_sample',
+        '_content', 'content_length', 'processed_title', 'processed_content',
+        'company_mentions', 'mention_count', 'sentiment_score', 'sentiment_label',
+        'cluster_id', 'duplicate', 'dedup_weight', 'embedding', 'language'
+    )
+
+    def __init__(self, title: str, link: str, published: str = 'N/A', summary: str = "",
+                 content: str = "", date: Optional[str] = None, audit_sample: bool = False,
+                 language: Optional[str] = None) -> None:
+        """
+        Initialize the record with the data collected from the feed.
+
+        Args:
+            title (str): Article title
+            link (str): Article URL
+            published (str): Publication date as found in the feed
+            summary (str): Feed summary
+            content (str): Extracted article text
+            date (str, optional): Collection timestamp
+            audit_sample (bool): Whether the article was kept only for recall auditing
+            language (str, optional): Language code, identified on the feed entry or the content
+        """
+        self.title = title
+        self.link = link
+        self.canonical_url = link  # publisher's canonical URL once known, used as article key
+        self.published = published
+        self.summary = summary
+        self.date = date
+        self.audit_sample = audit_sample
+        self.language = language
+        self.content_length = 0
+        self.content = content
+        self.processed_title = None
+        self.processed_content = None
+        self.company_mentions = None
+        self.mention_count = 0
+        self.sentiment_score = None
+        self.sentiment_label = None
+        self.cluster_id = None
+        self.duplicate = False
+        self.dedup_weight = 1.0
+        self.embedding = None  # document vector (list), kept after release for story clustering
+
+    @property
+    def content(self) -> Optional[str]:
+        """
+        Extracted article text, None once released.
+        """
+        return self._content
+
+    @content.setter
+    def content(self, value: Optional[str]) -> None:
+        self._content = value
+        if value is not None:
+            self.content_length = len(value)
+
+    def release_raw(self) -> None:
+        """
+        Free raw and intermediate text once the analysis stages are done.
+        The content length and the number of company mentions are kept for scoring and reporting.
+        """
+        self._content = None
+        self.summary = None
+        self.processed_title = None
+        self.processed_content = None
+        if self.company_mentions is not None:
+            self.mention_count = len(self.company_mentions)
+            self.company_mentions = None
+
+    def get(self, key: str, default=None):
+        """
+        Dictionary-style access. Missing or released fields return the default.
+
+        Args:
+            key (str): Field name
+            default: Value returned when the field is missing or None
+
+        Returns:
+            Field value or default
+        """
+        value = getattr(self, key, None) if key in self.__slots__ or key == 'content' else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__ and key != 'content':
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in self.__slots__ and key != 'content':
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return (key in self.__slots__ or key == 'content') and getattr(self, key, None) is not None
+
+    def to_dict(self) -> dict:
+        """
+        Convert the record to a plain dictionary of its public fields.
+
+        Returns:
+            dict: Field values, content included only if not released
+        """
+        fields = {name: getattr(self, name) for name in self.__slots__ if not name.startswith('_')}
+        fields['content'] = self._content
+        return fields
+
+    def __repr__(self) -> str:
+        return f"Article(title={self.title!r}, link={self.link!r})"
@@ -0,0 +1,480 @@
+"""
+Module name: backfill.py
+Author: Michele Grieco
+Description:
+    This module provides a BackfillRunner class that rescores archived articles offline, e.g. after a change
+    of SENTIMENT_MODEL or of the weighting. Articles are streamed from JSONL or Parquet archives in batches and
+    analyzed (preprocessing, company detection, batched sentiment) by a pool of worker processes, each loading
+    the models once. The number of batches in flight is bounded, detail rows are appended to a CSV file as
+    results come back in input order, and only per-day aggregates are kept in memory, so millions of articles
+    are processed in bounded memory. A JSON checkpoint records the input position, the size of the detail file
+    and the daily aggregates, so an interrupted backfill resumes where it stopped without duplicate rows.
+    The daily aggregates of each batch are computed by VectorizedScoreCalculator, weighting articles by their
+    length as the live scoring does.
+    Archived records are dictionaries with 'title', 'link', 'published' and 'content' (or 'text') fields.
+Usage:
+    from tools.backfill import BackfillRunner
+    runner = BackfillRunner("archive/articles.jsonl", workers=8)
+    summary = runner.run()
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Iterator, Optional
+import pandas as pd # for writing detail rows and scores
+import pyarrow.parquet as pq # for streaming Parquet archives
+from configuration.config import (
+    DATA_DIRECTORY, BACKFILL_WORKERS, BACKFILL_BATCH_SIZE, BACKFILL_MAX_IN_FLIGHT,
+    BACKFILL_CHECKPOINT_FILE, BACKFILL_SCORES_FILE, BACKFILL_PROGRESS_INTERVAL, SENTIMENT_MODE,
+    SENTIMENT_CASCADE
+)
+from configuration.logging_setup import setup_logging, log_context
+from tools.incremental_score import parse_event_time
+from tools.vectorized_scoring import VectorizedScoreCalculator, LengthWeighting
+
+DETAIL_COLUMNS = [
+    'timestamp', 'title', 'link', 'sentiment_score', 'sentiment_label',
+    'published', 'event_time', 'weight'
+]
+ARCHIVE_COLUMNS = ['title', 'link', 'published', 'date', 'content', 'text', 'language']
+
+# Analysis stages of the current worker process, created once by _init_worker
+_worker = {}
+
+
+def _init_worker() -> None:
+    """
+    Load the analysis stages in a worker process.
+    Models are imported here so the parent process never loads them.
+    """
+    try:
+        import torch
+        # One intra-op thread per worker, the pool already uses every core
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    from preprocessing.preprocess import TextPreprocessor
+    from tools.ner import NamedEntityRecognizer
+    from tools.sentiment_analysis import SentimentAnalyzer, CascadeSentimentAnalyzer
+
+    from tools.language import LanguageRouter
+
+    # A forked worker inherits the queue handler but not the thread writing the records
+    setup_logging()
+    stages = (
+        TextPreprocessor(),
+        NamedEntityRecognizer(),
+        CascadeSentimentAnalyzer() if SENTIMENT_CASCADE else SentimentAnalyzer()
+    )
+    # Models of the other languages are loaded by the worker when it first meets one of their articles
+    _worker['router'] = LanguageRouter(default_stages=stages)
+
+
+def _analyze_batch(records: list, timestamp: str) -> tuple:
+    """
+    Analyze a batch of archived articles in a worker process.
+
+    Args:
+        records (list): Archived article dictionaries
+        timestamp (str): Backfill timestamp written in the detail rows
+
+    Returns:
+        tuple: (number of records, detail rows of the relevant articles)
+    """
+    router = _worker['router']
+    collected = parse_event_time(None)
+
+    # Records of each supported language are preprocessed together, in this process (pool workers are daemons)
+    languages = {}
+    for index, record in enumerate(records):
+        content = record.get('content') or record.get('text') or ''
+        language = router.identify_content(content, record.get('language'))
+        if router.get_stages(language) is not None:
+            languages.setdefault(language, []).append(index)
+    processed = {}
+    for language, indexes in languages.items():
+        preprocessor = router.get_stages(language)[0]
+        texts = preprocessor.preprocess_batch(
+            [records[i].get('content') or records[i].get('text') or '' for i in indexes]
+            + [records[i].get('title') or '' for i in indexes],
+            workers=1
+        )
+        for offset, i in enumerate(indexes):
+            processed[i] = (language, texts[offset], texts[len(indexes) + offset])
+
+    rows = []
+    units = []  # (language, texts scored) for each relevant article
+    for index, record in enumerate(records):
+        if index not in processed:
+            continue
+        language, processed_content, processed_title = processed[index]
+        ner = router.get_stages(language)[1]
+        content = record.get('content') or record.get('text') or ''
+        title = record.get('title') or ''
+        if not ner.is_company_mentioned(f"{processed_title} {processed_content}"):
+            continue
+
+        published = record.get('published') or 'N/A'
+        event_time = parse_event_time(published, parse_event_time(record.get('date'), collected))
+        rows.append({
+            'timestamp': timestamp,
+            'title': title,
+            'link': record.get('link'),
+            'published': published,
+            'event_time': event_time.strftime("%Y-%m-%d %H:%M:%S"),
+            'weight': max(len(content), 1)
+        })
+        sentences = []
+        if SENTIMENT_MODE == 'targeted':
+            _, sentences = ner.analyze_company_context(processed_content)
+        units.append((language, sentences or [processed_content]))
+
+    # Texts of the whole batch go through each language's model together, then are regrouped per article
+    for language in {language for language, _ in units}:
+        sentiment = router.get_stages(language)[2]
+        indexes = [i for i, (unit_language, _) in enumerate(units) if unit_language == language]
+        scores = sentiment.analyze_sentiment_batch([text for i in indexes for text in units[i][1]])
+        offset = 0
+        for i in indexes:
+            texts = units[i][1]
+            score = sentiment.aggregate(scores[offset:offset + len(texts)], texts)
+            offset += len(texts)
+            rows[i]['sentiment_score'] = score
+            rows[i]['sentiment_label'] = sentiment.get_sentiment_label(score)
+    return len(records), rows
+
+
+def iter_jsonl(path: str, offset: int, batch_size: int) -> Iterator[tuple]:
+    """
+    Stream a JSONL archive in batches, starting at a byte offset.
+
+    Args:
+        path (str): Path of the archive
+        offset (int): Byte offset to start from
+        batch_size (int): Records per batch
+
+    Yields:
+        tuple: (records, byte offset after the last record of the batch)
+    """
+    logger = logging.getLogger(__name__)
+    batch = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            offset += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                batch.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping malformed archive line ending at byte {offset}")
+                continue
+            if len(batch) >= batch_size:
+                yield batch, offset
+                batch = []
+    if batch:
+        yield batch, offset
+
+
+def iter_parquet(path: str, row: int, batch_size: int) -> Iterator[tuple]:
+    """
+    Stream a Parquet archive in record batches, starting at a row index.
+    Row groups before the starting row are skipped without being read.
+
+    Args:
+        path (str): Path of the archive
+        row (int): Index of the first row to read
+        batch_size (int): Records per batch
+
+    Yields:
+        tuple: (records, index of the row after the batch)
+    """
+    parquet = pq.ParquetFile(path)
+    columns = [name for name in ARCHIVE_COLUMNS if name in parquet.schema_arrow.names]
+
+    # Find the row group containing the starting row
+    first_group = 0
+    group_start = 0
+    while first_group < parquet.num_row_groups:
+        group_rows = parquet.metadata.row_group(first_group).num_rows
+        if group_start + group_rows > row:
+            break
+        group_start += group_rows
+        first_group += 1
+
+    position = group_start
+    skip = row - group_start
+    row_groups = list(range(first_group, parquet.num_row_groups))
+    if not row_groups:
+        return
+    for batch in parquet.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=columns):
+        position += batch.num_rows
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        records = batch.slice(skip).to_pylist()
+        skip = 0
+        yield records, position
+
+
+class BackfillRunner:
+    """
+    Class for resumable, multi-process rescoring of archived articles.
+    """
+
+    def __init__(self, input_path: str,
+                 workers: int = BACKFILL_WORKERS,
+                 batch_size: int = BACKFILL_BATCH_SIZE,
+                 max_in_flight: int = BACKFILL_MAX_IN_FLIGHT,
+                 checkpoint_file: str = BACKFILL_CHECKPOINT_FILE,
+                 scores_file: str = BACKFILL_SCORES_FILE,
+                 details_file: Optional[str] = None,
+                 progress_interval: float = BACKFILL_PROGRESS_INTERVAL) -> None:
+        """
+        Initialize the runner.
+
+        Args:
+            input_path (str): JSONL (.jsonl, .json) or Parquet (.parquet) archive
+            workers (int): Number of analysis processes
+            batch_size (int): Articles sent to a worker at a time
+            max_in_flight (int): Pending batches per worker
+            checkpoint_file (str): Path of the JSON checkpoint
+            scores_file (str): CSV file receiving the per-day scores
+            details_file (str, optional): CSV file receiving the detail rows,
+                backfill_results_<archive name>.csv in the data directory if None
+            progress_interval (float): Seconds between progress reports
+        """
+        # Logger configuration
+        self.logger = logging.getLogger(__name__)
+
+        self.input_path = input_path
+        self.parquet = input_path.lower().endswith('.parquet')
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.max_in_flight = max(1, max_in_flight) * self.workers
+        self.checkpoint_file = checkpoint_file
+        self.scores_file = scores_file
+        name = os.path.splitext(os.path.basename(input_path))[0]
+        self.details_file = details_file or os.path.join(DATA_DIRECTORY, f"backfill_results_{name}.csv")
+        self.progress_interval = progress_interval
+        self.calculator = VectorizedScoreCalculator([LengthWeighting()])
+        self.state = {}
+
+    def _signature(self) -> dict:
+        """
+        Identify the input archive, so a checkpoint is not applied to a different file.
+        """
+        stat = os.stat(self.input_path)
+        return {
+            'input': os.path.abspath(self.input_path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'details_file': os.path.abspath(self.details_file)
+        }
+
+    def _total(self) -> int:
+        """
+        Total amount of input, in the unit of the checkpoint position (bytes or rows).
+        """
+        if self.parquet:
+            return pq.ParquetFile(self.input_path).metadata.num_rows
+        return os.path.getsize(self.input_path)
+
+    def _load_checkpoint(self, restart: bool) -> None:
+        """
+        Load the checkpoint of a previous run on the same input, or start a new one.
+        """
+        signature = self._signature()
+        self.state = {
+            'signature': signature,
+            'position': 0,
+            'details_size': 0,
+            'articles': 0,
+            'relevant': 0,
+            'days': {},  # day -> [sum(weight * score), sum(weight), count]
+            'completed': False,
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        if restart or not os.path.exists(self.checkpoint_file):
+            return
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('signature') != signature:
+                self.logger.warning("Checkpoint refers to a different archive, starting over")
+                return
+            self.state = state
+            self.logger.info(f"Resuming backfill after {state['articles']} articles")
+        except Exception as e:
+            self.logger.error(f"Error loading backfill checkpoint, starting over: {e}")
+
+    def _save_checkpoint(self) -> None:
+        """
+        Atomically persist the checkpoint.
+        """
+        try:
+            directory = os.path.dirname(self.checkpoint_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.checkpoint_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_file, self.checkpoint_file)
+        except Exception as e:
+            self.logger.error(f"Error saving backfill checkpoint: {e}")
+
+    def _open_details(self):
+        """
+        Open the detail file for appending, dropping rows written after the last checkpoint.
+        """
+        directory = os.path.dirname(self.details_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        details = open(self.details_file, 'a+', encoding='utf-8', newline='')
+        details.truncate(self.state['details_size'])
+        details.seek(self.state['details_size'])
+        return details
+
+    def _batches(self) -> Iterator[tuple]:
+        """
+        Stream the archive from the checkpointed position.
+        """
+        if self.parquet:
+            return iter_parquet(self.input_path, self.state['position'], self.batch_size)
+        return iter_jsonl(self.input_path, self.state['position'], self.batch_size)
+
+    def _collect(self, details, count: int, rows: list, position: int) -> None:
+        """
+        Write the results of a batch and checkpoint them.
+
+        Args:
+            details (file): Open detail file
+            count (int): Number of archived articles in the batch
+            rows (list): Detail rows of the relevant articles
+            position (int): Input position after the batch
+        """
+        if rows:
+            frame = pd.DataFrame(rows, columns=DETAIL_COLUMNS)
+            frame.to_csv(details, header=details.tell() == 0, index=False)
+            details.flush()
+            os.fsync(details.fileno())
+            # The detail weight is the content length, at least 1
+            sums = self.calculator.grouped_sums(frame.assign(content_length=frame['weight']), freq='D',
+                                                by_company=False)
+            for period, ws, weight, count in zip(sums['period'], sums['ws'], sums['weight'], sums['articles']):
+                day = self.state['days'].setdefault(period.strftime("%Y-%m-%d"), [0.0, 0.0, 0])
+                day[0] += float(ws)
+                day[1] += float(weight)
+                day[2] += int(count)
+
+        self.state['position'] = position
+        self.state['details_size'] = details.tell()
+        self.state['articles'] += count
+        self.state['relevant'] += len(rows)
+        self._save_checkpoint()
+
+    def _report_progress(self, started: float, start_position: int, start_articles: int, total: int) -> None:
+        """
+        Log throughput and estimated time to completion.
+        """
+        elapsed = max(time.monotonic() - started, 1e-9)
+        rate = (self.state['articles'] - start_articles) / elapsed
+        done = self.state['position'] - start_position
+        remaining = total - self.state['position']
+        eta = remaining * elapsed / done if done > 0 else float('inf')
+        self.logger.info(
+            f"Backfill: {self.state['articles']} articles ({self.state['relevant']} relevant), "
+            f"{100.0 * self.state['position'] / max(total, 1):.1f}% done, "
+            f"{rate:.1f} articles/s, ETA {eta / 60:.1f} min"
+        )
+
+    def save_scores(self) -> pd.DataFrame:
+        """
+        Write the per-day weighted scores of the backfill.
+
+        Returns:
+            pandas.DataFrame: One row per day with 'timestamp', 'score' and 'articles'
+        """
+        days = sorted(self.state['days'].items())
+        df = pd.DataFrame({
+            'timestamp': [f"{day} 00:00:00" for day, _ in days],
+            'score': [ws / w if w > 0 else 0.0 for _, (ws, w, _) in days],
+            'articles': [count for _, (_, _, count) in days]
+        })
+        try:
+            directory = os.path.dirname(self.scores_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.scores_file}.tmp"
+            df.to_csv(tmp_file, index=False)
+            os.replace(tmp_file, self.scores_file)
+            self.logger.info(f"Saved {len(df)} daily backfill scores to {self.scores_file}")
+        except Exception as e:
+            self.logger.error(f"Error saving backfill scores: {e}")
+        return df
+
+    def run(self, restart: bool = False) -> dict:
+        """
+        Run (or resume) the backfill.
+
+        Args:
+            restart (bool): Ignore an existing checkpoint and start from the beginning
+
+        Returns:
+            dict: Number of articles, relevant articles and days scored
+        """
+        self._load_checkpoint(restart)
+        with log_context(run_id=f"backfill_{self.state['timestamp']}"):
+            if self.state['completed']:
+                self.logger.info("Backfill of this archive already completed, use restart to run it again")
+            else:
+                self._process()
+            self.save_scores()
+        return {
+            'articles': self.state['articles'],
+            'relevant': self.state['relevant'],
+            'days': len(self.state['days'])
+        }
+
+    def _process(self) -> None:
+        """
+        Stream the archive through the worker pool, collecting results in input order.
+        """
+        total = self._total()
+        started = time.monotonic()
+        last_report = started
+        start_position = self.state['position']
+        start_articles = self.state['articles']
+        self.logger.info(f"Backfilling {self.input_path} with {self.workers} workers")
+
+        pending = deque()
+        details = self._open_details()
+        pool = multiprocessing.Pool(self.workers, initializer=_init_worker)
+        try:
+            for records, position in self._batches():
+                pending.append((pool.apply_async(_analyze_batch, (records, self.state['timestamp'])), position))
+                # Bounded in-flight batches keep memory constant however large the archive is
+                while len(pending) >= self.max_in_flight:
+                    result, end = pending.popleft()
+                    self._collect(details, *result.get(), end)
+                if time.monotonic() - last_report >= self.progress_interval:
+                    self._report_progress(started, start_position, start_articles, total)
+                    last_report = time.monotonic()
+
+            while pending:
+                result, end = pending.popleft()
+                self._collect(details, *result.get(), end)
+            self.state['completed'] = True
+            self._save_checkpoint()
+            self._report_progress(started, start_position, start_articles, total)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+            details.close()
@@ -0,0 +1,261 @@
+"""
+Module name: dedup.py
+Author: Michele Grieco
+Description:
+    This module provides a NearDuplicateDetector class that recognizes republished copies of the same
+    story (e.g. ANSA/Adnkronos agency pieces carried by many outlets) before model inference.
+    Each processed article is fingerprinted with a 64-bit SimHash over word shingles, and fingerprints
+    are stored in a persistent SQLite index with 4 LSH bands of 16 bits. A fingerprint within 7 bits of
+    Hamming distance of its match differs in at most one bit in at least one band, so a lookup probes each
+    band and its 16 one-bit neighbours: every probe hits a bucket holding about 1/65536 of the index, which
+    keeps candidate retrieval roughly constant as the index grows. Indexes written with an older band layout
+    are rebuilt from their stored fingerprints when opened.
+    Each cluster keeps the NER/sentiment results of its first member, so copies reuse them.
+Usage:
+    from tools.dedup import NearDuplicateDetector
+    detector = NearDuplicateDetector()
+    fingerprint = detector.fingerprint(article['processed_content'])
+    match = detector.find(fingerprint)
+    if match is None:
+        cluster_id = detector.add(fingerprint, article['link'], relevant, score, label)
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Optional
+import numpy as np # for vectorized bit counting
+from configuration.config import (
+    DEDUP_INDEX_FILE, DEDUP_MAX_DISTANCE, DEDUP_SHINGLE_SIZE, DEDUP_MIN_TOKENS, DEDUP_RETENTION_DAYS
+)
+
+BANDS = 4
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+LAYOUT_VERSION = 2  # PRAGMA user_version of an index with this band layout (0: 8 bands of 8 bits)
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def _to_signed(value: int) -> int:
+    """
+    Map an unsigned 64-bit value to SQLite's signed INTEGER range.
+    """
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value: int) -> int:
+    """
+    Inverse of _to_signed.
+    """
+    return value + (1 << 64) if value < 0 else value
+
+
+class NearDuplicateDetector:
+    """
+    Class for SimHash-based near-duplicate detection with a persistent LSH index.
+    """
+
+    def __init__(self, index_file: str = DEDUP_INDEX_FILE,
+                 max_distance: int = DEDUP_MAX_DISTANCE,
+                 shingle_size: int = DEDUP_SHINGLE_SIZE,
+                 min_tokens: int = DEDUP_MIN_TOKENS) -> None:
+        """
+        Initialize the detector and open (or create) its index.
+
+        Args:
+            index_file (str): Path of the SQLite index
+            max_distance (int): Maximum Hamming distance between near-duplicates (at most 7)
+            shingle_size (int): Number of words per shingle
+            min_tokens (int): Texts with fewer words are not fingerprinted
+        """
+        # Logger configuration
+        self.logger = logging.getLogger(__name__)
+
+        if max_distance >= 2 * BANDS:
+            raise ValueError(f"max_distance must be lower than twice the number of bands ({2 * BANDS})")
+        self.max_distance = max_distance
+        # Bits in which at least one band of a match within max_distance equals the probed band
+        self.probe_radius = max_distance // BANDS
+        self.shingle_size = shingle_size
+        self.min_tokens = min_tokens
+
+        directory = os.path.dirname(index_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(index_file)
+        self._create_schema()
+        self._prune()
+
+    def _create_schema(self) -> None:
+        """
+        Create the fingerprint table and band indexes, rebuilding an index with an older band layout.
+        """
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fingerprints'"
+        ).fetchone() is not None
+        rows = []
+        self.conn.execute("BEGIN")
+        if exists and version != LAYOUT_VERSION:
+            rows = self.conn.execute(
+                "SELECT id, fingerprint, cluster_id, link, relevant, sentiment_score, sentiment_label, created "
+                "FROM fingerprints"
+            ).fetchall()
+            self.conn.execute("DROP TABLE fingerprints")
+        band_columns = ", ".join(f"b{i} INTEGER" for i in range(BANDS))
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fingerprint INTEGER NOT NULL,
+                {band_columns},
+                cluster_id INTEGER,
+                link TEXT,
+                relevant INTEGER,
+                sentiment_score REAL,
+                sentiment_label TEXT,
+                created TEXT
+            )
+        """)
+        for i in range(BANDS):
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_band_{i} ON fingerprints (b{i})")
+        # Cluster ids are the ids of the first members, so they are kept
+        self.conn.executemany(
+            f"INSERT INTO fingerprints (id, fingerprint, {', '.join(f'b{i}' for i in range(BANDS))}, "
+            f"cluster_id, link, relevant, sentiment_score, sentiment_label, created) "
+            f"VALUES (?, ?, {', '.join('?' * BANDS)}, ?, ?, ?, ?, ?, ?)",
+            [(id_, stored, *self._bands(_to_unsigned(stored)), *rest) for id_, stored, *rest in rows]
+        )
+        self.conn.execute(f"PRAGMA user_version = {LAYOUT_VERSION}")
+        self.conn.commit()
+        if rows:
+            self.logger.info(f"Rebuilt the dedup index with {BANDS} bands of {BAND_BITS} bits ({len(rows)} fingerprints)")
+
+    def _prune(self) -> None:
+        """
+        Drop fingerprints older than the retention period.
+        """
+        cutoff = (datetime.now() - timedelta(days=DEDUP_RETENTION_DAYS)).isoformat()
+        deleted = self.conn.execute("DELETE FROM fingerprints WHERE created < ?", (cutoff,)).rowcount
+        self.conn.commit()
+        if deleted:
+            self.logger.info(f"Pruned {deleted} expired fingerprints from the dedup index")
+
+    def fingerprint(self, text: str) -> Optional[int]:
+        """
+        Compute the 64-bit SimHash of a text over word shingles.
+
+        Args:
+            text (str): Processed article text
+
+        Returns:
+            int: Unsigned 64-bit fingerprint, or None if the text is too short
+        """
+        tokens = _WORD_PATTERN.findall(text.lower()) if text else []
+        if len(tokens) < self.min_tokens:
+            return None
+
+        shingles = {
+            ' '.join(tokens[i:i + self.shingle_size])
+            for i in range(len(tokens) - self.shingle_size + 1)
+        }
+        digests = b''.join(
+            hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles
+        )
+        bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+        votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+        packed = np.packbits(votes > 0, bitorder='little')
+        return int.from_bytes(packed.tobytes(), 'little')
+
+    @staticmethod
+    def _bands(fingerprint: int) -> list:
+        """
+        Split a fingerprint into its LSH bands.
+        """
+        return [(fingerprint >> (i * BAND_BITS)) & BAND_MASK for i in range(BANDS)]
+
+    def _probes(self, band: int) -> list:
+        """
+        Band values within the probe radius (0 or 1 bit) of a band.
+        """
+        if self.probe_radius == 0:
+            return [band]
+        return [band, *(band ^ (1 << bit) for bit in range(BAND_BITS))]
+
+    def find(self, fingerprint: Optional[int]) -> Optional[dict]:
+        """
+        Find the closest indexed fingerprint within the maximum Hamming distance.
+
+        Args:
+            fingerprint (int): Fingerprint to look up
+
+        Returns:
+            dict: Cluster id and stored results of the match, or None
+        """
+        if fingerprint is None:
+            return None
+
+        probes = [self._probes(band) for band in self._bands(fingerprint)]
+        where = " OR ".join(f"b{i} IN ({', '.join('?' * len(values))})" for i, values in enumerate(probes))
+        rows = self.conn.execute(
+            f"SELECT fingerprint, cluster_id, relevant, sentiment_score, sentiment_label "
+            f"FROM fingerprints WHERE {where}",
+            [value for values in probes for value in values]
+        ).fetchall()
+
+        best = None
+        best_distance = self.max_distance + 1
+        for stored, cluster_id, relevant, score, label in rows:
+            distance = bin(_to_unsigned(stored) ^ fingerprint).count('1')
+            if distance < best_distance:
+                best_distance = distance
+                best = {
+                    'cluster_id': cluster_id,
+                    'relevant': bool(relevant),
+                    'sentiment_score': score,
+                    'sentiment_label': label,
+                    'distance': distance
+                }
+        return best
+
+    def add(self, fingerprint: Optional[int], link: str, relevant: bool,
+            sentiment_score: Optional[float] = None, sentiment_label: Optional[str] = None,
+            cluster_id: Optional[int] = None) -> Optional[int]:
+        """
+        Index a fingerprint with the results computed (or reused) for its article.
+
+        Args:
+            fingerprint (int): Fingerprint of the article
+            link (str): Article URL
+            relevant (bool): Whether the article mentions the target company
+            sentiment_score (float, optional): Sentiment score of the cluster
+            sentiment_label (str, optional): Sentiment label of the cluster
+            cluster_id (int, optional): Cluster to join, a new cluster is created if None
+
+        Returns:
+            int: Cluster id of the article, or None if it was not fingerprinted
+        """
+        if fingerprint is None:
+            return None
+
+        cursor = self.conn.execute(
+            f"INSERT INTO fingerprints (fingerprint, {', '.join(f'b{i}' for i in range(BANDS))}, "
+            f"cluster_id, link, relevant, sentiment_score, sentiment_label, created) "
+            f"VALUES (?, {', '.join('?' * BANDS)}, ?, ?, ?, ?, ?, ?)",
+            [_to_signed(fingerprint), *self._bands(fingerprint), cluster_id, link,
+             int(relevant), sentiment_score, sentiment_label, datetime.now().isoformat()]
+        )
+        if cluster_id is None:
+            cluster_id = cursor.lastrowid
+            self.conn.execute("UPDATE fingerprints SET cluster_id = ? WHERE id = ?", (cluster_id, cluster_id))
+        self.conn.commit()
+        return cluster_id
+
+    def close(self) -> None:
+        """
+        Close the index.
+        """
+        self.conn.close()
@@ -0,0 +1,270 @@
+"""
+Module name: embedding_store.py
+Author: Michele Grieco
+Description:
+    This module provides an EmbeddingStore class that keeps the document vectors of analyzed articles across
+    runs, and groups the recent negative articles into stories for the alerts.
+    Vectors are unit-normalized float32 rows appended to a memory-mapped NumPy matrix, which grows on disk by
+    EMBEDDING_GROWTH_ROWS rows at a time, so only the rows that are read are ever loaded in memory. A SQLite
+    index maps each article key to its row, with the publication time, sentiment and title used to select
+    and describe the stories. Rows are flushed to the matrix before they are indexed, so a crash never leaves
+    the index pointing at a missing vector. Copies found by the near-duplicate detector reuse the vector of
+    their cluster instead of being embedded.
+    Stories are built from the negative articles of the last STORY_WINDOW_HOURS with leader clustering: the
+    oldest unassigned article opens a story, and every unassigned article whose cosine similarity with it
+    reaches STORY_SIMILARITY joins it, computed for all of them with a single matrix-vector product.
+Usage:
+    from tools.embedding_store import EmbeddingStore
+    store = EmbeddingStore()
+    store.add_articles(relevant_articles)
+    for story in store.stories():
+        print(story['title'], story['size'], story['growth_rate'])
+    store.close()
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Optional
+import numpy as np # for the memory-mapped matrix and vectorized similarity
+from configuration.config import (
+    EMBEDDING_DIRECTORY, EMBEDDING_GROWTH_ROWS, STORY_SIMILARITY, STORY_WINDOW_HOURS,
+    STORY_GROWTH_HOURS, STORY_MAX_ARTICLES
+)
+from tools.incremental_score import parse_event_time
+
+_SQLITE_MAX_VARIABLES = 900
+
+
+def cluster_vectors(vectors: np.ndarray, threshold: float = STORY_SIMILARITY) -> np.ndarray:
+    """
+    Leader clustering of unit vectors: rows are taken in order, each unassigned row opens a cluster
+    that every unassigned row with cosine similarity at least threshold joins.
+
+    Args:
+        vectors (np.ndarray): Unit-normalized vectors, one per row, in leader order
+        threshold (float): Minimum cosine similarity with the leader
+
+    Returns:
+        np.ndarray: Cluster label of each row, numbered in order of creation
+    """
+    labels = np.full(len(vectors), -1, dtype=np.int64)
+    unassigned = np.arange(len(vectors))
+    label = 0
+    while unassigned.size:
+        leader = unassigned[0]
+        similarity = vectors[unassigned] @ vectors[leader]
+        labels[unassigned[similarity >= threshold]] = label
+        labels[leader] = label
+        unassigned = unassigned[labels[unassigned] < 0]
+        label += 1
+    return labels
+
+
+class EmbeddingStore:
+    """
+    Class for an append-only, memory-mapped store of article embeddings with a SQLite index.
+    """
+
+    def __init__(self, directory: str = EMBEDDING_DIRECTORY, growth_rows: int = EMBEDDING_GROWTH_ROWS) -> None:
+        """
+        Open (or create) the store.
+
+        Args:
+            directory (str): Directory holding the matrix and its index
+            growth_rows (int): Rows added to the matrix file when it is full
+        """
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(directory, exist_ok=True)
+        self.matrix_file = os.path.join(directory, "embeddings.f32")
+        self.growth_rows = growth_rows
+
+        self.conn = sqlite3.connect(os.path.join(directory, "embeddings.db"))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS embeddings (
+                row INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE,
+                dedup_cluster INTEGER,
+                event_time REAL NOT NULL,
+                sentiment REAL,
+                title TEXT,
+                link TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_embeddings_time ON embeddings(event_time);
+            CREATE INDEX IF NOT EXISTS idx_embeddings_cluster ON embeddings(dedup_cluster);
+        """)
+        dim = self.conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim = int(dim[0]) if dim else None
+        self.count = self.conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings").fetchone()[0]
+        self.matrix = None
+        if self.dim is not None:
+            self._reserve(self.count)
+        self.logger.info(f"Embedding store opened ({self.count} vectors)")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _reserve(self, rows: int) -> None:
+        """
+        Map the matrix file, growing it on disk if it holds fewer than the given rows.
+        """
+        row_bytes = self.dim * 4
+        size = os.path.getsize(self.matrix_file) if os.path.exists(self.matrix_file) else 0
+        capacity = size // row_bytes
+        if self.matrix is not None and capacity >= rows:
+            return
+        if capacity < max(rows, 1):
+            capacity = max(rows, capacity * 2, self.growth_rows)
+            # Extending the file leaves a sparse zero-filled tail, nothing is written until rows are added
+            with open(self.matrix_file, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+        self.matrix = np.memmap(self.matrix_file, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+
+    def _existing(self, column: str, values: list) -> dict:
+        """
+        Rows of the index matching values of a column, in chunks within SQLite's variable limit.
+        """
+        found = {}
+        for start in range(0, len(values), _SQLITE_MAX_VARIABLES):
+            chunk = values[start:start + _SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            for value, row in self.conn.execute(
+                    f"SELECT {column}, row FROM embeddings WHERE {column} IN ({placeholders})", chunk):
+                found.setdefault(value, row)
+        return found
+
+    def add_articles(self, articles: list) -> int:
+        """
+        Append the embeddings of analyzed articles not stored yet. Articles without an embedding
+        take the vector of their near-duplicate cluster when it is stored, and are skipped otherwise.
+
+        Args:
+            articles (list): Analyzed articles with 'embedding', 'cluster_id' and sentiment results
+
+        Returns:
+            int: Number of vectors added
+        """
+        articles = [a for a in articles if a.get('sentiment_score') is not None]
+        if not articles:
+            return 0
+        keys = [a.get('canonical_url') or a.get('link') for a in articles]
+        stored = self._existing('key', list(set(keys)))
+        clusters = self._existing('dedup_cluster', list({a.get('cluster_id') for a in articles} - {None}))
+
+        pending = []  # (key, vector or source row, article)
+        batch_clusters = {}
+        for key, article in zip(keys, articles):
+            if key in stored:
+                continue
+            stored[key] = None
+            vector = article.get('embedding')
+            cluster_id = article.get('cluster_id')
+            if vector is not None:
+                vector = np.asarray(vector, dtype=np.float32)
+                if self.dim is None:
+                    self.dim = len(vector)
+                    self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+                    self._reserve(self.count)
+                if len(vector) != self.dim:
+                    self.logger.warning(f"Embedding of {key} has {len(vector)} dimensions instead of {self.dim}, skipped")
+                    continue
+                norm = np.linalg.norm(vector)
+                if norm > 0:
+                    vector /= norm
+                if cluster_id is not None:
+                    batch_clusters.setdefault(cluster_id, len(pending))
+            elif cluster_id in clusters:
+                vector = clusters[cluster_id]
+            elif cluster_id in batch_clusters:
+                vector = pending[batch_clusters[cluster_id]][1]
+            else:
+                continue
+            pending.append((key, vector, article))
+        if not pending:
+            return 0
+
+        self._reserve(self.count + len(pending))
+        rows = []
+        for offset, (key, vector, article) in enumerate(pending):
+            row = self.count + offset
+            self.matrix[row] = self.matrix[vector] if isinstance(vector, int) else vector
+            published = parse_event_time(article.get('published'))
+            rows.append((row, key, article.get('cluster_id'), published.timestamp(),
+                         article.get('sentiment_score'), article.get('title'), article.get('link')))
+        self.matrix.flush()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO embeddings (row, key, dedup_cluster, event_time, sentiment, title, link) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        self.count += len(rows)
+        return len(rows)
+
+    def stories(self, now: Optional[float] = None, window_hours: float = STORY_WINDOW_HOURS,
+                growth_hours: float = STORY_GROWTH_HOURS, threshold: float = STORY_SIMILARITY,
+                max_articles: int = STORY_MAX_ARTICLES) -> list:
+        """
+        Group the recent negative articles into stories, fastest growing first.
+
+        Args:
+            now (float, optional): UNIX time the windows end at, now if None
+            window_hours (float): Age of the oldest article considered
+            growth_hours (float): Window over which the growth rate is measured
+            threshold (float): Minimum cosine similarity with the first article of a story
+            max_articles (int): Most recent negative articles clustered at most
+
+        Returns:
+            list: Story dictionaries with 'title', 'link', 'size', 'recent', 'growth_rate' (articles per hour
+                over growth_hours), 'sentiment_score', 'first_seen', 'last_seen' and the most negative 'articles'
+        """
+        now = time.time() if now is None else now
+        if self.matrix is None:
+            return []
+        rows = self.conn.execute(
+            "SELECT row, event_time, sentiment, title, link FROM ("
+            "  SELECT * FROM embeddings WHERE event_time >= ? AND sentiment < 0 ORDER BY event_time DESC LIMIT ?"
+            ") ORDER BY event_time, row",
+            (now - window_hours * 3600, max_articles)
+        ).fetchall()
+        if not rows:
+            return []
+
+        # Fancy indexing on the memory map reads only the selected rows
+        vectors = np.asarray(self.matrix[np.array([r[0] for r in rows])])
+        labels = cluster_vectors(vectors, threshold)
+        times = np.array([r[1] for r in rows])
+        recent = times >= now - growth_hours * 3600
+
+        stories = []
+        for label in range(labels.max() + 1):
+            members = np.flatnonzero(labels == label)
+            by_sentiment = sorted(members, key=lambda i: rows[i][2])
+            stories.append({
+                'title': rows[members[0]][3],
+                'link': rows[members[0]][4],
+                'size': len(members),
+                'recent': int(recent[members].sum()),
+                'growth_rate': float(recent[members].sum() / growth_hours),
+                'sentiment_score': float(np.mean([rows[i][2] for i in members])),
+                'first_seen': datetime.fromtimestamp(times[members[0]]).strftime("%Y-%m-%d %H:%M"),
+                'last_seen': datetime.fromtimestamp(times[members[-1]]).strftime("%Y-%m-%d %H:%M"),
+                'articles': [{'title': rows[i][3], 'link': rows[i][4], 'sentiment_score': rows[i][2]}
+                             for i in by_sentiment[:3]]
+            })
+        stories.sort(key=lambda s: (s['recent'], s['size']), reverse=True)
+        return stories
+
+    def close(self) -> None:
+        """
+        Flush the matrix and close the index.
+        """
+        if self.matrix is not None:
+            self.matrix.flush()
+            self.matrix = None
+        self.conn.close()
@@ -0,0 +1,368 @@
+"""
+Module name: extraction.py
+Author: Michele Grieco
+Description:
+    This module provides pluggable HTML extraction engines that parse each downloaded page once and
+    return only the main article body, dropping boilerplate such as navigation, cookie banners,
+    share widgets and footers. The default engine uses the C-backed lxml parser; a BeautifulSoup
+    engine is kept as a fallback when lxml is not installed.
+    Pages can also be fed incrementally while downloading, which lets the scraper stop reading once
+    enough paragraph text has been seen, without parsing the page a second time.
+    Incremental extractions also expose the page's <link rel="canonical"> URL once closed.
+Usage:
+    from tools.extraction import get_extractor
+    extractor = get_extractor()
+    text = extractor.extract(response.content, encoding="utf-8")
+
+    document = extractor.start(encoding="utf-8")
+    for chunk in response.iter_content(16384):
+        document.feed(chunk)
+    text = document.close()
+    canonical = document.canonical_url
+"""
+
+import abc
+import logging
+import re
+from typing import Optional, Union
+from bs4 import BeautifulSoup # for the fallback engine
+from configuration.config import EXTRACTION_ENGINE, EXTRACTION_MIN_BODY_CHARS
+
+try:
+    import lxml.html # C-backed HTML parser
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Elements that never contain article text
+BOILERPLATE_TAGS = (
+    'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'form', 'button',
+    'nav', 'header', 'footer', 'aside'
+)
+
+# class/id tokens identifying boilerplate containers
+BOILERPLATE_TOKENS = frozenset({
+    'cookie', 'cookies', 'consent', 'gdpr', 'banner', 'popup', 'modal', 'overlay',
+    'nav', 'navbar', 'navigation', 'menu', 'breadcrumb', 'breadcrumbs', 'footer',
+    'share', 'sharing', 'social', 'related', 'newsletter', 'subscribe', 'sidebar',
+    'advert', 'advertisement', 'ads', 'adv', 'promo', 'comments', 'tags'
+})
+
+# Containers that are never dropped, even if their class matches a boilerplate token
+PROTECTED_TAGS = frozenset({'html', 'body', 'main', 'article'})
+
+# Block-level elements that start a new line in the extracted text
+BLOCK_TAGS = frozenset({
+    'p', 'div', 'section', 'article', 'main', 'br', 'li', 'ul', 'ol', 'blockquote',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'table', 'tr', 'td', 'th', 'figcaption'
+})
+
+_TOKEN_SPLIT = re.compile(r'[\s_\-]+')
+_LINK_TAG = re.compile(rb'<link\b[^>]*>', re.IGNORECASE)
+_CANONICAL_REL = re.compile(rb'\brel\s*=\s*["\']?canonical\b', re.IGNORECASE)
+_HREF = re.compile(rb'\bhref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+
+
+def find_canonical_url(html: bytes) -> Optional[str]:
+    """
+    Find the <link rel="canonical"> URL of a raw page without parsing it.
+
+    Args:
+        html (bytes): Raw page
+
+    Returns:
+        str: Canonical URL as written in the page (possibly relative), or None
+    """
+    for tag in _LINK_TAG.finditer(html):
+        if _CANONICAL_REL.search(tag.group(0)):
+            href = _HREF.search(tag.group(0))
+            if href:
+                value = next(group for group in href.groups() if group is not None)
+                return value.decode('utf-8', 'replace').strip() or None
+    return None
+
+
+def is_boilerplate_attr(value: str) -> bool:
+    """
+    Check whether a class/id attribute value identifies a boilerplate container.
+
+    Args:
+        value (str): Concatenated class and id attribute values
+
+    Returns:
+        bool: True if any token matches a boilerplate token
+    """
+    return any(token in BOILERPLATE_TOKENS for token in _TOKEN_SPLIT.split(value.lower()))
+
+
+def clean_text(text: str) -> str:
+    """
+    Strip lines and collapse blank runs, as the scraper has always done.
+
+    Args:
+        text (str): Raw extracted text
+
+    Returns:
+        str: One non-empty chunk per line
+    """
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+
+class IncrementalExtraction:
+    """
+    Page fed chunk by chunk during download. The base implementation buffers the bytes and
+    extracts on close; engines able to parse incrementally also count paragraph text on the way.
+    """
+
+    def __init__(self, extractor, encoding: Optional[str] = None) -> None:
+        """
+        Args:
+            extractor (BaseExtractor): Engine used to extract the text on close
+            encoding (str, optional): Charset declared by the server
+        """
+        self.extractor = extractor
+        self.encoding = encoding
+        self.body_chars = 0  # paragraph text seen so far
+        self.canonical_url = None  # set on close
+        self._chunks = []
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Feed the next chunk of the page.
+
+        Args:
+            chunk (bytes): Raw bytes
+        """
+        self._chunks.append(chunk)
+
+    def close(self) -> str:
+        """
+        Finish the page and extract its main text.
+
+        Returns:
+            str: Main article text
+        """
+        html = b''.join(self._chunks)
+        self._chunks = []
+        self.canonical_url = find_canonical_url(html)
+        return self.extractor.extract(html, self.encoding)
+
+
+class LxmlIncrementalExtraction(IncrementalExtraction):
+    """
+    Incremental extraction on an lxml pull parser: the page is parsed while it downloads and the
+    resulting tree is reused for extraction.
+    """
+
+    def __init__(self, extractor, encoding: Optional[str] = None) -> None:
+        super().__init__(extractor, encoding)
+        self._parser = etree.HTMLPullParser(events=('end',), tag='p', encoding=encoding,
+                                            remove_comments=True, remove_pis=True)
+        self._parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+        self._fed = False
+
+    def feed(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        self._parser.feed(chunk)
+        self._fed = True
+        for _, paragraph in self._parser.read_events():
+            self.body_chars += len(paragraph.text_content().strip())
+
+    def close(self) -> str:
+        if not self._fed:
+            return ""
+        root = self._parser.close()
+        canonical = root.xpath('//link[@rel="canonical"]/@href')
+        self.canonical_url = (canonical[0].strip() or None) if canonical else None
+        return self.extractor.extract_tree(root)
+
+
+class BaseExtractor(abc.ABC):
+    """
+    Base class for HTML extraction engines.
+    """
+
+    name = "base"
+
+    def __init__(self, min_body_chars: int = EXTRACTION_MIN_BODY_CHARS) -> None:
+        """
+        Args:
+            min_body_chars (int): Minimum paragraph text for a container to be chosen as main body
+        """
+        self.logger = logging.getLogger(__name__)
+        self.min_body_chars = min_body_chars
+
+    @abc.abstractmethod
+    def extract(self, html: Union[bytes, str], encoding: Optional[str] = None) -> str:
+        """
+        Extract the main article text from an HTML page.
+
+        Args:
+            html (bytes | str): Raw page
+            encoding (str, optional): Charset declared by the server
+
+        Returns:
+            str: Main article text
+        """
+
+    def start(self, encoding: Optional[str] = None) -> IncrementalExtraction:
+        """
+        Start an incremental extraction, to be fed while the page downloads.
+
+        Args:
+            encoding (str, optional): Charset declared by the server
+
+        Returns:
+            IncrementalExtraction: Document accepting chunks
+        """
+        return IncrementalExtraction(self, encoding)
+
+
+class LxmlExtractor(BaseExtractor):
+    """
+    Extraction engine based on lxml.
+    """
+
+    name = "lxml"
+
+    def extract(self, html: Union[bytes, str], encoding: Optional[str] = None) -> str:
+        if not html:
+            return ""
+        parser = lxml.html.HTMLParser(encoding=encoding if isinstance(html, bytes) else None,
+                                      remove_comments=True, remove_pis=True)
+        root = lxml.html.document_fromstring(html, parser=parser)
+        return self.extract_tree(root)
+
+    def start(self, encoding: Optional[str] = None) -> IncrementalExtraction:
+        return LxmlIncrementalExtraction(self, encoding)
+
+    def extract_tree(self, root) -> str:
+        """
+        Extract the main article text from an already parsed page.
+
+        Args:
+            root (lxml.html.HtmlElement): Root of the parsed page
+
+        Returns:
+            str: Main article text
+        """
+        for element in list(root.iter(*BOILERPLATE_TAGS)):
+            element.drop_tree()
+        for element in root.xpath('//*[@class or @id]'):
+            if element.tag in PROTECTED_TAGS or element.getparent() is None:
+                continue
+            attrs = f"{element.get('class', '')} {element.get('id', '')}"
+            if is_boilerplate_attr(attrs) and not element.xpath('.//article|.//main'):
+                element.drop_tree()
+
+        main = self._find_main(root)
+        for element in main.iter(*BLOCK_TAGS):
+            element.tail = '\n' + (element.tail or '')
+            element.text = '\n' + (element.text or '')
+        return clean_text(main.text_content())
+
+    def _find_main(self, root):
+        """
+        Pick the element holding the article body: an articleBody/article/main element when present,
+        otherwise the parent of the paragraphs with the most text.
+        """
+        for candidates in (root.xpath('//*[@itemprop="articleBody"]'), root.xpath('//article'),
+                           root.xpath('//main')):
+            if candidates:
+                best = max(candidates, key=lambda el: len(el.text_content()))
+                if len(best.text_content().strip()) >= self.min_body_chars:
+                    return best
+
+        scores = {}
+        for paragraph in root.iter('p'):
+            parent = paragraph.getparent()
+            if parent is not None:
+                scores[parent] = scores.get(parent, 0) + len(paragraph.text_content().strip())
+        if scores:
+            best, total = max(scores.items(), key=lambda item: item[1])
+            if total >= self.min_body_chars:
+                return best
+
+        body = root.find('body')
+        return body if body is not None else root
+
+
+class SoupExtractor(BaseExtractor):
+    """
+    Extraction engine based on BeautifulSoup, used when lxml is not available.
+    """
+
+    name = "soup"
+
+    def extract(self, html: Union[bytes, str], encoding: Optional[str] = None) -> str:
+        if not html:
+            return ""
+        soup = BeautifulSoup(html, 'lxml' if LXML_AVAILABLE else 'html.parser',
+                             from_encoding=encoding if isinstance(html, bytes) else None)
+
+        for element in soup(list(BOILERPLATE_TAGS)):
+            element.decompose()
+        for element in soup.find_all(lambda tag: tag.has_attr('class') or tag.has_attr('id')):
+            if element.decomposed or element.name in PROTECTED_TAGS:
+                continue
+            classes = element.get('class', [])
+            if isinstance(classes, list):
+                classes = ' '.join(classes)
+            if is_boilerplate_attr(f"{classes} {element.get('id', '')}") and not element.find(['article', 'main']):
+                element.decompose()
+
+        main = self._find_main(soup)
+        return clean_text(main.get_text('\n'))
+
+    def _find_main(self, soup):
+        """
+        Pick the element holding the article body, as LxmlExtractor does.
+        """
+        for candidates in (soup.find_all(attrs={'itemprop': 'articleBody'}), soup.find_all('article'),
+                           soup.find_all('main')):
+            if candidates:
+                best = max(candidates, key=lambda el: len(el.get_text()))
+                if len(best.get_text().strip()) >= self.min_body_chars:
+                    return best
+
+        scores = {}
+        parents = {}
+        for paragraph in soup.find_all('p'):
+            parent = paragraph.parent
+            if parent is not None:
+                parents[id(parent)] = parent
+                scores[id(parent)] = scores.get(id(parent), 0) + len(paragraph.get_text().strip())
+        if scores:
+            best = max(scores, key=scores.get)
+            if scores[best] >= self.min_body_chars:
+                return parents[best]
+
+        return soup.body or soup
+
+
+EXTRACTORS = {
+    LxmlExtractor.name: LxmlExtractor,
+    SoupExtractor.name: SoupExtractor
+}
+
+
+def get_extractor(name: str = EXTRACTION_ENGINE) -> BaseExtractor:
+    """
+    Build the configured extraction engine, falling back to BeautifulSoup when lxml is missing.
+
+    Args:
+        name (str): Engine name ('lxml' or 'soup')
+
+    Returns:
+        BaseExtractor: Extraction engine instance
+    """
+    if name == LxmlExtractor.name and not LXML_AVAILABLE:
+        logging.getLogger(__name__).warning("lxml not installed, falling back to BeautifulSoup extraction")
+        name = SoupExtractor.name
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extraction engine: {name}")
+    return EXTRACTORS[name]()
@@ -0,0 +1,321 @@
+"""
+Module name: fetcher.py
+Author: Michele Grieco
+Description:
+    This module provides a ResilientFetcher class, the HTTP layer used by the scraper. Requests go through a
+    shared requests.Session with separate connect/read timeouts and a token-bucket rate limit per host.
+    Retryable failures (429/5xx statuses, connection errors and timeouts) are retried a bounded number of times
+    with full-jitter exponential backoff, honoring Retry-After. A per-host circuit breaker, persisted across
+    runs, opens after consecutive failures so known-dead hosts are skipped immediately until a cooldown expires;
+    a single trial request is then let through to close it again. Redirects are followed hop by hop, so the
+    rate limit, retries and circuit of each hop apply to the host that answered it: a publisher failing after a
+    redirector (e.g. news.google.com) does not open the redirector's circuit.
+Usage:
+    from tools.fetcher import ResilientFetcher, CircuitOpenError
+    fetcher = ResilientFetcher()
+    response = fetcher.get(url, stream=True)
+    fetcher.close()
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urljoin, urlsplit
+import requests # for HTTP requests
+from configuration.config import (
+    REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT, FETCH_RATE_PER_HOST, FETCH_BURST, FETCH_HOST_LIMITS,
+    FETCH_MAX_RETRIES, FETCH_BACKOFF_BASE, FETCH_BACKOFF_MAX, FETCH_RETRY_STATUSES,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN_SECONDS, CIRCUIT_STATE_FILE
+)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised when a request is skipped because the circuit of its host is open.
+    """
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the request rate to a host.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum number of tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take a token, waiting until one is available.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            # A negative balance is the time this caller has to wait for its token
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class ResilientFetcher:
+    """
+    Class for rate-limited HTTP requests with retries and per-host circuit breakers.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None,
+                 rate: float = FETCH_RATE_PER_HOST,
+                 burst: float = FETCH_BURST,
+                 host_limits: Optional[dict] = None,
+                 max_retries: int = FETCH_MAX_RETRIES,
+                 backoff_base: float = FETCH_BACKOFF_BASE,
+                 backoff_max: float = FETCH_BACKOFF_MAX,
+                 timeout: tuple = (REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT),
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 cooldown: float = CIRCUIT_COOLDOWN_SECONDS,
+                 state_file: str = CIRCUIT_STATE_FILE) -> None:
+        """
+        Initialize the fetcher and load the persisted circuit states.
+
+        Args:
+            session (requests.Session, optional): Session to use, a new one if None
+            rate (float): Requests per second allowed per host
+            burst (float): Requests allowed in a burst per host
+            host_limits (dict, optional): Per-host (rate, burst) overrides, the configured ones if None
+            max_retries (int): Retries after the first attempt
+            backoff_base (float): Base delay (seconds) of the exponential backoff
+            backoff_max (float): Maximum delay (seconds) between attempts
+            timeout (tuple): (connect, read) timeouts in seconds
+            failure_threshold (int): Consecutive failures opening the circuit of a host
+            cooldown (float): Seconds a circuit stays open before a trial request
+            state_file (str): Path of the JSON circuit state
+        """
+        # Logger configuration
+        self.logger = logging.getLogger(__name__)
+
+        self.session = session or requests.Session()
+        self.rate = rate
+        self.burst = burst
+        self.host_limits = FETCH_HOST_LIMITS if host_limits is None else host_limits
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state_file = state_file
+
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.circuits = self._load_state()  # host -> {'failures': int, 'opened_at': float or None}
+        self.trials = set()                 # hosts with a half-open trial request in progress
+
+    def _load_state(self) -> dict:
+        """
+        Load the persisted circuit states.
+        """
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.error(f"Error loading circuit breaker state: {e}")
+            return {}
+
+    def _save_state(self) -> None:
+        """
+        Atomically persist the circuit states.
+        """
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.circuits, f)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            self.logger.error(f"Error saving circuit breaker state: {e}")
+
+    def _bucket(self, host: str) -> TokenBucket:
+        """
+        Token bucket of a host, created on first use.
+        """
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+                bucket = self.buckets[host] = TokenBucket(rate, burst)
+            return bucket
+
+    def _allow(self, host: str) -> bool:
+        """
+        Check the circuit of a host. Once the cooldown of an open circuit has expired,
+        a single trial request is allowed (half-open state).
+        """
+        with self.lock:
+            circuit = self.circuits.get(host)
+            if circuit is None or circuit['opened_at'] is None:
+                return True
+            if time.time() - circuit['opened_at'] < self.cooldown or host in self.trials:
+                return False
+            self.trials.add(host)
+            return True
+
+    def _record(self, host: str, success: bool) -> None:
+        """
+        Update the circuit of a host with the outcome of a request.
+        """
+        with self.lock:
+            self.trials.discard(host)
+            if success:
+                circuit = self.circuits.pop(host, None)
+                if circuit is not None:
+                    if circuit['opened_at'] is not None:
+                        self.logger.info(f"Circuit for {host} closed")
+                    self._save_state()
+                return
+
+            circuit = self.circuits.setdefault(host, {'failures': 0, 'opened_at': None})
+
+            circuit['failures'] += 1
+            if circuit['opened_at'] is not None or circuit['failures'] >= self.failure_threshold:
+                circuit['opened_at'] = time.time()
+                self.logger.warning(f"Circuit for {host} open for {self.cooldown:.0f}s "
+                                    f"after {circuit['failures']} consecutive failures")
+            self._save_state()
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """
+        Delay before the next attempt: Retry-After when the server sends one,
+        otherwise full-jitter exponential backoff.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 0
+            response (requests.Response, optional): Failed response
+
+        Returns:
+            float: Delay in seconds, at most backoff_max
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError, IndexError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url: str, allow_redirects: bool = True, **kwargs) -> requests.Response:
+        """
+        Perform a GET request with rate limiting, retries and circuit breaking.
+        Redirects are followed one hop at a time, each hop limited and recorded on its own host.
+
+        Args:
+            url (str): URL to fetch
+            allow_redirects (bool): Whether to follow redirects, at most session.max_redirects of them
+            **kwargs: Extra arguments for requests.Session.get (e.g. stream=True)
+
+        Returns:
+            requests.Response: Last response, possibly with an error status, with the redirects in history
+
+        Raises:
+            CircuitOpenError: If the circuit of the host of a hop is open
+            requests.TooManyRedirects: If the redirects exceed session.max_redirects
+            requests.RequestException: If the last attempt of a hop failed without a response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        history = []
+        current = url
+        while True:
+            response = self._get_hop(current, **kwargs)
+            target = self.session.get_redirect_target(response)
+            if not allow_redirects or target is None:
+                response.history = history
+                return response
+            response.close()
+            history.append(response)
+            if len(history) > self.session.max_redirects:
+                raise requests.TooManyRedirects(f"Exceeded {self.session.max_redirects} redirects", response=response)
+            current = urljoin(response.url, target)
+
+    def _get_hop(self, url: str, **kwargs) -> requests.Response:
+        """
+        Request a single URL without following redirects, with the rate limit, retries and circuit of its host.
+
+        Args:
+            url (str): URL to fetch
+            **kwargs: Extra arguments for requests.Session.get
+
+        Returns:
+            requests.Response: Last response, possibly with an error status or a redirect
+
+        Raises:
+            CircuitOpenError: If the circuit of the host is open
+            requests.RequestException: If the last attempt failed without a response
+        """
+        host = urlsplit(url).hostname or ''
+        if not self._allow(host):
+            raise CircuitOpenError(f"Circuit open for host {host}")
+
+        bucket = self._bucket(host)
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            last = attempt == self.max_retries
+            try:
+                response = self.session.get(url, allow_redirects=False, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last:
+                    self._record(host, success=False)
+                    raise
+                delay = self._backoff(attempt)
+                self.logger.info(f"Retrying {url} in {delay:.1f}s after error: {e}")
+                time.sleep(delay)
+                continue
+            except requests.RequestException:
+                # Invalid requests say nothing about the health of the host
+                with self.lock:
+                    self.trials.discard(host)
+                raise
+
+            if response.status_code not in FETCH_RETRY_STATUSES:
+                self._record(host, success=True)
+                return response
+            if last:
+                self._record(host, success=False)
+                return response
+            delay = self._backoff(attempt, response)
+            response.close()
+            self.logger.info(f"Retrying {url} in {delay:.1f}s after status {response.status_code}")
+            time.sleep(delay)
+
+    def close(self) -> None:
+        """
+        Close the session and persist the circuit states.
+        """
+        self.session.close()
+        with self.lock:
+            self._save_state()
@@ -0,0 +1,344 @@
+"""
+Module name: incremental_score.py
+Author: Michele Grieco
+Description:
+    This module provides an IncrementalScoreEngine class that maintains running reputation aggregates
+    across runs: an exponentially decayed score and sliding-window scores (24h/7d/30d by default).
+    Each new article is folded in with O(1) work using hourly buckets, so the stable score never needs
+    a recomputation over the full history. The state is persisted as JSON between runs and can be
+    rebuilt from the detailed results CSV files.
+Usage:
+    from tools.incremental_score import IncrementalScoreEngine
+    engine = IncrementalScoreEngine()
+    engine.update(-0.4, weight=1200, timestamp=datetime.now(), key=article['link'])
+    engine.save()
+    print(engine.snapshot())
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Optional
+import pandas as pd # for reading detailed results
+from configuration.config import (
+    DATA_DIRECTORY, SCORE_STATE_FILE, SCORE_DECAY_HALF_LIFE_HOURS, SCORE_WINDOWS
+)
+
+
+def parse_event_time(published, fallback: Optional[datetime] = None) -> datetime:
+    """
+    Parse the publication date of an article, as found in RSS feeds or detailed results.
+
+    Args:
+        published: RFC 822 date (RSS), ISO date, or None
+        fallback (datetime, optional): Value returned when the date cannot be parsed
+
+    Returns:
+        datetime: Naive local datetime of the event
+    """
+    fallback = fallback or datetime.now()
+    if not published or published == 'N/A' or (isinstance(published, float) and math.isnan(published)):
+        return fallback
+    try:
+        parsed = parsedate_to_datetime(str(published))
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(str(published))
+        except ValueError:
+            return fallback
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    # Articles dated in the future would freeze the windows, clamp them to the fallback
+    return min(parsed, fallback)
+
+
+class IncrementalScoreEngine:
+    """
+    Class maintaining decayed and sliding-window reputation scores with O(1) updates.
+    """
+
+    def __init__(self, state_file: str = SCORE_STATE_FILE,
+                 half_life_hours: float = SCORE_DECAY_HALF_LIFE_HOURS,
+                 windows: Optional[dict] = None) -> None:
+        """
+        Initialize the engine and load its persisted state if present.
+
+        Args:
+            state_file (str): Path of the JSON state file
+            half_life_hours (float): Half-life of the exponentially decayed score
+            windows (dict, optional): Mapping of window name to length in hours
+        """
+        # Logger configuration
+        self.logger = logging.getLogger(__name__)
+
+        self.state_file = state_file
+        self.half_life_hours = half_life_hours
+        self.windows = dict(windows or SCORE_WINDOWS)
+        self.max_window = max(self.windows.values())
+        self.reset()
+        self.load()
+
+    def reset(self) -> None:
+        """
+        Clear all running aggregates.
+        """
+        self.decayed_ws = 0.0   # decayed sum of weight * score
+        self.decayed_w = 0.0    # decayed sum of weights
+        self.decay_time = None  # UNIX time the decayed sums refer to
+        self.head_hour = None   # most recent hour folded into the windows
+        self.buckets = {}       # hour -> [sum(weight * score), sum(weight), count]
+        self.totals = {name: [0.0, 0.0, 0] for name in self.windows}
+        self.seen = {}          # article key hash -> hour, to avoid counting re-fetched articles twice
+        self.article_count = 0
+
+    def _decay(self, elapsed_seconds: float) -> float:
+        """
+        Decay factor for the given elapsed time.
+
+        Args:
+            elapsed_seconds (float): Time elapsed in seconds
+
+        Returns:
+            float: Multiplicative decay factor
+        """
+        return 0.5 ** (elapsed_seconds / (self.half_life_hours * 3600.0))
+
+    def _window_start(self, name: str, head_hour: int) -> int:
+        """
+        First hour included in a window ending at head_hour.
+        """
+        return head_hour - self.windows[name] + 1
+
+    def _window_start_max(self, head_hour: int) -> int:
+        """
+        First hour included in the largest window ending at head_hour.
+        """
+        return head_hour - self.max_window + 1
+
+    def _advance(self, hour: int) -> None:
+        """
+        Move the window heads forward to the given hour, subtracting buckets that fall out.
+        The work is bounded by the window length, so it is O(1) per article.
+
+        Args:
+            hour (int): New head hour (hours since epoch)
+        """
+        if self.head_hour is None:
+            self.head_hour = hour
+            return
+        if hour <= self.head_hour:
+            return
+
+        for name, hours in self.windows.items():
+            old_start = self._window_start(name, self.head_hour)
+            new_start = self._window_start(name, hour)
+            if new_start - old_start >= hours:
+                self.totals[name] = [0.0, 0.0, 0]
+                continue
+            total = self.totals[name]
+            for h in range(old_start, new_start):
+                bucket = self.buckets.get(h)
+                if bucket:
+                    total[0] -= bucket[0]
+                    total[1] -= bucket[1]
+                    total[2] -= bucket[2]
+
+        # Buckets that left the largest window are no longer needed
+        old_start = self._window_start_max(self.head_hour)
+        new_start = self._window_start_max(hour)
+        if new_start - old_start >= self.max_window:
+            self.buckets = {h: b for h, b in self.buckets.items() if h >= new_start}
+        else:
+            for h in range(old_start, new_start):
+                self.buckets.pop(h, None)
+        self.head_hour = hour
+
+    def _forget_seen(self) -> None:
+        """
+        Drop dedup keys registered before the largest window. Keys are stored in insertion order
+        with the head hour at insertion time, so only the oldest entries are inspected.
+        """
+        cutoff = self._window_start_max(self.head_hour)
+        while self.seen:
+            key = next(iter(self.seen))
+            if self.seen[key] >= cutoff:
+                break
+            del self.seen[key]
+
+    def update(self, score: float, weight: float = 1.0,
+               timestamp: Optional[datetime] = None, key: Optional[str] = None) -> bool:
+        """
+        Fold a single article into the running aggregates.
+
+        Args:
+            score (float): Sentiment score between -1 and 1
+            weight (float): Article weight (e.g. content length), articles with weight 0 are not counted
+            timestamp (datetime, optional): Event time of the article, now if None
+            key (str, optional): Stable article identifier (e.g. link) used to skip re-fetched articles
+
+        Returns:
+            bool: True if the article was counted, False if it was already seen or has no weight
+        """
+        timestamp = timestamp or datetime.now()
+        epoch = timestamp.timestamp()
+        hour = int(epoch // 3600)
+
+        if key is not None:
+            key_hash = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+            if key_hash in self.seen:
+                return False
+
+        weight = 1.0 if weight is None or math.isnan(weight) else float(weight)
+        if weight <= 0:
+            return False
+
+        # Exponentially decayed score, anchored at the most recent event time
+        if self.decay_time is None:
+            self.decay_time = epoch
+        if epoch >= self.decay_time:
+            factor = self._decay(epoch - self.decay_time)
+            self.decayed_ws = self.decayed_ws * factor + weight * score
+            self.decayed_w = self.decayed_w * factor + weight
+            self.decay_time = epoch
+        else:
+            factor = self._decay(self.decay_time - epoch)
+            self.decayed_ws += weight * score * factor
+            self.decayed_w += weight * factor
+
+        # Sliding windows
+        self._advance(hour)
+        if hour >= self._window_start_max(self.head_hour):
+            bucket = self.buckets.setdefault(hour, [0.0, 0.0, 0])
+            bucket[0] += weight * score
+            bucket[1] += weight
+            bucket[2] += 1
+            for name in self.windows:
+                if hour >= self._window_start(name, self.head_hour):
+                    total = self.totals[name]
+                    total[0] += weight * score
+                    total[1] += weight
+                    total[2] += 1
+
+        if key is not None:
+            self.seen[key_hash] = self.head_hour
+            self._forget_seen()
+        self.article_count += 1
+        return True
+
+    def snapshot(self, now: Optional[datetime] = None) -> dict:
+        """
+        Return the current aggregates, expiring windows up to the given time.
+
+        Args:
+            now (datetime, optional): Reference time, now if None
+
+        Returns:
+            dict: Decayed score and per-window scores and article counts
+        """
+        now = now or datetime.now()
+        self._advance(int(now.timestamp() // 3600))
+
+        result = {'decayed_score': 0.0}
+        if self.decayed_w > 0:
+            result['decayed_score'] = self.decayed_ws / self.decayed_w
+        for name, (ws, w, count) in self.totals.items():
+            result[f"score_{name}"] = ws / w if count > 0 and w > 0 else 0.0
+            result[f"articles_{name}"] = count
+        return result
+
+    def load(self) -> None:
+        """
+        Load the persisted state, if present.
+        """
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('windows') != self.windows:
+                self.logger.warning("Score windows changed since last run, rebuild the state from detailed results")
+                return
+            self.decayed_ws = state['decayed_ws']
+            self.decayed_w = state['decayed_w']
+            self.decay_time = state['decay_time']
+            self.head_hour = state['head_hour']
+            self.buckets = {int(h): b for h, b in state['buckets'].items()}
+            self.totals = state['totals']
+            self.seen = state['seen']
+            self.article_count = state['article_count']
+            self.logger.info(f"Loaded incremental score state ({self.article_count} articles)")
+        except Exception as e:
+            self.logger.error(f"Error loading incremental score state: {e}")
+            self.reset()
+
+    def save(self) -> None:
+        """
+        Atomically persist the running aggregates.
+        """
+        state = {
+            'windows': self.windows,
+            'decayed_ws': self.decayed_ws,
+            'decayed_w': self.decayed_w,
+            'decay_time': self.decay_time,
+            'head_hour': self.head_hour,
+            'buckets': {str(h): b for h, b in self.buckets.items()},
+            'totals': self.totals,
+            'seen': self.seen,
+            'article_count': self.article_count
+        }
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            self.logger.error(f"Error saving incremental score state: {e}")
+
+    def rebuild_from_results(self, directory: str = DATA_DIRECTORY) -> int:
+        """
+        Rebuild the aggregates from the detailed results CSV files.
+
+        Args:
+            directory (str): Directory containing detailed_results_*.csv files
+
+        Returns:
+            int: Number of articles folded into the rebuilt state
+        """
+        files = sorted(glob.glob(os.path.join(directory, "detailed_results_*.csv")))
+        frames = []
+        for filepath in files:
+            try:
+                frames.append(pd.read_csv(filepath))
+            except Exception as e:
+                self.logger.error(f"Error reading {filepath}: {e}")
+
+        self.reset()
+        if not frames:
+            self.logger.warning("No detailed results found, incremental score state is empty")
+            self.save()
+            return 0
+
+        df = pd.concat(frames, ignore_index=True)
+        df['event_time'] = [
+            parse_event_time(published, pd.to_datetime(ts).to_pydatetime())
+            for published, ts in zip(df.get('published', [None] * len(df)), df['timestamp'])
+        ]
+        df = df.sort_values('event_time', kind='stable')
+        weights = df['weight'] if 'weight' in df.columns else [1.0] * len(df)
+
+        # Articles are keyed by canonical URL, when the results record it
+        keys = df['canonical_url'].fillna(df['link']) if 'canonical_url' in df.columns else df['link']
+        for score, weight, event_time, key in zip(df['sentiment_score'], weights, df['event_time'], keys):
+            self.update(float(score), float(weight), event_time, key=str(key))
+
+        self.save()
+        self.logger.info(f"Incremental score state rebuilt from {len(files)} files ({self.article_count} articles)")
+        return self.article_count
@@ -0,0 +1,215 @@
+"""
+Module name: journal.py
+Author: Michele Grieco
+Description:
+    This module provides a RunJournal class that checkpoints an analysis run article by article.
+    Each analyzed article is appended to a JSONL journal in the data directory and flushed to disk, so a run
+    that dies halfway (OOM, killed container, model error) can be restarted with the same run id: journaled
+    articles are restored with their results instead of being fetched and analyzed again. A torn last line
+    left by a crash is ignored and truncated. After a successful finish the journal is compacted into a single
+    completion record.
+Usage:
+    from tools.journal import RunJournal
+    journal = RunJournal("20250101_120000")
+    restored = journal.restore()
+    journal.append(article, relevant)
+    journal.complete(score)
+"""
+
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Optional
+from configuration.config import JOURNAL_DIRECTORY
+from tools.article import Article
+
+# Article fields needed to score a restored article and save its detailed results
+JOURNAL_FIELDS = (
+    'title', 'link', 'canonical_url', 'published', 'date', 'audit_sample', 'content_length', 'mention_count',
+    'sentiment_score', 'sentiment_label', 'cluster_id', 'duplicate', 'dedup_weight', 'embedding',
+    'language'
+)
+
+_RUN_ID_PATTERN = re.compile(r'^[\w.-]+$')
+
+
+def article_record(article: Article, relevant: bool) -> dict:
+    """
+    Serialize the results of an analyzed article, e.g. for the journal or the work queue.
+
+    Args:
+        article (Article): Analyzed article
+        relevant (bool): Whether the article mentions the target company
+
+    Returns:
+        dict: JSON-serializable record with 'relevant' and the JOURNAL_FIELDS
+    """
+    record = {'relevant': relevant}
+    record.update({field: getattr(article, field) for field in JOURNAL_FIELDS})
+    return record
+
+
+def article_from_record(record: dict) -> Article:
+    """
+    Rebuild an analyzed article from a record produced by article_record.
+
+    Args:
+        record (dict): Article record
+
+    Returns:
+        Article: Article with its analysis results
+    """
+    article = Article(title=record['title'], link=record['link'])
+    for field in JOURNAL_FIELDS:
+        if field in record:
+            setattr(article, field, record[field])
+    return article
+
+
+class RunJournal:
+    """
+    Class for an append-only, crash-safe journal of the articles analyzed in a run.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, directory: str = JOURNAL_DIRECTORY) -> None:
+        """
+        Open the journal of a run, loading the records of a previous attempt if present.
+
+        Args:
+            run_id (str, optional): Run identifier, a new timestamp-based id if None
+            directory (str): Directory holding the journals
+        """
+        # Logger configuration
+        self.logger = logging.getLogger(__name__)
+
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        if not _RUN_ID_PATTERN.match(self.run_id):
+            raise ValueError(f"Invalid run id: {self.run_id!r}")
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{self.run_id}.jsonl")
+
+        self.timestamp = None
+        self.records = []
+        self.completed = None
+        self._load()
+
+        self.file = open(self.path, 'a', encoding='utf-8')
+        if self.timestamp is None:
+            self.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._write({'type': 'run', 'run_id': self.run_id, 'timestamp': self.timestamp})
+
+    def _load(self) -> None:
+        """
+        Read the records of a previous attempt, truncating a torn last line.
+        """
+        if not os.path.exists(self.path):
+            return
+
+        valid_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Only the last line can be torn, as every record is flushed before the next one
+                    self.logger.warning(f"Ignoring torn record at the end of journal {self.path}")
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                valid_size += len(line)
+
+                if record['type'] == 'run':
+                    self.timestamp = record['timestamp']
+                elif record['type'] == 'article':
+                    self.records.append(record)
+                elif record['type'] == 'completed':
+                    self.completed = record
+                    self.timestamp = record['timestamp']
+
+        if valid_size < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+        if self.records:
+            self.logger.info(f"Resuming run {self.run_id} with {len(self.records)} journaled articles")
+
+    def _write(self, record: dict) -> None:
+        """
+        Append a record and force it to disk.
+        """
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    @property
+    def links(self) -> set:
+        """
+        Links and canonical URLs of the articles already analyzed in this run.
+        """
+        links = {record['link'] for record in self.records}
+        links.update(record['canonical_url'] for record in self.records if record.get('canonical_url'))
+        return links
+
+    def restore(self) -> list:
+        """
+        Rebuild the articles analyzed by a previous attempt of the run.
+
+        Returns:
+            list: (Article, relevant) tuples in journal order
+        """
+        return [(article_from_record(record), record['relevant']) for record in self.records]
+
+    def append(self, article: Article, relevant: bool) -> None:
+        """
+        Checkpoint an analyzed article.
+
+        Args:
+            article (Article): Analyzed article
+            relevant (bool): Whether the article mentions the target company
+        """
+        record = {'type': 'article', **article_record(article, relevant)}
+        self._write(record)
+        self.records.append(record)
+
+    def complete(self, score: float, **summary) -> None:
+        """
+        Mark the run as completed and compact the journal into a single completion record.
+
+        Args:
+            score (float): Reputation score of the run
+            **summary: Additional values stored in the completion record
+        """
+        self.completed = {
+            'type': 'completed',
+            'run_id': self.run_id,
+            'timestamp': self.timestamp,
+            'score': score,
+            'articles': len(self.records),
+            'relevant': sum(1 for record in self.records if record['relevant']),
+            **summary
+        }
+        self.file.close()
+        tmp_file = f"{self.path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.completed) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.path)
+        self.records = []
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.logger.info(f"Run {self.run_id} completed, journal compacted")
+
+    def close(self) -> None:
+        """
+        Close the journal file.
+        """
+        self.file.close()
+
+    def discard(self) -> None:
+        """
+        Close and delete the journal of a run that was never started.
+        """
+        self.file.close()
+        if not self.records and self.completed is None and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,219 @@
+"""
+Module name: language.py
+Author: Michele Grieco
+Description:
+    This module identifies the language of articles and routes them to the analysis stages of their language.
+    LanguageIdentifier is an offline identifier based on stopword profiles: the most frequent function words
+    of each language are counted in the first words of a text, a word shared by several languages counting
+    for each of them in proportion. It needs no model and takes microseconds per text, so it runs on the title
+    and summary of feed entries before download, and on the full content after extraction.
+    LanguageRouter keeps one set of analysis stages (preprocessor, NER, sentiment analyzer) per language of
+    LANGUAGE_MODELS, loaded the first time an article of that language is seen. Articles in other languages
+    are skipped. Per-language counts are reported at the end of each run.
+Usage:
+    from tools.language import LanguageRouter
+    router = LanguageRouter()
+    if router.accepts(router.identify_entry(entry.title, entry.summary)):
+        ...
+    language = router.identify_content(article.content)
+    stages = router.get_stages(language)
+    if stages is not None:
+        preprocessor, ner, sentiment_analyzer = stages
+    router.log_report()
+"""
+
+import logging
+import re
+from collections import Counter
+from typing import Optional
+from configuration.config import (
+    LANGUAGE_MODELS, DEFAULT_LANGUAGE, LANGUAGE_MIN_HITS, LANGUAGE_MIN_MARGIN, LANGUAGE_SAMPLE_WORDS,
+    SENTIMENT_CASCADE
+)
+
+# Most frequent function words of each language
+STOPWORDS = {
+    'it': "il lo la i gli le un uno una di del dello della dei degli delle da dal dalla che e è non per con su "
+          "sul sulla sono nel nella al alla ai anche come più ma se questo questa ha hanno stato stata dopo tra "
+          "fra suo sua loro ci ne o in",
+    'en': "the of and to in is that for it with as was on are be by this have from or an they which has not "
+          "but were been their will would there its also after what who at",
+    'es': "el la los las de del que y en un una es por con para no se su sus al lo como más pero le ya o fue "
+          "este esta ha porque entre cuando muy sin sobre también hay",
+    'fr': "le la les de des du et en un une est que qui pour dans sur pas au aux ce cette il elle ne plus par "
+          "sont avec mais ou son sa ses été nous vous",
+    'de': "der die das und ist nicht ein eine zu den von mit sich des auf für im dem auch es an als nach wie "
+          "bei wird aus sind oder noch hat in zur zum über dass will",
+    'pt': "o a os as de do da dos das que e em um uma é para com não por no na se mais como mas foi ao pelo "
+          "pela são também seu sua"
+}
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+")
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+class LanguageIdentifier:
+    """
+    Class for offline language identification from stopword profiles.
+    """
+
+    def __init__(self, stopwords: dict = STOPWORDS, min_hits: float = LANGUAGE_MIN_HITS,
+                 min_margin: float = LANGUAGE_MIN_MARGIN, sample_words: int = LANGUAGE_SAMPLE_WORDS) -> None:
+        """
+        Initialize the identifier.
+
+        Args:
+            stopwords (dict): Language code -> space-separated function words
+            min_hits (float): Minimum stopword evidence for a language to be identified
+            min_margin (float): Minimum share of the evidence by which the best language must lead the second
+            sample_words (int): Words of a text examined
+        """
+        self.languages = list(stopwords)
+        self.min_hits = min_hits
+        self.min_margin = min_margin
+        self.sample_words = sample_words
+
+        # word -> ((language index, weight), ...), a word shared by k languages weighs 1/k in each
+        owners = {}
+        for index, language in enumerate(self.languages):
+            for word in set(stopwords[language].split()):
+                owners.setdefault(word, []).append(index)
+        self.weights = {word: tuple((index, 1.0 / len(indexes)) for index in indexes)
+                        for word, indexes in owners.items()}
+
+    def identify(self, text: str) -> Optional[str]:
+        """
+        Identify the language of a text.
+
+        Args:
+            text (str): Text to identify
+
+        Returns:
+            str: Language code, None if the evidence is too weak or ambiguous
+        """
+        if not text:
+            return None
+        scores = [0.0] * len(self.languages)
+        for count, match in enumerate(_WORD_PATTERN.finditer(text)):
+            if count >= self.sample_words:
+                break
+            for index, weight in self.weights.get(match.group().lower(), ()):
+                scores[index] += weight
+
+        ranked = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+        best, second = scores[ranked[0]], scores[ranked[1]]
+        if best < self.min_hits or (best - second) / best < self.min_margin:
+            return None
+        return self.languages[ranked[0]]
+
+
+class LanguageRouter:
+    """
+    Class routing articles to lazily loaded per-language analysis stages, with per-language counts.
+    """
+
+    def __init__(self, models: dict = LANGUAGE_MODELS, default_language: str = DEFAULT_LANGUAGE,
+                 default_stages: Optional[tuple] = None, identifier: Optional[LanguageIdentifier] = None) -> None:
+        """
+        Initialize the router.
+
+        Args:
+            models (dict): Language code -> {'spacy': model name, 'sentiment': model name}
+            default_language (str): Language assumed when it cannot be identified
+            default_stages (tuple, optional): Already loaded (preprocessor, ner, sentiment analyzer) of the default language
+            identifier (LanguageIdentifier, optional): Identifier to use, a stopword-based one if None
+        """
+        self.logger = logging.getLogger(__name__)
+        self.models = models
+        self.default_language = default_language
+        self.identifier = identifier or LanguageIdentifier()
+        self.stages = {}
+        if default_stages is not None:
+            self.stages[default_language] = default_stages
+        self.stats = Counter()
+
+    def accepts(self, language: Optional[str]) -> bool:
+        """
+        Whether articles of a language can be analyzed. Unidentified languages are accepted.
+        """
+        return language is None or language in self.models
+
+    def identify_entry(self, title: str, summary: str = "") -> Optional[str]:
+        """
+        Identify the language of a feed entry from its title and summary, before download.
+        Entries in an unsupported language are counted as skipped.
+
+        Args:
+            title (str): Entry title
+            summary (str): Entry summary, possibly HTML
+
+        Returns:
+            str: Language code, None if it cannot be identified
+        """
+        language = self.identifier.identify(f"{title} {_TAG_PATTERN.sub(' ', summary or '')}")
+        self.stats[f"entry_{language or 'unknown'}"] += 1
+        if not self.accepts(language):
+            self.stats[f"skipped_{language}"] += 1
+        return language
+
+    def identify_content(self, content: str, hint: Optional[str] = None) -> str:
+        """
+        Identify the language of an article from its content, after extraction.
+
+        Args:
+            content (str): Extracted article text
+            hint (str, optional): Language identified on the feed entry, used if the content is inconclusive
+
+        Returns:
+            str: Language code, the hint or the default language if it cannot be identified
+        """
+        language = self.identifier.identify(content) or hint or self.default_language
+        self.stats[f"content_{language}"] += 1
+        return language
+
+    def get_stages(self, language: str) -> Optional[tuple]:
+        """
+        Analysis stages of a language, loaded on first use.
+
+        Args:
+            language (str): Language code
+
+        Returns:
+            tuple: (preprocessor, ner, sentiment analyzer), None if the language is not supported
+        """
+        if language in self.stages:
+            return self.stages[language]
+        if language not in self.models:
+            self.stats[f"skipped_{language}"] += 1
+            return None
+
+        # Imported here, so routing feed entries never loads the models
+        from preprocessing.preprocess import TextPreprocessor
+        from tools.ner import NamedEntityRecognizer
+        from tools.sentiment_analysis import SentimentAnalyzer, CascadeSentimentAnalyzer
+
+        models = self.models[language]
+        self.logger.info(f"Loading analysis models for language '{language}': {models}")
+        sentiment_class = CascadeSentimentAnalyzer if SENTIMENT_CASCADE else SentimentAnalyzer
+        self.stages[language] = (
+            TextPreprocessor(models['spacy']),
+            NamedEntityRecognizer(models['spacy']),
+            sentiment_class(models['sentiment'])
+        )
+        return self.stages[language]
+
+    def report(self) -> dict:
+        """
+        Summarize the per-language counts.
+
+        Returns:
+            dict: Entries identified before download, articles identified after extraction
+                and skipped items, per language
+        """
+        return dict(self.stats)
+
+    def log_report(self) -> None:
+        """
+        Log the per-language counts.
+        """
+        self.logger.info(f"Languages: {self.report()}")
@@ -0,0 +1,252 @@
+"""
+Module name: lexicon.py
+Author: Michele Grieco
+Description:
+    This module provides a LexiconSentimentEngine class, the keyword-based sentiment analyzer used when the
+    transformer model is not available. A weighted lexicon is loaded from a TSV file (one "term<TAB>weight"
+    entry per line, weights between -1 and 1, a trailing "*" marks a prefix term such as "scandal*") and
+    compiled, together with the negators, into a single regular expression shaped as a character trie.
+    Matching is anchored on word boundaries and runs in one pass over the text whatever the size of the
+    lexicon, so lexicons of tens of thousands of terms stay fast. A term following a negator within a
+    window of words (and in the same clause) has its polarity flipped. Batches of texts are scored
+    together with numpy.
+Usage:
+    from tools.lexicon import LexiconSentimentEngine
+    engine = LexiconSentimentEngine()
+    score = engine.score("Enel non ha registrato perdite nel trimestre")
+    scores = engine.score_batch(["Ottimi risultati per Enel", "Scandalo sulle bollette"])
+"""
+
+import logging
+import re
+import unicodedata
+from typing import Iterable, Optional
+import numpy as np # for batch aggregation
+from configuration.config import SENTIMENT_LEXICON_FILE, LEXICON_NEGATORS, LEXICON_NEGATION_WINDOW
+
+# Lexicon used when the lexicon file cannot be read, the keywords of the original fallback
+DEFAULT_LEXICON = {
+    'ottimo': 1.0, 'eccellente': 1.0, 'positivo': 1.0, 'buono': 1.0, 'successo': 1.0,
+    'pessimo': -1.0, 'negativo': -1.0, 'cattivo': -1.0, 'fallimento': -1.0, 'problema': -1.0
+}
+
+_COMBINING_MARKS = re.compile(r'[\u0300-\u036f]')
+_WORD = re.compile(r'\w+')
+_CLAUSE_BREAK = re.compile(r'[.;:!?]')
+
+# Trie node key marking the end of a term, with value 'exact' or 'prefix'
+_END = ''
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercase a text and strip its accents, as TextPreprocessor does, so "né" and "ne" match the same term.
+
+    Args:
+        text (str): Text to normalize
+
+    Returns:
+        str: Normalized text
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    return _COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text))
+
+
+def _trie_pattern(node: dict) -> str:
+    """
+    Turn a character trie into a regular expression matching the same terms.
+    Longer continuations are tried before a term ends, so the longest term wins.
+    """
+    alternatives = [re.escape(char) + _trie_pattern(child)
+                    for char, child in sorted(node.items()) if char != _END]
+    if node.get(_END) == 'prefix':
+        alternatives.append(r'\w*')
+    elif node.get(_END) == 'exact':
+        alternatives.append(r'(?!\w)')
+
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return '(?:' + '|'.join(alternatives) + ')'
+
+
+class LexiconSentimentEngine:
+    """
+    Class for lexicon-based sentiment scoring with prefix terms and negation handling.
+    """
+
+    def __init__(self, lexicon_file: Optional[str] = SENTIMENT_LEXICON_FILE,
+                 negators: Iterable[str] = LEXICON_NEGATORS,
+                 negation_window: int = LEXICON_NEGATION_WINDOW) -> None:
+        """
+        Load and compile the lexicon.
+
+        Args:
+            lexicon_file (str, optional): Path of the TSV lexicon, the default lexicon if None or unreadable
+            negators (Iterable[str]): Words flipping the polarity of the following terms, "*" marks prefixes
+            negation_window (int): Number of words after a negator whose polarity is flipped
+        """
+        self.logger = logging.getLogger(__name__)
+        self.negation_window = negation_window
+
+        lexicon = self._load(lexicon_file) if lexicon_file else None
+        if not lexicon:
+            lexicon = dict(DEFAULT_LEXICON)
+
+        # Exact terms and prefix terms, negators are stored with weight 0.0
+        self.terms = {}
+        self.prefixes = {}
+        for term in negators:
+            self._add(term, 0.0)
+        for term, weight in lexicon.items():
+            self._add(term, weight)
+        self.prefix_lengths = sorted({len(prefix) for prefix in self.prefixes}, reverse=True)
+        self.pattern = self._compile()
+        self.logger.info(f"Sentiment lexicon compiled: {len(self.terms)} terms, {len(self.prefixes)} prefixes")
+
+    def _load(self, lexicon_file: str) -> dict:
+        """
+        Read a TSV lexicon, skipping comments and malformed lines.
+
+        Args:
+            lexicon_file (str): Path of the lexicon
+
+        Returns:
+            dict: Terms and their weights, empty if the file cannot be read
+        """
+        lexicon = {}
+        try:
+            with open(lexicon_file, encoding='utf-8') as f:
+                for number, line in enumerate(f, start=1):
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    try:
+                        term, weight = line.rsplit('\t', 1)
+                        weight = float(weight)
+                    except ValueError:
+                        self.logger.warning(f"Skipping malformed lexicon line {number}: {line!r}")
+                        continue
+                    if weight:
+                        lexicon[term.strip()] = max(-1.0, min(1.0, weight))
+        except OSError as e:
+            self.logger.error(f"Error loading sentiment lexicon {lexicon_file}, using the default one: {str(e)}")
+            return {}
+        return lexicon
+
+    def _add(self, term: str, weight: float) -> None:
+        """
+        Register a term, a trailing "*" making it a prefix term.
+        """
+        term = ' '.join(normalize(term).split())
+        if term.endswith('*'):
+            term = term[:-1]
+            if term:
+                self.prefixes[term] = weight
+        elif term:
+            self.terms[term] = weight
+
+    def _compile(self) -> re.Pattern:
+        """
+        Compile all the terms into a single word-bounded regular expression.
+        """
+        trie = {}
+        for kind, terms in (('exact', self.terms), ('prefix', self.prefixes)):
+            for term in terms:
+                node = trie
+                for char in term:
+                    node = node.setdefault(char, {})
+                # A prefix term also covers the exact term it starts with
+                if node.get(_END) != 'prefix':
+                    node[_END] = kind
+        if not trie:
+            return re.compile(r'(?!)')
+        return re.compile(r'(?<!\w)' + _trie_pattern(trie))
+
+    def _weight(self, match: str) -> float:
+        """
+        Weight of a matched term, an exact term or the longest matching prefix.
+        """
+        weight = self.terms.get(match)
+        if weight is not None:
+            return weight
+        for length in self.prefix_lengths:
+            weight = self.prefixes.get(match[:length])
+            if weight is not None:
+                return weight
+        return 0.0
+
+    def _matches(self, text: str) -> list:
+        """
+        Find the weights of the lexicon terms in a text, flipped when a negator precedes them.
+
+        Args:
+            text (str): Text to analyze
+
+        Returns:
+            list: Weights of the matched terms, in text order
+        """
+        text = normalize(text)
+        weights = []
+        negation_end = None
+        for match in self.pattern.finditer(text):
+            weight = self._weight(match.group())
+            if weight == 0.0:
+                negation_end = match.end()
+                continue
+            if negation_end is not None:
+                gap = text[negation_end:match.start()]
+                if _CLAUSE_BREAK.search(gap) or len(_WORD.findall(gap)) >= self.negation_window:
+                    negation_end = None
+                else:
+                    weight = -weight
+            weights.append(weight)
+        return weights
+
+    def analyze_batch(self, texts: list) -> tuple:
+        """
+        Score several texts and measure the lexicon evidence behind each score.
+
+        Args:
+            texts (list): Texts to analyze
+
+        Returns:
+            tuple: (scores between -1 and 1, sums of the absolute weights of the matched terms), as numpy arrays
+        """
+        documents = []
+        weights = []
+        for index, text in enumerate(texts):
+            matched = self._matches(text or '')
+            documents.extend([index] * len(matched))
+            weights.extend(matched)
+
+        documents = np.asarray(documents, dtype=np.intp)
+        weights = np.asarray(weights, dtype=np.float64)
+        totals = np.bincount(documents, weights=weights, minlength=len(texts))
+        magnitudes = np.bincount(documents, weights=np.abs(weights), minlength=len(texts))
+        return np.divide(totals, magnitudes, out=np.zeros(len(texts)), where=magnitudes > 0), magnitudes
+
+    def score_batch(self, texts: list) -> np.ndarray:
+        """
+        Score several texts.
+
+        Args:
+            texts (list): Texts to analyze
+
+        Returns:
+            numpy.ndarray: Sentiment scores between -1 and 1, 0.0 for texts without lexicon terms
+        """
+        return self.analyze_batch(texts)[0]
+
+    def score(self, text: str) -> float:
+        """
+        Score a text.
+
+        Args:
+            text (str): Text to analyze
+
+        Returns:
+            float: Sentiment score between -1 and 1
+        """
+        return float(self.score_batch([text])[0])
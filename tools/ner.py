@@ -21,12 +21,24 @@ Usage:
     # Get mentions of a specific company with context
     mentions = ner.get_company_mentions(text, company="Apple")
     print(mentions)
+    
+    # Mentions and the sentences that talk about the company, from a single parse
+    mentions, sentences = ner.analyze_company_context(text, company="Apple", neighbors=1)
+    
+    # Unit-length document vector, for story clustering
+    embedding = ner.embed(text)
 """
 
+import bisect
+from typing import Optional
+import numpy as np # for document vectors
 import spacy # for NLP and NER
 from spacy.cli.download import download # for downloading SpaCy models
 import logging
-from configuration.config import SPACY_MODEL, TARGET_COMPANY
+from configuration.config import (
+    SPACY_MODEL, TARGET_COMPANY, TARGET_SENTENCE_NEIGHBORS, TARGET_MAX_SENTENCES, EMBEDDING_MAX_CHARS
+)
+from configuration.logging_setup import SampledLogger
 
 class NamedEntityRecognizer:
     """
@@ -42,10 +54,7 @@ class NamedEntityRecognizer:
         """
         # Logger configuration
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        self.sampled_logger = SampledLogger(__name__)
         
         # Initialize SpaCy model
         self.nlp = self._initialize_spacy_model(model_name)
@@ -89,10 +98,9 @@ class NamedEntityRecognizer:
         if not text:
             return []
 
-        self.logger.info("Extracting entities from text using SpaCy NER")
         doc = self.nlp(text)
         entities = [(ent.text, ent.label_) for ent in doc.ents]
-        self.logger.info(f"{len(entities)} entities extracted from text")
+        self.sampled_logger.debug("%d entities extracted from text", len(entities))
         return entities
 
     def is_company_mentioned(self, text: str, company: str = TARGET_COMPANY) -> bool:
@@ -111,7 +119,7 @@ class NamedEntityRecognizer:
 
         # Simple search for the company name
         if company.lower() in text.lower():
-            self.logger.info(f"Company {company} found in text without NER")
+            self.sampled_logger.debug("Company %s found in text without NER", company)
             return True
 
         # Verification using NER
@@ -120,10 +128,10 @@ class NamedEntityRecognizer:
         # Search for the company in the extracted entities
         for entity, entity_type in entities:
             if (company.lower() in entity.lower()) and (entity_type in ['ORG', 'ORGANIZATION', 'PRODUCT', 'COMPANY']):
-                self.logger.info(f"Company {company} found with NER as {entity_type}")
+                self.sampled_logger.debug("Company %s found with NER as %s", company, entity_type)
                 return True
 
-        self.logger.info(f"Company {company} not found in text")
+        self.sampled_logger.debug("Company %s not found in text", company)
         return False
 
     def get_company_mentions(self, text: str, company: str = TARGET_COMPANY) -> list:
@@ -141,6 +149,23 @@ class NamedEntityRecognizer:
             return []
 
         doc = self.nlp(text)
+        mentions = self._mentions(doc, text, company)
+        self.sampled_logger.debug("Found %d mentions of company %s in text", len(mentions), company)
+        return mentions
+
+    @staticmethod
+    def _mentions(doc, text: str, company: str) -> list:
+        """
+        Collect the company entities of a parsed document with their context.
+        
+        Args:
+            doc (spacy.tokens.Doc): Parsed text
+            text (str): Original text
+            company (str): Company name to search for
+            
+        Returns:
+            list: List of mentions with context, type and character offsets
+        """
         mentions = []
 
         # Search for company mentions in the entities
@@ -152,8 +177,77 @@ class NamedEntityRecognizer:
                 mentions.append({
                     'text': ent.text,
                     'context': context,
-                    'type': ent.label_
+                    'type': ent.label_,
+                    'start': ent.start_char
                 })
+        return mentions
 
-        self.logger.info(f"Found {len(mentions)} mentions of company {company} in text")
-        return mentions
\ No newline at end of file
+    def analyze_company_context(self, text: str, company: str = TARGET_COMPANY,
+                                neighbors: int = TARGET_SENTENCE_NEIGHBORS,
+                                max_sentences: int = TARGET_MAX_SENTENCES) -> tuple:
+        """
+        Retrieve company mentions and the sentences mentioning the company with a single parse.
+        A sentence is selected when it contains a company entity or the company name.
+        
+        Args:
+            text (str): Text to analyze
+            company (str): Company name to search for
+            neighbors (int): Sentences kept before and after each selected sentence
+            max_sentences (int): Maximum number of sentences returned
+            
+        Returns:
+            tuple: (mentions as returned by get_company_mentions, selected sentences in text order)
+        """
+        if not text:
+            return [], []
+
+        doc = self.nlp(text)
+        mentions = self._mentions(doc, text, company)
+        if not doc.has_annotation("SENT_START"):
+            # The pipeline cannot segment sentences, the whole text is the only candidate
+            sentences = [text] if mentions or company.lower() in text.lower() else []
+            return mentions, sentences
+
+        sents = list(doc.sents)
+        starts = [sent.start_char for sent in sents]
+        name = company.lower()
+        selected = set()
+        for index, sent in enumerate(sents):
+            if name in sent.text.lower():
+                selected.update(range(index - neighbors, index + neighbors + 1))
+        for mention in mentions:
+            # Sentence containing the entity, found by offset
+            index = bisect.bisect_right(starts, mention['start']) - 1
+            selected.update(range(index - neighbors, index + neighbors + 1))
+
+        sentences = [sents[i].text.strip() for i in sorted(selected) if 0 <= i < len(sents)]
+        sentences = [sentence for sentence in sentences if sentence][:max_sentences]
+        self.sampled_logger.debug("Selected %d/%d sentences mentioning %s", len(sentences), len(sents), company)
+        return mentions, sentences
+
+    def embed(self, text: str, max_chars: int = EMBEDDING_MAX_CHARS) -> Optional[list]:
+        """
+        Document vector of a text: the mean of the model's word vectors, or of its contextual token
+        vectors when the model has none. Only the tok2vec component runs, not the tagger, parser or NER.
+        
+        Args:
+            text (str): Text to embed
+            max_chars (int): Characters of the text embedded
+            
+        Returns:
+            list: Unit-length vector, None if the text is empty or the model gives no vector
+        """
+        if not text:
+            return None
+        enabled = [name for name in ('tok2vec',) if name in self.nlp.pipe_names]
+        try:
+            with self.nlp.select_pipes(enable=enabled):
+                doc = self.nlp(text[:max_chars])
+            vector = np.asarray(doc.vector, dtype=np.float32)
+        except Exception as e:
+            self.logger.error(f"Error while embedding text: {e}")
+            return None
+        norm = np.linalg.norm(vector) if vector.size else 0.0
+        if norm == 0:
+            return None
+        return (vector / norm).round(5).tolist()
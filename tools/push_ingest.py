@@ -0,0 +1,465 @@
+"""
+Module name: push_ingest.py
+Author: Michele Grieco
+Description:
+    This module provides a PushReceiver class, a small HTTP endpoint that enqueues articles for the analysis
+    workers as soon as they are published, instead of waiting for the next poll of the feeds.
+    Endpoints:
+      GET  /websub   WebSub subscription verification: the challenge is echoed for the feeds of PUSH_SUBSCRIPTIONS
+      POST /websub   WebSub content distribution: an RSS or Atom document with the new entries of a feed
+      POST /webhook  Generic webhook: JSON {"entries": [{"title", "link", "summary", "published"}]} or {"urls": [...]}
+    Every POST must carry an X-Hub-Signature header ("sha256=<hex>", as sent by WebSub hubs) with the HMAC
+    of the body keyed with PUSH_SECRET. A verified notification is staged in the WorkQueue database, keyed by
+    the digest of its body, before it is answered: a notification redelivered by a hub is recognized by its
+    digest and dropped, and an acknowledged one survives a restart of the receiver. Staged entries go through the same selection as the polled ones (relevance prefilter, language,
+    link resolution; URLs posted to the webhook skip the prefilter, their content is checked by the workers)
+    and are added to the WorkQueue, which skips links already enqueued by a poll or an earlier notification.
+    Selection and enqueuing run on a background thread, which also renews the hub subscriptions when
+    PUSH_CALLBACK_URL is set. A notification whose entries cannot be enqueued is retried with the backoff of
+    the queue tasks, and dropped with its digest after QUEUE_MAX_ATTEMPTS attempts, so that the hub's next
+    redelivery is accepted again. Polling the feeds
+    (python main.py --push --schedule) remains the fallback for missed notifications and feeds without a hub.
+Usage:
+    from tools.push_ingest import PushReceiver
+    PushReceiver().serve_forever()  # or: python main.py --push
+    # A notification, signed as a hub would:
+    #   body='{"urls": ["https://example.com/article"]}'
+    #   signature=$(printf '%s' "$body" | openssl dgst -sha256 -hmac "$PUSH_SECRET" | cut -d' ' -f2)
+    #   curl -H "X-Hub-Signature: sha256=$signature" -d "$body" http://127.0.0.1:8503/webhook
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+import feedparser # for parsing the notified feed documents
+import requests # for the hub subscription requests
+from configuration.config import (
+    QUEUE_FILE, PUSH_HOST, PUSH_PORT, PUSH_SECRET, PUSH_CALLBACK_URL, PUSH_SUBSCRIPTIONS, PUSH_LEASE_SECONDS,
+    PUSH_MAX_BODY_BYTES, REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT
+)
+from tools.language import LanguageRouter
+from tools.relevance import RelevanceFilter
+from tools.scraper import ArticleScraper
+from tools.work_queue import WorkQueue
+
+# Digests accepted in X-Hub-Signature
+SIGNATURE_METHODS = {'sha1': hashlib.sha1, 'sha256': hashlib.sha256, 'sha384': hashlib.sha384,
+                     'sha512': hashlib.sha512}
+
+
+class BadNotification(ValueError):
+    """
+    Notification body that cannot be parsed, answered with a 400.
+    """
+
+
+def verify_signature(secret: Optional[str], body: bytes, header: Optional[str]) -> bool:
+    """
+    Check the X-Hub-Signature header of a notification.
+
+    Args:
+        secret (str, optional): Shared HMAC key, every signature is refused if None
+        body (bytes): Raw request body
+        header (str, optional): Header value, "<method>=<hex digest>"
+
+    Returns:
+        bool: True if the body was signed with the secret
+    """
+    if not secret or not header or '=' not in header:
+        return False
+    method, signature = header.split('=', 1)
+    digest = SIGNATURE_METHODS.get(method.strip().lower())
+    if digest is None:
+        return False
+    expected = hmac.new(secret.encode('utf-8'), body, digest).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+def parse_webhook(body: bytes) -> tuple:
+    """
+    Parse the JSON body of a generic webhook notification.
+
+    Args:
+        body (bytes): Raw request body
+
+    Returns:
+        tuple: (entries to prefilter, entries of posted URLs), as feedparser entries
+    """
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise BadNotification(f"Invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise BadNotification("Expected a JSON object")
+
+    entries, urls = [], []
+    for item in data.get('entries') or []:
+        if not isinstance(item, dict) or not item.get('link'):
+            raise BadNotification("Every entry needs a 'link'")
+        entries.append(feedparser.FeedParserDict(
+            title=item.get('title') or '', link=item['link'], summary=item.get('summary') or '',
+            published=item.get('published')
+        ))
+    for url in data.get('urls') or []:
+        if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            raise BadNotification(f"Invalid URL: {url!r}")
+        urls.append(feedparser.FeedParserDict(title='', link=url, summary=''))
+    if not entries and not urls:
+        raise BadNotification("No 'entries' or 'urls'")
+    return entries, urls
+
+
+def entry_record(entry) -> Optional[dict]:
+    """
+    Reduce a feed entry to the JSON-serializable fields used by the article selection.
+
+    Args:
+        entry: feedparser entry
+
+    Returns:
+        dict: 'title', 'link', 'summary' and 'published', None if the entry has no link
+    """
+    if not entry.get('link'):
+        return None
+    return {'title': entry.get('title') or '', 'link': entry['link'], 'summary': entry.get('summary') or '',
+            'published': entry.get('published')}
+
+
+class PushRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of the push endpoint.
+    """
+
+    server_version = "RepScanPush/1.0"
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        self._send(*self.server.receiver.verify_intent(url.path, parse_qs(url.query)))
+
+    def do_POST(self) -> None:
+        receiver = self.server.receiver
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if not 0 < length <= PUSH_MAX_BODY_BYTES:
+            self._send(413 if length > 0 else 400, "Missing or oversized body")
+            return
+        body = self.rfile.read(length)
+        try:
+            status, message = receiver.receive(urlsplit(self.path).path, self.headers, body)
+        except Exception as e:
+            receiver.logger.error(f"Error receiving a notification on {self.path}: {e}")
+            status, message = 500, "Internal server error"
+        self._send(status, message)
+
+    def _send(self, status: int, message: str) -> None:
+        body = message.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        """
+        Log requests at debug level instead of writing them to stderr.
+        """
+        self.server.receiver.logger.debug(format % args)
+
+
+class PushReceiver:
+    """
+    Class receiving WebSub and webhook notifications and enqueuing their articles for the analysis workers.
+    """
+
+    def __init__(self, queue_file: str = QUEUE_FILE, host: str = PUSH_HOST, port: int = PUSH_PORT,
+                 secret: Optional[str] = PUSH_SECRET, subscriptions: dict = PUSH_SUBSCRIPTIONS,
+                 callback_url: Optional[str] = PUSH_CALLBACK_URL) -> None:
+        """
+        Initialize the receiver.
+
+        Args:
+            queue_file (str): Work queue database the articles are added to
+            host (str): Address to listen on
+            port (int): Port to listen on, 0 for any free port
+            secret (str, optional): HMAC key of the notification signatures, notifications are refused if None
+            subscriptions (dict): Feed URL -> WebSub hub URL of the feeds whose notifications are accepted
+            callback_url (str, optional): Public URL of the /websub path, the hubs are not subscribed to if None
+        """
+        self.logger = logging.getLogger(__name__)
+        self.queue_file = queue_file
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.subscriptions = subscriptions
+        self.callback_url = callback_url
+
+        self.lock = threading.Lock()
+        self.wake = threading.Event()  # set when a notification is staged for the ingest thread
+        self.renew_at = {topic: 0.0 for topic in subscriptions} if callback_url else {}
+        self.stats = Counter()
+        self.server = None
+        self.thread = None
+        self.ingest_thread = None
+        self.stopping = threading.Event()
+        if not secret:
+            self.logger.warning("PUSH_SECRET is not set, every notification will be refused")
+
+    def verify_intent(self, path: str, params: dict) -> tuple:
+        """
+        Answer a WebSub verification of intent: confirm (un)subscriptions to the configured feeds.
+
+        Args:
+            path (str): Request path
+            params (dict): Parsed query string
+
+        Returns:
+            tuple: (status, body)
+        """
+        def param(name: str) -> Optional[str]:
+            values = params.get(name)
+            return values[-1] if values else None
+
+        if path != '/websub':
+            return 404, f"Unknown endpoint: {path}"
+        mode, topic = param('hub.mode'), param('hub.topic')
+        if mode == 'denied':
+            self.logger.warning(f"Hub denied the subscription to {topic}: {param('hub.reason')}")
+            return 200, ""
+        if mode not in ('subscribe', 'unsubscribe') or topic not in self.subscriptions or not param('hub.challenge'):
+            return 404, "Unknown subscription"
+        if mode == 'subscribe':
+            try:
+                lease = int(param('hub.lease_seconds') or PUSH_LEASE_SECONDS)
+            except ValueError:
+                lease = PUSH_LEASE_SECONDS
+            with self.lock:
+                if topic in self.renew_at:
+                    self.renew_at[topic] = time.time() + 0.8 * lease
+            self.logger.info(f"Subscription to {topic} confirmed for {lease} seconds")
+        return 200, param('hub.challenge')
+
+    def receive(self, path: str, headers, body: bytes) -> tuple:
+        """
+        Verify and parse a notification, and stage its entries for the ingest thread. The notification is
+        only acknowledged once staged, so a failure is answered with an error and redelivered by the hub.
+
+        Args:
+            path (str): Request path
+            headers: Request headers
+            body (bytes): Raw request body
+
+        Returns:
+            tuple: (status, body)
+        """
+        if path not in ('/websub', '/webhook'):
+            return 404, f"Unknown endpoint: {path}"
+        if not verify_signature(self.secret, body, headers.get('X-Hub-Signature')):
+            with self.lock:
+                self.stats['rejected'] += 1
+            self.logger.warning(f"Notification on {path} with a missing or invalid signature refused")
+            return 403, "Invalid signature"
+
+        try:
+            if path == '/websub':
+                feed = feedparser.parse(body, response_headers={'content-type': headers.get('Content-Type', '')})
+                if not feed.entries and feed.bozo:
+                    raise BadNotification(f"Invalid feed: {feed.bozo_exception}")
+                entries, urls = feed.entries, []
+            else:
+                entries, urls = parse_webhook(body)
+        except BadNotification as e:
+            with self.lock:
+                self.stats['invalid'] += 1
+            return 400, str(e)
+
+        payload = {
+            'source': path,
+            'entries': [record for record in map(entry_record, entries) if record],
+            'urls': [record for record in map(entry_record, urls) if record]
+        }
+        # Request threads are short-lived and SQLite connections cannot be shared across threads
+        work_queue = WorkQueue(self.queue_file)
+        try:
+            staged = work_queue.stage_notification(hashlib.sha256(body).hexdigest(), payload)
+        finally:
+            work_queue.close()
+        with self.lock:
+            if not staged:
+                self.stats['redelivered'] += 1
+                return 202, "Already received"
+            self.stats['notifications'] += 1
+            self.stats['entries'] += len(payload['entries']) + len(payload['urls'])
+        self.wake.set()
+        return 202, "Accepted"
+
+    def subscribe(self, topic: str, mode: str = 'subscribe') -> bool:
+        """
+        Ask the hub of a feed to (un)subscribe the endpoint. The hub confirms by calling verify_intent.
+
+        Args:
+            topic (str): Feed URL of PUSH_SUBSCRIPTIONS
+            mode (str): "subscribe" or "unsubscribe"
+
+        Returns:
+            bool: True if the hub accepted the request
+        """
+        data = {
+            'hub.mode': mode,
+            'hub.topic': topic,
+            'hub.callback': self.callback_url,
+            'hub.lease_seconds': PUSH_LEASE_SECONDS
+        }
+        if self.secret:
+            data['hub.secret'] = self.secret
+        try:
+            response = requests.post(self.subscriptions[topic], data=data,
+                                     timeout=(REQUEST_CONNECT_TIMEOUT, REQUEST_READ_TIMEOUT))
+            if response.status_code in (202, 204):
+                self.logger.info(f"Hub {self.subscriptions[topic]} accepted the {mode} request for {topic}")
+                return True
+            self.logger.error(f"Hub {self.subscriptions[topic]} refused the {mode} request for {topic}: "
+                              f"{response.status_code} {response.text[:200]}")
+        except Exception as e:
+            self.logger.error(f"Error sending the {mode} request for {topic}: {e}")
+        return False
+
+    def _renew_subscriptions(self) -> None:
+        """
+        Subscribe to the feeds whose lease is about to expire; failed requests are retried after a while.
+        """
+        now = time.time()
+        with self.lock:
+            due = [topic for topic, renew_at in self.renew_at.items() if renew_at <= now]
+            for topic in due:
+                # Pushed back until the hub confirms with the granted lease
+                self.renew_at[topic] = now + 600
+        for topic in due:
+            self.subscribe(topic)
+
+    def _ingest(self) -> None:
+        """
+        Background thread: select the entries of the staged notifications and add them to the work queue,
+        starting with those left by a previous run. The scraper and the queue hold SQLite connections,
+        so they are opened by this thread.
+        """
+        work_queue = WorkQueue(self.queue_file)
+        scraper = ArticleScraper()
+        relevance_filter = RelevanceFilter()
+        language_router = LanguageRouter()
+        try:
+            while True:
+                # Once stopping, the notifications already staged are still enqueued
+                stopping = self.stopping.is_set()
+                self._renew_subscriptions()
+                self.wake.clear()
+                for notification in work_queue.staged_notifications():
+                    self._enqueue_notification(notification, work_queue, scraper, relevance_filter, language_router)
+                if stopping:
+                    break
+                self.wake.wait(1.0)
+        finally:
+            scraper.close()
+            work_queue.close()
+
+    def _enqueue_notification(self, notification: dict, work_queue: WorkQueue, scraper: ArticleScraper,
+                              relevance_filter: RelevanceFilter, language_router: LanguageRouter) -> None:
+        """
+        Select the entries of a staged notification and add them to the work queue. Entries enqueued before
+        a failure are skipped as known keys when the notification is retried.
+
+        Args:
+            notification (dict): Notification returned by WorkQueue.staged_notifications
+            work_queue (WorkQueue): Queue of the ingest thread
+            scraper (ArticleScraper): Scraper of the ingest thread
+            relevance_filter (RelevanceFilter): Prefilter of the notified feed entries
+            language_router (LanguageRouter): Language identification of the entries
+        """
+        payload = notification['payload']
+        try:
+            added = selected = 0
+            # Posted URLs skip the prefilter, their content is checked by the workers
+            for field, prefilter in (('entries', True), ('urls', False)):
+                entries = [feedparser.FeedParserDict(record) for record in payload[field]]
+                if not entries:
+                    continue
+                candidates = scraper.select_candidates(relevance_filter if prefilter else None,
+                                                       entries=entries, language_router=language_router)
+                added += work_queue.enqueue_many([(candidate['url'], candidate) for candidate in candidates])
+                selected += len(candidates)
+            work_queue.finish_notification(notification)
+        except Exception as e:
+            dropped = work_queue.fail_notification(notification, str(e))
+            with self.lock:
+                self.stats['dropped' if dropped else 'failed'] += 1
+            return
+        with self.lock:
+            self.stats['enqueued'] += added
+            self.stats['duplicates'] += selected - added
+        self.logger.info(f"{added}/{selected} new articles enqueued from a {payload['source']} notification")
+
+    def start(self) -> None:
+        """
+        Start the HTTP server and the ingest thread in the background.
+        """
+        self.server = ThreadingHTTPServer((self.host, self.port), PushRequestHandler)
+        self.server.daemon_threads = True
+        self.server.receiver = self
+        self.port = self.server.server_address[1]
+        self.stopping.clear()
+        self.ingest_thread = threading.Thread(target=self._ingest, name="push-ingest", daemon=True)
+        self.ingest_thread.start()
+        self.thread = threading.Thread(target=self.server.serve_forever, name="push-server", daemon=True)
+        self.thread.start()
+        self.logger.info(f"Push endpoint listening on http://{self.host}:{self.port} (/websub, /webhook)")
+
+    def stop(self) -> None:
+        """
+        Stop the server, then let the ingest thread enqueue the notifications already staged.
+        Notifications waiting for a retry stay staged for the next start.
+        """
+        if self.server is None:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        self.stopping.set()
+        self.ingest_thread.join()
+        self.log_report()
+
+    def serve_forever(self) -> None:
+        """
+        Receive notifications until interrupted.
+        """
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+                self.log_report()
+        finally:
+            self.stop()
+
+    def report(self) -> dict:
+        """
+        Summarize the notifications received.
+
+        Returns:
+            dict: Counts of notifications, entries, enqueued articles, duplicates, and refused
+                (bad signature), invalid, redelivered, failed (retried) and dropped notifications
+        """
+        with self.lock:
+            return dict(self.stats)
+
+    def log_report(self) -> None:
+        """
+        Log the notification counts.
+        """
+        self.logger.info(f"Push notifications: {self.report()}")
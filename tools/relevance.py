@@ -0,0 +1,116 @@
+"""
+Module name: relevance.py
+Author: Michele Grieco
+Description:
+    This module provides a RelevanceFilter class used as a cheap first stage before downloading full articles.
+    RSS titles and summaries are matched against the company name and its aliases with a single compiled,
+    case-insensitive word-boundary regex. Entries that fail are dropped, except for a sampled fraction kept
+    for recall auditing. Per-stage pass/drop counts are collected so the filter can be tuned.
+Usage:
+    from tools.relevance import RelevanceFilter
+    relevance_filter = RelevanceFilter()
+    passed, audit = relevance_filter.check_entry(entry.title, entry.summary)
+    relevance_filter.record('ner', is_relevant)
+    print(relevance_filter.report())
+"""
+
+import logging
+import random
+import re
+from collections import Counter
+from typing import Optional
+from configuration.config import TARGET_COMPANY, COMPANY_ALIASES, RELEVANCE_AUDIT_SAMPLE_RATE
+
+
+class RelevanceFilter:
+    """
+    Class for staged relevance filtering with per-stage statistics.
+    """
+
+    def __init__(self, aliases: Optional[list] = None,
+                 sample_rate: float = RELEVANCE_AUDIT_SAMPLE_RATE,
+                 seed: Optional[int] = None) -> None:
+        """
+        Initialize the filter and compile the alias matcher.
+
+        Args:
+            aliases (list, optional): Company names and aliases, the configured ones if None
+            sample_rate (float): Fraction of dropped entries kept anyway for recall auditing
+            seed (int, optional): Seed of the audit sampler
+        """
+        # Logger configuration
+        self.logger = logging.getLogger(__name__)
+
+        names = set(aliases or COMPANY_ALIASES) | {TARGET_COMPANY}
+        # Longest aliases first, so "Enel Green Power" wins over "Enel"
+        alternatives = '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+        self.pattern = re.compile(rf'(?<!\w)(?:{alternatives})(?!\w)', re.IGNORECASE)
+        self.sample_rate = sample_rate
+        self.random = random.Random(seed)
+        self.stats = Counter()
+
+    def matches(self, text: str) -> bool:
+        """
+        Check whether the text mentions the company or one of its aliases.
+
+        Args:
+            text (str): Text to check
+
+        Returns:
+            bool: True if a name matches
+        """
+        return bool(text) and self.pattern.search(text) is not None
+
+    def check_entry(self, title: str, summary: str = "") -> tuple:
+        """
+        First stage: check an RSS entry's title and summary.
+
+        Args:
+            title (str): Entry title
+            summary (str): Entry summary
+
+        Returns:
+            tuple: (passed, audit) where audit is True for dropped entries sampled for recall auditing
+        """
+        passed = self.matches(title) or self.matches(summary)
+        self.record('prefilter', passed)
+        if passed:
+            return True, False
+
+        audit = self.sample_rate > 0 and self.random.random() < self.sample_rate
+        if audit:
+            self.stats['audit_sampled'] += 1
+        return False, audit
+
+    def record(self, stage: str, passed: bool) -> None:
+        """
+        Count the outcome of a filtering stage.
+
+        Args:
+            stage (str): Stage name (e.g. 'prefilter', 'ner', 'audit')
+            passed (bool): Whether the article passed the stage
+        """
+        self.stats[f"{stage}_{'pass' if passed else 'drop'}"] += 1
+
+    def report(self) -> dict:
+        """
+        Summarize per-stage counts. 'audit_pass' counts sampled entries dropped by the prefilter
+        but found relevant downstream, i.e. recall lost by the prefilter.
+
+        Returns:
+            dict: Stage counts and derived rates
+        """
+        report = dict(self.stats)
+        seen = self.stats['prefilter_pass'] + self.stats['prefilter_drop']
+        if seen:
+            report['prefilter_pass_rate'] = self.stats['prefilter_pass'] / seen
+        audited = self.stats['audit_pass'] + self.stats['audit_drop']
+        if audited:
+            report['audit_miss_rate'] = self.stats['audit_pass'] / audited
+        return report
+
+    def log_report(self) -> None:
+        """
+        Log the per-stage counts.
+        """
+        self.logger.info(f"Relevance filter stages: {self.report()}")
@@ -0,0 +1,286 @@
+"""
+Module name: scheduler.py
+Author: Michele Grieco
+Description:
+    This module provides a FeedScheduler class that decides when each RSS feed is polled, instead of polling
+    every feed on a fixed cadence. For each feed it learns the publish rate, from the publication times of the
+    entries on the first poll and from the number of new entries per elapsed hour afterwards, smoothed with
+    an exponentially weighted moving average. The poll interval is set so that about SCHEDULER_TARGET_NEW_ENTRIES
+    new entries are expected per poll, within SCHEDULER_MIN_INTERVAL and SCHEDULER_MAX_INTERVAL. When most
+    entries of a poll are new the feed window may have overflowed, so the interval is halved. A sharp drop of
+    the reputation score makes every feed poll faster for a while. Seen entries and intervals are persisted as
+    JSON between runs. New entries whose analysis fails are forgotten, so the next poll returns them again,
+    and poll_id names their run after the entries, so the retried run resumes the journal of the failed one.
+Usage:
+    from tools.scheduler import FeedScheduler, poll_id
+    scheduler = FeedScheduler(["https://news.google.com/rss/search?q=Enel"])
+    for feed_url in scheduler.due():
+        new_entries = scheduler.observe(feed_url, scraper.parse_rss_feed(feed_url))
+        journal = RunJournal(poll_id(feed_url, new_entries))
+        # If the analysis fails: scheduler.forget(feed_url, new_entries)
+    scheduler.notify_score(-0.4)
+    scheduler.save()
+    time.sleep(scheduler.seconds_until_next())
+"""
+
+import calendar
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Optional
+from configuration.config import (
+    FEED_URLS, SCHEDULER_STATE_FILE, SCHEDULER_MIN_INTERVAL, SCHEDULER_MAX_INTERVAL,
+    SCHEDULER_TARGET_NEW_ENTRIES, SCHEDULER_SMOOTHING, SCHEDULER_SATURATION, SCHEDULER_SEEN_LIMIT,
+    SCHEDULER_SURGE_DROP, SCHEDULER_SURGE_FACTOR, SCHEDULER_SURGE_DURATION
+)
+
+
+def entry_key(entry) -> str:
+    """
+    Short stable identifier of a feed entry, from its id or link.
+    """
+    identifier = entry.get('id') or entry.get('link') or entry.get('title') or ''
+    return hashlib.sha1(identifier.encode('utf-8')).hexdigest()[:16]
+
+
+def poll_id(feed_url: str, entries: list) -> str:
+    """
+    Run identifier of the new entries of a poll, the same when a failed poll returns them again.
+    """
+    feed_id = hashlib.sha1(feed_url.encode('utf-8')).hexdigest()[:8]
+    keys = hashlib.sha1(' '.join(sorted(entry_key(entry) for entry in entries)).encode('utf-8')).hexdigest()[:12]
+    return f"{feed_id}_{keys}"
+
+
+def entry_time(entry) -> Optional[float]:
+    """
+    Publication time of a feed entry as UNIX time, None if the feed does not give it.
+    """
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    if not parsed:
+        return None
+    return float(calendar.timegm(parsed))
+
+
+class FeedScheduler:
+    """
+    Class scheduling feed polls from the observed update rate of each feed.
+    """
+
+    def __init__(self, feed_urls: Optional[list] = None,
+                 state_file: str = SCHEDULER_STATE_FILE,
+                 min_interval: float = SCHEDULER_MIN_INTERVAL,
+                 max_interval: float = SCHEDULER_MAX_INTERVAL,
+                 target_new_entries: float = SCHEDULER_TARGET_NEW_ENTRIES) -> None:
+        """
+        Initialize the scheduler and load its persisted state if present.
+
+        Args:
+            feed_urls (list, optional): Feeds to poll, the configured ones if None
+            state_file (str): Path of the JSON state file
+            min_interval (float): Shortest poll interval in seconds
+            max_interval (float): Longest poll interval in seconds
+            target_new_entries (float): New entries expected per poll
+        """
+        self.logger = logging.getLogger(__name__)
+        self.feed_urls = list(feed_urls or FEED_URLS)
+        self.state_file = state_file
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_new_entries = target_new_entries
+
+        self.feeds = {}  # feed url -> state of the feed
+        self.last_score = None
+        self.surge_until = 0.0
+        self.load()
+        for feed_url in self.feed_urls:
+            self.feeds.setdefault(feed_url, self._new_feed())
+        # Feeds removed from the configuration are forgotten
+        self.feeds = {feed_url: self.feeds[feed_url] for feed_url in self.feed_urls}
+
+    def _new_feed(self) -> dict:
+        """
+        State of a feed never polled, due immediately.
+        """
+        return {
+            'rate': None,  # smoothed new entries per hour
+            'interval': self.min_interval,
+            'next_poll': 0.0,
+            'last_poll': None,
+            'seen': [],  # keys of the entries already seen, oldest first
+            'polls': 0,
+            'new_entries': 0
+        }
+
+    def due(self, now: Optional[float] = None) -> list:
+        """
+        Feeds whose next poll time has come, most overdue first.
+
+        Args:
+            now (float, optional): UNIX time, now if None
+
+        Returns:
+            list: Feed URLs to poll
+        """
+        now = time.time() if now is None else now
+        due = [feed_url for feed_url, feed in self.feeds.items() if feed['next_poll'] <= now]
+        return sorted(due, key=lambda feed_url: self.feeds[feed_url]['next_poll'])
+
+    def seconds_until_next(self, now: Optional[float] = None) -> float:
+        """
+        Seconds until the next feed is due, 0 if one is already due.
+        """
+        now = time.time() if now is None else now
+        if not self.feeds:
+            return self.max_interval
+        return max(min(feed['next_poll'] for feed in self.feeds.values()) - now, 0.0)
+
+    def _observed_rate(self, feed: dict, entries: list, new_count: int, now: float) -> float:
+        """
+        Entries per hour seen in a poll: new entries per elapsed hour, or the publication rate
+        of the entries on the first poll.
+        """
+        if feed['last_poll'] is not None:
+            elapsed_hours = max(now - feed['last_poll'], 1.0) / 3600
+            return new_count / elapsed_hours
+
+        times = sorted(t for t in (entry_time(entry) for entry in entries) if t is not None)
+        if len(times) < 2:
+            return 0.0
+        span_hours = max(min(times[-1], now) - times[0], 60.0) / 3600
+        return (len(times) - 1) / span_hours
+
+    def observe(self, feed_url: str, entries: list, now: Optional[float] = None) -> list:
+        """
+        Record a poll of a feed and schedule its next one.
+
+        Args:
+            feed_url (str): Polled feed
+            entries (list): Entries returned by the feed
+            now (float, optional): UNIX time of the poll, now if None
+
+        Returns:
+            list: Entries not seen in previous polls
+        """
+        now = time.time() if now is None else now
+        feed = self.feeds.setdefault(feed_url, self._new_feed())
+        seen = set(feed['seen'])
+
+        new_entries = []
+        for entry in entries:
+            key = entry_key(entry)
+            if key not in seen:
+                seen.add(key)
+                feed['seen'].append(key)
+                new_entries.append(entry)
+        del feed['seen'][:-SCHEDULER_SEEN_LIMIT]
+
+        rate = self._observed_rate(feed, entries, len(new_entries), now)
+        if feed['rate'] is None:
+            feed['rate'] = rate
+        else:
+            feed['rate'] += SCHEDULER_SMOOTHING * (rate - feed['rate'])
+
+        if feed['rate'] > 0:
+            interval = self.target_new_entries / feed['rate'] * 3600
+        else:
+            # Nothing published yet, back off gradually rather than jumping to the longest interval
+            interval = feed['interval'] * 2
+        if feed['last_poll'] is not None and entries and len(new_entries) >= SCHEDULER_SATURATION * len(entries):
+            # Most entries are new: the feed window may have overflowed since the last poll
+            interval = min(interval, feed['interval'] / 2)
+        feed['interval'] = min(max(interval, self.min_interval), self.max_interval)
+
+        feed['last_poll'] = now
+        feed['next_poll'] = now + self._effective_interval(feed, now)
+        feed['polls'] += 1
+        feed['new_entries'] += len(new_entries)
+        self.logger.info(
+            f"Feed {feed_url}: {len(new_entries)}/{len(entries)} new entries, "
+            f"{feed['rate']:.2f} entries/h, next poll in {feed['next_poll'] - now:.0f}s"
+        )
+        return new_entries
+
+    def forget(self, feed_url: str, entries: list) -> None:
+        """
+        Mark entries returned by observe as not seen, e.g. because their analysis failed, so that the next poll
+        returns them again.
+
+        Args:
+            feed_url (str): Polled feed
+            entries (list): New entries of the poll
+        """
+        feed = self.feeds.get(feed_url)
+        if feed is None:
+            return
+        keys = {entry_key(entry) for entry in entries}
+        feed['seen'] = [key for key in feed['seen'] if key not in keys]
+        feed['new_entries'] -= len(entries)
+
+    def _effective_interval(self, feed: dict, now: float) -> float:
+        """
+        Interval of a feed, shortened while a score surge is active.
+        """
+        if now < self.surge_until:
+            return max(feed['interval'] * SCHEDULER_SURGE_FACTOR, self.min_interval)
+        return feed['interval']
+
+    def notify_score(self, score: float, now: Optional[float] = None) -> bool:
+        """
+        Record the latest reputation score, polling faster for a while when it drops sharply.
+
+        Args:
+            score (float): Latest reputation score
+            now (float, optional): UNIX time, now if None
+
+        Returns:
+            bool: Whether a surge was started
+        """
+        now = time.time() if now is None else now
+        previous, self.last_score = self.last_score, score
+        if previous is None or previous - score < SCHEDULER_SURGE_DROP:
+            return False
+
+        self.surge_until = now + SCHEDULER_SURGE_DURATION
+        for feed in self.feeds.values():
+            feed['next_poll'] = min(feed['next_poll'], now + self._effective_interval(feed, now))
+        self.logger.warning(
+            f"Reputation score dropped from {previous:.2f} to {score:.2f}, "
+            f"polling faster for {SCHEDULER_SURGE_DURATION / 3600:.1f}h"
+        )
+        return True
+
+    def load(self) -> None:
+        """
+        Load the persisted state, if present.
+        """
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.feeds = state['feeds']
+            self.last_score = state.get('last_score')
+            self.surge_until = state.get('surge_until', 0.0)
+            self.logger.info(f"Loaded scheduler state ({len(self.feeds)} feeds)")
+        except Exception as e:
+            self.logger.error(f"Error loading scheduler state: {e}")
+            self.feeds = {}
+
+    def save(self) -> None:
+        """
+        Atomically persist the state of the feeds.
+        """
+        state = {'feeds': self.feeds, 'last_score': self.last_score, 'surge_until': self.surge_until}
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            self.logger.error(f"Error saving scheduler state: {e}")
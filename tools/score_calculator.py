@@ -31,10 +31,6 @@ class ReputationScoreCalculator:
         """
         # Logger configuration
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
         
         # Create data directory if it doesn't exist
         os.makedirs(DATA_DIRECTORY, exist_ok=True)
@@ -46,7 +42,7 @@ class ReputationScoreCalculator:
         Calculate the reputation score based on the sentiment analysis of articles.
         
         Args:
-            articles (list): List of dictionaries containing article data.
+            articles (list): List of Article records or dictionaries containing article data.
             
         Returns:
             float: Weighted average reputation score calculated from the articles.
@@ -60,15 +56,18 @@ class ReputationScoreCalculator:
         # Extract sentiment scores
         sentiment_scores = [article.get('sentiment_score', 0.0) for article in articles]
 
+        # Near-duplicate copies are scaled down according to the duplicate policy
+        dedup_weights = [article.get('dedup_weight', 1.0) for article in articles]
+
         # Calculate weights based on article length
-        weights = [len(article.get('content', '')) for article in articles]
+        weights = [self._content_length(article) * dedup for article, dedup in zip(articles, dedup_weights)]
 
         # Normalize weights
         total_weight = sum(weights)
         if total_weight == 0:
             self.logger.warning("Total weight is zero, using equal weights for all articles.")
-            weights = [1] * len(articles)
-            total_weight = len(articles)
+            weights = dedup_weights if sum(dedup_weights) > 0 else [1] * len(articles)
+            total_weight = sum(weights)
 
         normalized_weights = [w / total_weight for w in weights]
 
@@ -79,13 +78,28 @@ class ReputationScoreCalculator:
         self.logger.info(f"Calculated reputation score: {weighted_score:.2f}")
         return weighted_score
 
-    def save_reputation_score(self, score: float, timestamp: Optional[str] = None) -> None:
+    @staticmethod
+    def _content_length(article) -> int:
+        """
+        Length of the article content, also available after the raw content was released.
+        
+        Args:
+            article (dict | Article): Article data.
+            
+        Returns:
+            int: Number of characters of the article content.
+        """
+        length = article.get('content_length')
+        return length if length is not None else len(article.get('content', '') or '')
+
+    def save_reputation_score(self, score: float, timestamp: Optional[str] = None, skip_existing: bool = False) -> None:
         """
         Save the reputation score to a CSV file.
         
         Args:
             score (float): Reputation score.
             timestamp (str, optional): Analysis timestamp. If None, uses current timestamp.
+            skip_existing (bool): Do not save the score if a score with the same timestamp is already saved.
         """
         if timestamp is None:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -102,12 +116,17 @@ class ReputationScoreCalculator:
             # Load existing file if present
             if os.path.exists(self.results_file):
                 df = pd.read_csv(self.results_file)
+                if skip_existing and (df['timestamp'].astype(str) == timestamp).any():
+                    self.logger.info(f"Reputation score at {timestamp} already saved, skipped")
+                    return
                 df = pd.concat([df, new_record], ignore_index=True)
             else:
                 df = new_record
 
-            # Save updated DataFrame
-            df.to_csv(self.results_file, index=False)
+            # Save updated DataFrame, replacing the file atomically for concurrent readers
+            tmp_file = f"{self.results_file}.tmp"
+            df.to_csv(tmp_file, index=False)
+            os.replace(tmp_file, self.results_file)
             self.logger.info(f"Reputation score successfully saved to {self.results_file}")
         except Exception as e:
             self.logger.error(f"Error while saving reputation score: {e}")
@@ -5,50 +5,114 @@ Description:
     This module provides an ArticleScraper class for scraping articles from RSS feeds and downloading their content.
     It utilizes the feedparser and requests libraries for handling RSS feeds and HTTP requests, respectively.
     It is designed to be easily configurable via the configuration file.
+    Article pages are streamed: the content type, charset and declared size are checked before reading the
+    body, reading stops at a byte budget or once enough article text has been collected, and every
+    early-abort reason is counted in the download metrics.
+    Requests go through a ResilientFetcher (per-host rate limits, retries with backoff, circuit breakers).
+    In live mode, aggregator redirect links are resolved to publisher URLs up front (cached, concurrently)
+    and each article records the canonical URL declared by its page.
+    In "record" mode every fetched feed and page is also stored in a ResponseArchive; in "replay" mode
+    feeds and pages are served from the archive only, so runs can be repeated on identical inputs.
 Usage:
     from tools.scraper import ArticleScraper
     scraper = ArticleScraper()
     articles = scraper.collect_articles()
+    replay = ArticleScraper(mode="replay")
 """
 
 import feedparser # for parsing RSS feeds
 import requests # for HTTP requests
-from bs4 import BeautifulSoup # for HTML parsing
+import codecs
 import logging
+import re
+import time
+from collections import Counter
 from datetime import datetime
-from configuration.config import RSS_FEED_URL
+from typing import Optional
+from urllib.parse import urljoin
+from configuration.config import (
+    RSS_FEED_URL, DOWNLOAD_MAX_BYTES, DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_TEXT_BUDGET, ALLOWED_CONTENT_TYPES, SCRAPER_MODE
+)
+from configuration.logging_setup import SampledLogger
+from tools.archive import ArchivedResponse, ResponseArchive
+from tools.article import Article
+from tools.extraction import get_extractor
+from tools.fetcher import CircuitOpenError, ResilientFetcher
+from tools.url_resolver import UrlResolver
+
+_CHARSET_PATTERN = re.compile(r'charset=["\']?([\w\-]+)', re.IGNORECASE)
+
+
+class DownloadAborted(Exception):
+    """
+    Raised when an article download is abandoned before reading its body.
+    """
+
+    def __init__(self, reason: str, detail: str = "") -> None:
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+
 
 class ArticleScraper:
     """
     A class for scraping articles from RSS feeds and downloading their content.
     """
     
-    def __init__(self, feed_url: str = RSS_FEED_URL):
+    def __init__(self, feed_url: str = RSS_FEED_URL, extractor=None,
+                 mode: str = SCRAPER_MODE, archive: Optional[ResponseArchive] = None,
+                 fetcher: Optional[ResilientFetcher] = None, resolver: Optional[UrlResolver] = None):
         """
         Initialize the ArticleScraper with RSS feed URL and logging configuration.
         
         Args:
             feed_url (str): URL of the RSS feed to parse
+            extractor (BaseExtractor, optional): HTML extraction engine, the configured one if None
+            mode (str): "live", "record" or "replay"
+            archive (ResponseArchive, optional): Archive used in record and replay modes, the configured one if None
+            fetcher (ResilientFetcher, optional): HTTP layer, a new one if None
+            resolver (UrlResolver, optional): Redirect resolver, a new one if None. Only used in live mode,
+                so that recorded archives stay keyed by the links found in the feed.
         """
+        if mode not in ('live', 'record', 'replay'):
+            raise ValueError(f"Unknown scraper mode: {mode}")
         self.feed_url = feed_url
+        self.mode = mode
+        self.archive = archive if archive is not None or mode == 'live' else ResponseArchive()
+        self.fetcher = fetcher or ResilientFetcher()
+        self.resolver = None
+        if mode == 'live':
+            self.resolver = resolver or UrlResolver(self.fetcher)
+        self.extractor = extractor or get_extractor()
+        self.max_bytes = DOWNLOAD_MAX_BYTES
+        self.text_budget = DOWNLOAD_TEXT_BUDGET
+        self.download_metrics = Counter()
         
         # Logger configuration
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        self.sampled_logger = SampledLogger(__name__)
 
-    def parse_rss_feed(self) -> list:
+    def parse_rss_feed(self, feed_url: Optional[str] = None) -> list:
         """
         Download and parse the RSS feed from the specified URL.
         
+        Args:
+            feed_url (str, optional): Feed to parse, the scraper's feed if None
+        
         Returns:
             list: List of RSS feed entries
         """
+        feed_url = feed_url or self.feed_url
         try:
-            self.logger.info(f"Feed RSS download from {self.feed_url}")
-            feed = feedparser.parse(self.feed_url)
+            self.logger.info(f"Feed RSS download from {feed_url} ({self.mode} mode)")
+            if self.mode == 'live':
+                feed = feedparser.parse(feed_url)
+            else:
+                response = self._fetch(feed_url, stream=False)
+                if response is None:
+                    self.logger.error(f"Feed {feed_url} not found in the archive")
+                    return []
+                feed = feedparser.parse(response.content, response_headers=dict(response.headers))
 
             if not feed.entries:
                 self.logger.warning("No entries found in the RSS feed")
@@ -60,63 +124,288 @@ class ArticleScraper:
             self.logger.error(f"Error during the RSS feed parsing: {e}")
             return []
 
-    def get_article_content(self, url: str) -> str:
+    def _fetch(self, url: str, stream: bool = True):
         """
-        Download the content of an article from the given URL.
+        Perform a GET request according to the scraper mode.
+        In record mode the body is read (up to the byte budget) and archived before being served,
+        so later replays see the same bytes whatever budgets they use.
         
         Args:
-            url (str): URL of the article to download
+            url (str): URL to fetch
+            stream (bool): Whether to stream the body in live mode
             
         Returns:
-            str: The text content of the article
+            requests.Response | ArchivedResponse: Response, None if replaying a URL that was not recorded
         """
+        if self.mode == 'live':
+            return self.fetcher.get(url, stream=stream)
+        if self.mode == 'replay':
+            return self.archive.get(url)
+
+        started = time.monotonic()
         try:
-            self.logger.info(f"Downloading article content from {url}")
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
+            response = self.fetcher.get(url, stream=True)
+        except CircuitOpenError:
+            raise
+        except requests.RequestException as e:
+            self.archive.record_error(url, e, time.monotonic() - started)
+            raise
+        try:
+            elapsed = time.monotonic() - started
+            body = bytearray()
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                body += chunk[:self.max_bytes - len(body)]
+                if len(body) >= self.max_bytes:
+                    break
+        except requests.RequestException as e:
+            self.archive.record_error(url, e, time.monotonic() - started)
+            raise
+        finally:
+            response.close()
+        self.archive.record(url, response.status_code, response.headers, bytes(body),
+                            elapsed=elapsed, duration=time.monotonic() - started - elapsed,
+                            final_url=response.url)
+        return ArchivedResponse(response.url, response.status_code, dict(response.headers), bytes(body))
+
+    def _check_headers(self, response: requests.Response) -> Optional[str]:
+        """
+        Validate the response headers before reading the body.
+        
+        Args:
+            response (requests.Response): Streamed response
+            
+        Returns:
+            str: Declared charset, or None to let the parser detect it
+            
+        Raises:
+            DownloadAborted: If the content type, charset or declared size is not acceptable
+        """
+        content_type = response.headers.get('Content-Type', '')
+        media_type = content_type.split(';', 1)[0].strip().lower()
+        if media_type and media_type not in ALLOWED_CONTENT_TYPES:
+            raise DownloadAborted('content_type', media_type)
 
-            soup = BeautifulSoup(response.content, 'html.parser')
+        content_length = response.headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise DownloadAborted('too_large', f"{content_length} bytes")
 
-            # Remove script and style elements
-            for script_or_style in soup(['script', 'style']):
-                script_or_style.decompose()
+        match = _CHARSET_PATTERN.search(content_type)
+        if not match:
+            return None
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            raise DownloadAborted('charset', match.group(1))
 
-            # Extract text from the soup object
-            text = soup.get_text()
+    def get_article_content(self, url: str) -> str:
+        """
+        Download the content of an article from the given URL, streaming the body
+        within the configured byte and text budgets.
+        
+        Args:
+            url (str): URL of the article to download
+            
+        Returns:
+            str: The main text content of the article, empty if the download was aborted
+        """
+        return self._download(url)[0]
+
+    def _download(self, url: str) -> tuple:
+        """
+        Download an article and find its canonical URL.
+        
+        Args:
+            url (str): URL of the article to download
+            
+        Returns:
+            tuple: (main text content, canonical URL); the text is empty if the download was aborted,
+                the URL is the final URL of the response when the page declares no canonical URL
+        """
+        response = None
+        try:
+            self.sampled_logger.debug("Downloading article content from %s", url)
+            response = self._fetch(url)
+            if response is None:
+                raise DownloadAborted('not_archived', url)
+            response.raise_for_status()
+            encoding = self._check_headers(response)
 
-            # Clean and format the text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\n'.join(chunk for chunk in chunks if chunk)
+            # Single parse of the page while it downloads, keeping only the main article body
+            document = self.extractor.start(encoding)
+            received = 0
+            outcome = 'completed'
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                chunk = chunk[:self.max_bytes - received]
+                document.feed(chunk)
+                received += len(chunk)
+                if received >= self.max_bytes:
+                    outcome = 'byte_budget'
+                    break
+                if document.body_chars >= self.text_budget:
+                    outcome = 'text_budget'
+                    break
 
-            return text
+            text = document.close()
+            self.download_metrics[outcome] += 1
+            final_url = getattr(response, 'url', None) or url
+            if document.canonical_url:
+                return text, urljoin(final_url, document.canonical_url)
+            return text, final_url
+        except DownloadAborted as e:
+            self.download_metrics[e.reason] += 1
+            self.logger.warning(f"Download of {url} aborted: {e}")
+            return "", url
+        except CircuitOpenError as e:
+            self.download_metrics['circuit_open'] += 1
+            self.logger.warning(f"Download of {url} skipped: {e}")
+            return "", url
+        except requests.HTTPError as e:
+            self.download_metrics['http_error'] += 1
+            self.logger.error(f"Error while downloading article content: {e}")
+            return "", url
+        except requests.RequestException as e:
+            self.download_metrics['network_error'] += 1
+            self.logger.error(f"Error while downloading article content: {e}")
+            return "", url
         except Exception as e:
+            self.download_metrics['error'] += 1
             self.logger.error(f"Error while downloading article content: {e}")
-            return ""
+            return "", url
+        finally:
+            if response is not None:
+                response.close()
 
-    def collect_articles(self) -> list:
+    def select_candidates(self, relevance_filter=None, skip_links=None, entries=None, language_router=None) -> list:
         """
-        Recover articles from the RSS feed and download their content.
+        Select the feed entries worth downloading and resolve their links.
+        When a relevance filter is given, only entries whose title or summary mention the company
+        (plus a sampled fraction for recall auditing) are kept. When a language router is given, entries
+        whose title and summary are in an unsupported language are dropped. Links of the kept entries are
+        resolved to publisher URLs in a single concurrent pass.
+        
+        Args:
+            relevance_filter (RelevanceFilter, optional): First-stage filter applied before downloading
+            skip_links (set, optional): Links or canonical URLs already analyzed, e.g. restored from a run journal
+            entries (list, optional): Feed entries to select from, e.g. the new entries of a scheduled poll.
+                The scraper's feed is parsed if None.
+            language_router (LanguageRouter, optional): Router identifying the language of the entries
         
         Returns:
-            list: List of dictionaries containing article information
+            list: Candidate dictionaries with 'title', 'link', 'published', 'summary', 'audit_sample',
+                'language' and 'url' (the URL to download)
         """
-        articles = []
-        entries = self.parse_rss_feed()
+        if entries is None:
+            entries = self.parse_rss_feed()
+        skip_links = skip_links or set()
 
+        candidates = []
         for entry in entries:
+            if entry.get('link') in skip_links:
+                continue
             try:
-                article = {
+                summary = entry.summary if hasattr(entry, 'summary') else ""
+                audit = False
+                if relevance_filter is not None:
+                    passed, audit = relevance_filter.check_entry(entry.title, summary)
+                    if not passed and not audit:
+                        continue
+                language = None
+                if language_router is not None:
+                    language = language_router.identify_entry(entry.title, summary)
+                    if not language_router.accepts(language):
+                        continue
+                candidates.append({
                     'title': entry.title,
                     'link': entry.link,
-                    'published': entry.published,
-                    'summary': entry.summary if hasattr(entry, 'summary') else "",
-                    'content': self.get_article_content(entry.link),
-                    'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                articles.append(article)
-                self.logger.info(f"Article collected: {article['title']}")
+                    'published': entry.get('published'),
+                    'summary': summary,
+                    'audit_sample': audit,
+                    'language': language
+                })
+            except Exception as e:
+                self.logger.error(f"Error while processing article '{entry.get('title')}': {e}")
+
+        targets = {}
+        if self.resolver is not None and candidates:
+            targets = self.resolver.resolve_many([candidate['link'] for candidate in candidates])
+
+        selected = []
+        for candidate in candidates:
+            candidate['url'] = targets.get(candidate['link'], candidate['link'])
+            if candidate['url'] not in skip_links:
+                selected.append(candidate)
+        return selected
+
+    def fetch_article(self, candidate: dict) -> Article:
+        """
+        Download the content of a candidate entry.
+        
+        Args:
+            candidate (dict): Candidate returned by select_candidates
+        
+        Returns:
+            Article: Collected article, with empty content if the download failed
+        """
+        url = candidate.get('url') or candidate['link']
+        content, canonical_url = self._download(url)
+        article = Article(
+            title=candidate['title'],
+            link=candidate['link'],
+            published=candidate.get('published'),
+            summary=candidate.get('summary', ""),
+            content=content,
+            date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            audit_sample=candidate.get('audit_sample', False),
+            language=candidate.get('language')
+        )
+        article.canonical_url = canonical_url
+        if self.resolver is not None and self.resolver.needs_resolution(article.link) and canonical_url != url and content:
+            # Next sightings of the link go straight to the canonical page
+            self.resolver.remember(article.link, canonical_url)
+        self.sampled_logger.info("Article collected: %s", article.title)
+        return article
+
+    def iter_articles(self, relevance_filter=None, skip_links=None, entries=None, language_router=None):
+        """
+        Recover articles from the RSS feed, downloading their content one at a time.
+        Entries are selected and their links resolved first (see select_candidates).
+        
+        Args:
+            relevance_filter (RelevanceFilter, optional): First-stage filter applied before downloading
+            skip_links (set, optional): Links or canonical URLs already analyzed, e.g. restored from a run journal
+            entries (list, optional): Feed entries to collect, e.g. the new entries of a scheduled poll.
+                The scraper's feed is parsed if None.
+            language_router (LanguageRouter, optional): Router dropping entries in unsupported languages
+        
+        Yields:
+            Article: Collected article with its content
+        """
+        for candidate in self.select_candidates(relevance_filter, skip_links, entries, language_router):
+            try:
+                article = self.fetch_article(candidate)
             except Exception as e:
-                self.logger.error(f"Error while processing article '{entry.title}': {e}")
+                self.logger.error(f"Error while processing article '{candidate['title']}': {e}")
+                continue
+            yield article
 
-        return articles
\ No newline at end of file
+        self.logger.info(f"Download outcomes: {dict(self.download_metrics)}")
+
+    def collect_articles(self, relevance_filter=None) -> list:
+        """
+        Recover articles from the RSS feed and download their content.
+        
+        Args:
+            relevance_filter (RelevanceFilter, optional): First-stage filter applied before downloading
+        
+        Returns:
+            list: List of Article records
+        """
+        return list(self.iter_articles(relevance_filter))
+
+    def close(self) -> None:
+        """
+        Release the HTTP session, the resolution cache and persist the circuit breaker states.
+        """
+        if self.resolver is not None:
+            self.resolver.close()
+        self.fetcher.close()
@@ -6,7 +6,7 @@ Author: Michele Grieco
 Description:
     This module provides a class for sentiment analysis using transformer models. It includes methods for initializing the model,
     analyzing sentiment, and converting sentiment scores to labels.
-    It also includes a fallback keyword-based sentiment analysis method in case the model fails to load.
+    It also includes a fallback lexicon-based sentiment analysis (LexiconSentimentEngine) in case the model fails to load.
     The module uses the Hugging Face transformers library.
 Usage:
     from sentiment_analysis import SentimentAnalyzer
@@ -14,11 +14,32 @@ Usage:
     analyzer = SentimentAnalyzer()
     score = analyzer.analyze_sentiment("Your text here")
     label = analyzer.get_sentiment_label(score)
+
+    # Targeted mode: score only the sentences mentioning the company
+    score = analyzer.analyze_targeted(["Enel ha chiuso l'anno con utili record."])
+
+    # Cascade: a cheap first stage, the full model only for uncertain texts
+    cascade = CascadeSentimentAnalyzer()
+    scores = cascade.analyze_sentiment_batch(texts)
+    cascade.log_report()
 """
 
 import logging
+import math
+import random
+from collections import Counter
+from typing import Optional
 from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
-from configuration.config import SENTIMENT_MODEL
+from configuration.config import (
+    SENTIMENT_MODEL, CASCADE_FIRST_STAGE, CASCADE_CONFIDENCE_THRESHOLD, CASCADE_LEXICON_EVIDENCE,
+    CASCADE_AUDIT_RATE
+)
+from configuration.logging_setup import SampledLogger
+from tools.article import sentiment_label
+from tools.lexicon import LexiconSentimentEngine
+
+# Sign of the score for each model label
+LABEL_SIGNS = {'POSITIVE': 1.0, 'NEGATIVE': -1.0}
 
 class SentimentAnalyzer:
     """
@@ -33,27 +54,31 @@ class SentimentAnalyzer:
             model_name (str): Name of the model to use
         """
         self.logger = logging.getLogger(__name__)
+        self.sampled_logger = SampledLogger(__name__)
         self.model_name = model_name
         self.sentiment_analyzer = self._initialize_model()
         
-        # Keywords for fallback
-        self.positive_words = ['ottimo', 'eccellente', 'positivo', 'buono', 'successo']
-        self.negative_words = ['pessimo', 'negativo', 'cattivo', 'fallimento', 'problema']
+        # Weighted lexicon for fallback
+        self.lexicon = LexiconSentimentEngine()
 
-    def _initialize_model(self) -> pipeline:
+    def _initialize_model(self, model_name: Optional[str] = None) -> pipeline:
         """
         Initialize the sentiment analysis model
         
+        Args:
+            model_name (str, optional): Model to load, the analyzer's model if None
+        
         Returns:
             pipeline: Transformers pipeline or None in case of error
         """
+        model_name = model_name or self.model_name
         try:
             analyzer = pipeline(
                 "sentiment-analysis",
-                model=self.model_name,
-                tokenizer=self.model_name
+                model=model_name,
+                tokenizer=model_name
             )
-            self.logger.info(f"Sentiment analysis model {self.model_name} loaded successfully")
+            self.logger.info(f"Sentiment analysis model {model_name} loaded successfully")
             return analyzer
         except Exception as e:
             self.logger.error(f"Error loading sentiment model: {str(e)}")
@@ -61,7 +86,7 @@ class SentimentAnalyzer:
 
     def _fallback_analysis(self, text: str) -> float:
         """
-        Keyword-based sentiment analysis (fallback)
+        Lexicon-based sentiment analysis (fallback)
         
         Args:
             text (str): Text to analyze
@@ -69,16 +94,8 @@ class SentimentAnalyzer:
         Returns:
             float: Sentiment score between -1 and 1
         """
-        self.logger.warning("Using keyword-based fallback sentiment analysis")
-        text = text.lower()
-        positive_count = sum(1 for word in self.positive_words if word in text)
-        negative_count = sum(1 for word in self.negative_words if word in text)
-
-        total = positive_count + negative_count
-        if total == 0:
-            return 0.0
-
-        return (positive_count - negative_count) / total
+        self.sampled_logger.warning("Using lexicon-based fallback sentiment analysis")
+        return self.lexicon.score(text)
 
     def analyze_sentiment(self, text: str) -> float:
         """
@@ -113,6 +130,62 @@ class SentimentAnalyzer:
             self.logger.error(f"Error in sentiment analysis: {str(e)}")
             return 0.0
 
+    def analyze_sentiment_batch(self, texts: list, batch_size: int = 32) -> list:
+        """
+        Analyze the sentiment of several texts with batched model calls
+
+        Args:
+            texts (list): Texts to analyze
+            batch_size (int): Number of texts per forward pass
+
+        Returns:
+            list: Sentiment scores between -1 and 1, in input order
+        """
+        if not texts:
+            return []
+        if not self.sentiment_analyzer:
+            self.sampled_logger.warning("Using lexicon-based fallback sentiment analysis")
+            return self.lexicon.score_batch(texts).tolist()
+
+        try:
+            # Limit texts to maximum length, as analyze_sentiment does
+            results = self.sentiment_analyzer([text[:512] for text in texts], batch_size=batch_size)
+            return [LABEL_SIGNS.get(result['label'], 0.0) * result['score'] for result in results]
+        except Exception as e:
+            self.logger.error(f"Error in batched sentiment analysis, analyzing texts one by one: {str(e)}")
+            # With the model itself, whatever first stage a subclass puts in front of it
+            return [SentimentAnalyzer.analyze_sentiment(self, text) for text in texts]
+
+    @staticmethod
+    def aggregate(scores: list, sentences: list) -> float:
+        """
+        Aggregate sentence scores into an article score, weighting sentences by length
+        
+        Args:
+            scores (list): Sentence scores between -1 and 1
+            sentences (list): Scored sentences
+            
+        Returns:
+            float: Article score between -1 and 1, 0.0 without sentences
+        """
+        weights = [len(sentence) for sentence in sentences]
+        total = sum(weights)
+        if total == 0:
+            return 0.0
+        return sum(score * weight for score, weight in zip(scores, weights)) / total
+
+    def analyze_targeted(self, sentences: list) -> float:
+        """
+        Analyze the sentiment of an article from the sentences mentioning the target company only
+        
+        Args:
+            sentences (list): Sentences selected by NamedEntityRecognizer.analyze_company_context
+            
+        Returns:
+            float: Sentiment score between -1 and 1
+        """
+        return self.aggregate(self.analyze_sentiment_batch(sentences), sentences)
+
     @staticmethod
     def get_sentiment_label(score: float) -> str:
         """
@@ -124,9 +197,147 @@ class SentimentAnalyzer:
         Returns:
             str: Sentiment label (Positive, Neutral, Negative)
         """
-        if score > 0.2:
-            return "Positive"
-        elif score < -0.2:
-            return "Negative"
-        else:
-            return "Neutral"
\ No newline at end of file
+        return sentiment_label(score)
+
+
+class CascadeSentimentAnalyzer(SentimentAnalyzer):
+    """
+    Class for tiered sentiment analysis: a cheap first stage scores every text and only the texts
+    it is not confident about are escalated to the full transformer model, loaded on first use
+    """
+
+    def __init__(self, model_name: str = SENTIMENT_MODEL,
+                 first_stage: str = CASCADE_FIRST_STAGE,
+                 threshold: float = CASCADE_CONFIDENCE_THRESHOLD,
+                 audit_rate: float = CASCADE_AUDIT_RATE,
+                 seed: Optional[int] = None) -> None:
+        """
+        Initialize the cascade
+        
+        Args:
+            model_name (str): Name of the full model
+            first_stage (str): "lexicon" for the lexicon engine, or the name of a small transformer model
+            threshold (float): First-stage confidence (0 to 1) below which a text is escalated
+            audit_rate (float): Fraction of confident texts also scored by the full model, to measure agreement
+            seed (int, optional): Seed of the audit sampler
+        """
+        self.logger = logging.getLogger(__name__)
+        self.sampled_logger = SampledLogger(__name__)
+        self.model_name = model_name
+        self.lexicon = LexiconSentimentEngine()
+        self.first_stage = first_stage
+        self.first_stage_model = None
+        if first_stage != 'lexicon':
+            self.first_stage_model = self._initialize_model(first_stage)
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self._full_model = None
+        self._full_model_loaded = False
+
+    @property
+    def sentiment_analyzer(self) -> pipeline:
+        """
+        Full model, loaded on the first escalation (None if it cannot be loaded)
+        """
+        if not self._full_model_loaded:
+            self._full_model_loaded = True
+            self._full_model = self._initialize_model()
+        return self._full_model
+
+    def _first_stage(self, texts: list, batch_size: int) -> tuple:
+        """
+        Score texts with the first stage
+        
+        Args:
+            texts (list): Texts to analyze
+            batch_size (int): Number of texts per forward pass of a first-stage model
+            
+        Returns:
+            tuple: (scores between -1 and 1, confidences between 0 and 1)
+        """
+        if self.first_stage_model is not None:
+            try:
+                results = self.first_stage_model([text[:512] for text in texts], batch_size=batch_size)
+                scores = [LABEL_SIGNS.get(result['label'], 0.0) * result['score'] for result in results]
+                return scores, [result['score'] for result in results]
+            except Exception as e:
+                self.logger.error(f"Error in first-stage sentiment analysis, using the lexicon: {str(e)}")
+
+        # Lexicon confidence: polarity agreement of the matched terms, discounted when they are few
+        scores, magnitudes = self.lexicon.analyze_batch(texts)
+        confidences = [abs(score) * (1 - math.exp(-magnitude / CASCADE_LEXICON_EVIDENCE))
+                       for score, magnitude in zip(scores.tolist(), magnitudes.tolist())]
+        return scores.tolist(), confidences
+
+    def analyze_sentiment(self, text: str) -> float:
+        """
+        Analyze the sentiment of the text through the cascade
+        
+        Args:
+            text (str): Text to analyze
+            
+        Returns:
+            float: Sentiment score between -1 and 1
+        """
+        return self.analyze_sentiment_batch([text])[0]
+
+    def analyze_sentiment_batch(self, texts: list, batch_size: int = 32) -> list:
+        """
+        Analyze the sentiment of several texts, escalating the uncertain ones to the full model
+        
+        Args:
+            texts (list): Texts to analyze
+            batch_size (int): Number of texts per forward pass
+            
+        Returns:
+            list: Sentiment scores between -1 and 1, in input order
+        """
+        if not texts:
+            return []
+        scores, confidences = self._first_stage(texts, batch_size)
+
+        escalated = [i for i, confidence in enumerate(confidences) if confidence < self.threshold]
+        audited = []
+        if self.audit_rate > 0:
+            audited = [i for i, confidence in enumerate(confidences)
+                       if confidence >= self.threshold and self.random.random() < self.audit_rate]
+        self.stats['first_stage'] += len(texts) - len(escalated)
+        self.stats['escalated'] += len(escalated)
+
+        if not (escalated or audited):
+            return scores
+        if self.sentiment_analyzer is None:
+            # Without the full model, escalated texts keep their first-stage score
+            self.stats['escalation_unavailable'] += len(escalated)
+            return scores
+
+        full_scores = super().analyze_sentiment_batch([texts[i] for i in escalated + audited], batch_size)
+        for i, score in zip(escalated, full_scores):
+            scores[i] = score
+        for i, score in zip(audited, full_scores[len(escalated):]):
+            self.stats['audited'] += 1
+            self.stats['audit_agree'] += self.get_sentiment_label(score) == self.get_sentiment_label(scores[i])
+        return scores
+
+    def report(self) -> dict:
+        """
+        Summarize per-tier counts, the escalation rate and the label agreement of the audited texts
+        
+        Returns:
+            dict: Tier counts and derived rates
+        """
+        report = dict(self.stats)
+        total = self.stats['first_stage'] + self.stats['escalated']
+        if total:
+            report['escalation_rate'] = self.stats['escalated'] / total
+        if self.stats['audited']:
+            report['audit_agreement'] = self.stats['audit_agree'] / self.stats['audited']
+        return report
+
+    def log_report(self) -> None:
+        """
+        Log the cascade statistics
+        """
+        self.logger.info(f"Sentiment cascade ({self.first_stage} -> {self.model_name}): {self.report()}")
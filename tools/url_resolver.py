@@ -0,0 +1,189 @@
+"""
+Module name: url_resolver.py
+Author: Michele Grieco
+Description:
+    This module provides a UrlResolver class that maps news aggregator links (e.g. news.google.com
+    redirects found in the RSS feed) to the publisher's URL. Redirects are followed by reading the
+    Location header of each hop, without downloading pages, and only while the URL stays on a
+    redirector host. Results are kept in a persistent SQLite cache with a time-to-live, misses are
+    resolved concurrently, and the canonical URL found in a downloaded page (<link rel="canonical">)
+    can be remembered so the next sighting of the link maps directly to it.
+Usage:
+    from tools.url_resolver import UrlResolver
+    resolver = UrlResolver(fetcher)
+    targets = resolver.resolve_many([entry.link for entry in entries])
+    resolver.remember(entry.link, canonical_url)
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import urljoin, urlsplit
+import requests # for HTTP exceptions
+from configuration.config import (
+    URL_CACHE_FILE, URL_CACHE_TTL_SECONDS, RESOLVER_WORKERS, RESOLVER_REDIRECT_HOSTS, RESOLVER_MAX_HOPS
+)
+
+
+class UrlResolver:
+    """
+    Class resolving aggregator redirect links to publisher URLs, with a persistent TTL cache.
+    """
+
+    def __init__(self, fetcher, cache_file: str = URL_CACHE_FILE,
+                 ttl: float = URL_CACHE_TTL_SECONDS,
+                 workers: int = RESOLVER_WORKERS,
+                 redirect_hosts: tuple = RESOLVER_REDIRECT_HOSTS,
+                 max_hops: int = RESOLVER_MAX_HOPS) -> None:
+        """
+        Initialize the resolver and open (or create) its cache.
+
+        Args:
+            fetcher (ResilientFetcher): HTTP layer used to follow redirects
+            cache_file (str): Path of the SQLite cache
+            ttl (float): Seconds a cached resolution stays valid
+            workers (int): Concurrent resolutions
+            redirect_hosts (tuple): Hosts whose links must be resolved
+            max_hops (int): Maximum number of redirects followed
+        """
+        # Logger configuration
+        self.logger = logging.getLogger(__name__)
+
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.workers = workers
+        self.redirect_hosts = frozenset(redirect_hosts)
+        self.max_hops = max_hops
+        self.stats = Counter()
+
+        directory = os.path.dirname(cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(cache_file)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, target TEXT NOT NULL, updated REAL)")
+        self.conn.execute("DELETE FROM urls WHERE updated < ?", (time.time() - self.ttl,))
+        self.conn.commit()
+
+    def needs_resolution(self, url: str) -> bool:
+        """
+        Check whether a URL points to a redirector host.
+
+        Args:
+            url (str): URL to check
+
+        Returns:
+            bool: True if the URL must be resolved
+        """
+        return (urlsplit(url).hostname or '') in self.redirect_hosts
+
+    def get(self, url: str) -> Optional[str]:
+        """
+        Cached target of a URL, if still valid.
+
+        Args:
+            url (str): Original URL
+
+        Returns:
+            str: Cached target, or None
+        """
+        row = self.conn.execute(
+            "SELECT target FROM urls WHERE url = ? AND updated >= ?", (url, time.time() - self.ttl)
+        ).fetchone()
+        return row[0] if row else None
+
+    def remember(self, url: str, target: str) -> None:
+        """
+        Store the target of a URL, e.g. the canonical URL found in the downloaded page.
+
+        Args:
+            url (str): Original URL
+            target (str): Publisher or canonical URL
+        """
+        self.remember_many({url: target})
+
+    def remember_many(self, targets: dict) -> None:
+        """
+        Store several resolutions in a single transaction.
+
+        Args:
+            targets (dict): Mapping of original URL to target
+        """
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO urls (url, target, updated) VALUES (?, ?, ?)",
+            [(url, target, now) for url, target in targets.items()]
+        )
+        self.conn.commit()
+
+    def _resolve(self, url: str) -> Optional[str]:
+        """
+        Follow the redirects of a URL through its Location headers.
+
+        Args:
+            url (str): URL on a redirector host
+
+        Returns:
+            str: First URL outside the redirector hosts, the last URL reached when the chain
+                ends on a redirector host, or None if the resolution failed
+        """
+        current = url
+        try:
+            for _ in range(self.max_hops):
+                response = self.fetcher.get(current, allow_redirects=False, stream=True)
+                location = response.headers.get('Location')
+                response.close()
+                if not response.is_redirect or not location:
+                    break
+                current = urljoin(current, location)
+                if not self.needs_resolution(current):
+                    break
+            return current
+        except requests.RequestException as e:
+            self.logger.warning(f"Could not resolve {url}: {e}")
+            return None
+
+    def resolve_many(self, urls: list) -> dict:
+        """
+        Resolve URLs, using the cache and resolving misses concurrently.
+
+        Args:
+            urls (list): Original URLs
+
+        Returns:
+            dict: Mapping of every URL to its target (itself if not resolved)
+        """
+        targets = {}
+        pending = []
+        for url in dict.fromkeys(urls):
+            if not self.needs_resolution(url):
+                targets[url] = url
+                continue
+            cached = self.get(url)
+            if cached is not None:
+                targets[url] = cached
+                self.stats['cache_hit'] += 1
+            else:
+                pending.append(url)
+
+        resolved = {}
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for url, target in zip(pending, executor.map(self._resolve, pending)):
+                    targets[url] = target or url
+                    if target is not None:
+                        resolved[url] = target
+            self.remember_many(resolved)
+        self.stats['resolved'] += len(resolved)
+        self.stats['failed'] += len(pending) - len(resolved)
+        self.logger.info(f"URL resolution: {dict(self.stats)}")
+        return targets
+
+    def close(self) -> None:
+        """
+        Close the cache.
+        """
+        self.conn.close()
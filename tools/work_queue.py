@@ -0,0 +1,541 @@
+"""
+Module name: work_queue.py
+Author: Michele Grieco
+Description:
+    This module provides a WorkQueue class, a durable task queue in a SQLite database used to split the
+    pipeline into a producer (feed polling and link dedup), any number of analysis workers and an aggregator.
+    Tasks are unique by key, so an article enqueued by several polls or feeds is analyzed once. A worker
+    leases a task for QUEUE_LEASE_SECONDS: a lease that expires (crashed or stuck worker) makes the task
+    visible again, and a worker can only complete or fail a task while it still holds its lease, so each
+    task stores exactly one result. Failed tasks are retried with exponential backoff and moved to the
+    dead letters after QUEUE_MAX_ATTEMPTS attempts. Results are handed to the aggregator in numbered
+    batches, leased like tasks: one batch is leased at a time, so a single aggregator is active, and a batch
+    interrupted before being marked aggregated is handed out again with the same unique timestamp, which
+    the aggregator uses to skip what it already wrote for it. Push notifications are staged in the same
+    database before they are acknowledged, keyed by their digest, so a redelivered notification is
+    recognized and a received one survives a restart until its entries are enqueued.
+    The database uses write-ahead logging (QUEUE_JOURNAL_MODE), which needs every process on the same host;
+    workers on several hosts sharing a volume need the rollback journal ("DELETE") and a filesystem with
+    working locks.
+Usage:
+    from tools.work_queue import WorkQueue
+    queue = WorkQueue()
+    queue.enqueue(url, {'title': title, 'link': link})
+    task = queue.lease()
+    queue.complete(task, result)  # or queue.fail(task, error)
+    batch = queue.claim_results()
+    queue.finish_batch(batch)
+    queue.stage_notification(digest, {'source': '/webhook', 'entries': [], 'urls': [...]})
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from configuration.config import (
+    QUEUE_FILE, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS, QUEUE_RETRY_BACKOFF, QUEUE_RETENTION_DAYS,
+    QUEUE_JOURNAL_MODE
+)
+
+
+class WorkQueue:
+    """
+    Class for a durable SQLite task queue with leases, retries and dead letters.
+    """
+
+    def __init__(self, queue_file: str = QUEUE_FILE,
+                 lease_seconds: float = QUEUE_LEASE_SECONDS,
+                 max_attempts: int = QUEUE_MAX_ATTEMPTS,
+                 retry_backoff: float = QUEUE_RETRY_BACKOFF) -> None:
+        """
+        Open (or create) the queue.
+
+        Args:
+            queue_file (str): Path of the SQLite database
+            lease_seconds (float): Time a leased task stays invisible to other workers
+            max_attempts (int): Attempts before a task is dead-lettered
+            retry_backoff (float): Base delay (seconds) before retrying a failed task
+        """
+        self.logger = logging.getLogger(__name__)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+        directory = os.path.dirname(queue_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(queue_file, timeout=30, isolation_level=None)
+        self.conn.execute(f"PRAGMA journal_mode={QUEUE_JOURNAL_MODE}")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        """
+        Create the task, result, batch and notification tables.
+        """
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_token TEXT,
+                lease_expires REAL,
+                last_error TEXT,
+                updated REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_ready ON tasks (state, available_at)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                task_id INTEGER PRIMARY KEY,
+                payload TEXT NOT NULL,
+                batch_id INTEGER,
+                aggregated INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_pending ON results (aggregated, batch_id)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS batches (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT NOT NULL,
+                lease_token TEXT,
+                lease_expires REAL,
+                finished INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                digest TEXT NOT NULL UNIQUE,
+                payload TEXT,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                last_error TEXT,
+                updated REAL NOT NULL
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_notifications_ready ON notifications (state, available_at)"
+        )
+
+    def _transaction(self):
+        """
+        Open a write transaction, taking the database write lock immediately.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def enqueue(self, key: str, payload: dict) -> bool:
+        """
+        Add a task, unless a task with the same key was already enqueued.
+
+        Args:
+            key (str): Deduplication key, e.g. the article URL
+            payload (dict): JSON-serializable task data
+
+        Returns:
+            bool: True if the task was added
+        """
+        return self.enqueue_many([(key, payload)]) == 1
+
+    def enqueue_many(self, tasks: list) -> int:
+        """
+        Add several tasks in a single transaction, skipping known keys.
+
+        Args:
+            tasks (list): (key, payload) tuples
+
+        Returns:
+            int: Number of tasks added
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            added = 0
+            for key, payload in tasks:
+                added += conn.execute(
+                    "INSERT OR IGNORE INTO tasks (key, payload, available_at, updated) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(payload, ensure_ascii=False), now, now)
+                ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def lease(self, worker_id: str = "") -> Optional[dict]:
+        """
+        Lease the oldest available task: a pending task whose retry delay has passed, or a leased
+        task whose lease expired. Expired tasks that used all their attempts are dead-lettered.
+
+        Args:
+            worker_id (str): Identifier of the worker, for the logs
+
+        Returns:
+            dict: Task with 'id', 'key', 'payload', 'attempts' and 'token', or None if no task is available
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            # A task whose lease keeps expiring crashes its workers: stop retrying it
+            dead = conn.execute(
+                "UPDATE tasks SET state = 'dead', last_error = 'lease expired', lease_token = NULL, updated = ? "
+                "WHERE state = 'leased' AND lease_expires <= ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            ).rowcount
+            row = conn.execute(
+                "SELECT id, key, payload, attempts FROM tasks "
+                "WHERE (state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_expires <= ?) "
+                "ORDER BY id LIMIT 1",
+                (now, now)
+            ).fetchone()
+            task = None
+            if row is not None:
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE tasks SET state = 'leased', attempts = attempts + 1, lease_token = ?, "
+                    "lease_expires = ?, updated = ? WHERE id = ?",
+                    (token, now + self.lease_seconds, now, row[0])
+                )
+                task = {'id': row[0], 'key': row[1], 'payload': json.loads(row[2]),
+                        'attempts': row[3] + 1, 'token': token}
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if dead:
+            self.logger.warning(f"{dead} tasks dead-lettered after their lease expired {self.max_attempts} times")
+        if task is not None:
+            self.logger.debug(f"Task {task['id']} leased by {worker_id or 'worker'} (attempt {task['attempts']})")
+        return task
+
+    def extend(self, task: dict) -> bool:
+        """
+        Extend the lease of a task still being processed.
+
+        Args:
+            task (dict): Leased task
+
+        Returns:
+            bool: False if the lease was lost to another worker
+        """
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE tasks SET lease_expires = ?, updated = ? WHERE id = ? AND lease_token = ? AND state = 'leased'",
+            (now + self.lease_seconds, now, task['id'], task['token'])
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, task: dict, result: dict) -> bool:
+        """
+        Store the result of a task and mark it done, in one transaction.
+
+        Args:
+            task (dict): Leased task
+            result (dict): JSON-serializable result
+
+        Returns:
+            bool: False if the lease was lost, in which case the result is discarded
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            done = conn.execute(
+                "UPDATE tasks SET state = 'done', lease_token = NULL, last_error = NULL, updated = ? "
+                "WHERE id = ? AND lease_token = ? AND state = 'leased'",
+                (now, task['id'], task['token'])
+            ).rowcount == 1
+            if done:
+                conn.execute(
+                    "INSERT INTO results (task_id, payload, created) VALUES (?, ?, ?)",
+                    (task['id'], json.dumps(result, ensure_ascii=False), now)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if not done:
+            self.logger.warning(f"Lease of task {task['id']} was lost, discarding its result")
+        return done
+
+    def fail(self, task: dict, error: str) -> bool:
+        """
+        Record a failed attempt: the task is retried after a backoff, or dead-lettered.
+
+        Args:
+            task (dict): Leased task
+            error (str): Error description
+
+        Returns:
+            bool: True if the task was dead-lettered
+        """
+        now = time.time()
+        dead = task['attempts'] >= self.max_attempts
+        delay = self.retry_backoff * (2 ** (task['attempts'] - 1))
+        self.conn.execute(
+            "UPDATE tasks SET state = ?, available_at = ?, lease_token = NULL, last_error = ?, updated = ? "
+            "WHERE id = ? AND lease_token = ? AND state = 'leased'",
+            ('dead' if dead else 'pending', now + delay, error, now, task['id'], task['token'])
+        )
+        if dead:
+            self.logger.error(f"Task {task['id']} dead-lettered after {task['attempts']} attempts: {error}")
+        else:
+            self.logger.warning(f"Task {task['id']} failed (attempt {task['attempts']}), retrying in {delay:.0f}s: {error}")
+        return dead
+
+    def claim_results(self, limit: int = 1000, worker_id: str = "") -> Optional[dict]:
+        """
+        Lease a batch of results to aggregate. An unfinished batch is handed out again before a new one,
+        with the same timestamp, so the aggregator can recognize what it already wrote for it. Only one
+        batch is leased at a time: while another aggregator holds an unexpired lease nothing is handed out.
+
+        Args:
+            limit (int): Maximum results in a new batch
+            worker_id (str): Identifier of the aggregator, for logging
+
+        Returns:
+            dict: Batch with 'id', 'token', 'timestamp' (unique, "YYYY-MM-DD HH:MM:SS") and 'results'
+                (result dictionaries in completion order), None if nothing is pending or another
+                aggregator holds a batch
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            holder = conn.execute(
+                "SELECT id FROM batches WHERE finished = 0 AND lease_expires > ?", (now,)
+            ).fetchone()
+            if holder is not None:
+                conn.execute("COMMIT")
+                self.logger.info(f"Batch {holder[0]} is being aggregated by another aggregator")
+                return None
+
+            batch_id = conn.execute(
+                "SELECT MIN(batch_id) FROM results WHERE aggregated = 0 AND batch_id IS NOT NULL"
+            ).fetchone()[0]
+            if batch_id is None:
+                batch_id = max(
+                    conn.execute("SELECT MAX(batch_id) FROM results").fetchone()[0] or 0,
+                    conn.execute("SELECT MAX(id) FROM batches").fetchone()[0] or 0
+                ) + 1
+                claimed = conn.execute(
+                    "UPDATE results SET batch_id = ? WHERE task_id IN ("
+                    "SELECT task_id FROM results WHERE aggregated = 0 AND batch_id IS NULL ORDER BY created, task_id LIMIT ?)",
+                    (batch_id, limit)
+                ).rowcount
+                if not claimed:
+                    conn.execute("COMMIT")
+                    return None
+
+            row = conn.execute("SELECT timestamp FROM batches WHERE id = ?", (batch_id,)).fetchone()
+            if row is None:
+                # Timestamps identify the batches in the score file, so two batches never share one
+                last = conn.execute("SELECT MAX(timestamp) FROM batches").fetchone()[0]
+                moment = datetime.now().replace(microsecond=0)
+                if last is not None:
+                    moment = max(moment, datetime.strptime(last, "%Y-%m-%d %H:%M:%S") + timedelta(seconds=1))
+                timestamp = moment.strftime("%Y-%m-%d %H:%M:%S")
+                conn.execute("INSERT INTO batches (id, timestamp) VALUES (?, ?)", (batch_id, timestamp))
+            else:
+                timestamp = row[0]
+                self.logger.warning(f"Batch {batch_id} was not finished, handed out again")
+
+            token = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE batches SET lease_token = ?, lease_expires = ? WHERE id = ?",
+                (token, now + self.lease_seconds, batch_id)
+            )
+            rows = conn.execute(
+                "SELECT payload FROM results WHERE batch_id = ? ORDER BY created, task_id", (batch_id,)
+            ).fetchall()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.logger.info(f"Batch {batch_id} leased by {worker_id or 'aggregator'} ({len(rows)} results)")
+        return {
+            'id': batch_id,
+            'token': token,
+            'timestamp': timestamp,
+            'results': [json.loads(payload) for payload, in rows]
+        }
+
+    def finish_batch(self, batch: dict) -> bool:
+        """
+        Mark a leased batch of results as aggregated, if its lease is still held.
+
+        Args:
+            batch (dict): Batch returned by claim_results
+
+        Returns:
+            bool: True if the batch was marked, False if the lease was lost
+        """
+        conn = self._transaction()
+        try:
+            finished = conn.execute(
+                "UPDATE batches SET finished = 1, lease_token = NULL, lease_expires = NULL "
+                "WHERE id = ? AND lease_token = ? AND finished = 0",
+                (batch['id'], batch['token'])
+            ).rowcount
+            if finished:
+                conn.execute("UPDATE results SET aggregated = 1 WHERE batch_id = ?", (batch['id'],))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if not finished:
+            self.logger.warning(f"Lease of batch {batch['id']} was lost before it was finished")
+        return bool(finished)
+
+    def stage_notification(self, digest: str, payload: dict) -> bool:
+        """
+        Store a received push notification until its entries are enqueued.
+
+        Args:
+            digest (str): Digest of the notification body
+            payload (dict): JSON-serializable notification data
+
+        Returns:
+            bool: False if a notification with the same digest was already received
+        """
+        now = time.time()
+        return self.conn.execute(
+            "INSERT OR IGNORE INTO notifications (digest, payload, available_at, updated) VALUES (?, ?, ?, ?)",
+            (digest, json.dumps(payload, ensure_ascii=False), now, now)
+        ).rowcount == 1
+
+    def staged_notifications(self, limit: int = 100) -> list:
+        """
+        Staged notifications whose entries are waiting to be enqueued, oldest first.
+
+        Args:
+            limit (int): Maximum notifications returned
+
+        Returns:
+            list: Dictionaries with 'id', 'payload' and 'attempts'
+        """
+        rows = self.conn.execute(
+            "SELECT id, payload, attempts FROM notifications WHERE state = 'pending' AND available_at <= ? "
+            "ORDER BY id LIMIT ?",
+            (time.time(), limit)
+        ).fetchall()
+        return [{'id': id_, 'payload': json.loads(payload), 'attempts': attempts} for id_, payload, attempts in rows]
+
+    def finish_notification(self, notification: dict) -> None:
+        """
+        Mark a staged notification as enqueued. Its digest is kept until pruned, to recognize redeliveries.
+
+        Args:
+            notification (dict): Notification returned by staged_notifications
+        """
+        self.conn.execute(
+            "UPDATE notifications SET state = 'done', payload = NULL, last_error = NULL, updated = ? WHERE id = ?",
+            (time.time(), notification['id'])
+        )
+
+    def fail_notification(self, notification: dict, error: str) -> bool:
+        """
+        Record a failed attempt to enqueue a staged notification: it is retried after a backoff, or dropped
+        after max_attempts attempts together with its digest, so a redelivery by the hub is accepted again.
+
+        Args:
+            notification (dict): Notification returned by staged_notifications
+            error (str): Error description
+
+        Returns:
+            bool: True if the notification was dropped
+        """
+        now = time.time()
+        attempts = notification['attempts'] + 1
+        if attempts >= self.max_attempts:
+            self.conn.execute("DELETE FROM notifications WHERE id = ?", (notification['id'],))
+            self.logger.error(f"Notification {notification['id']} dropped after {attempts} attempts: {error}")
+            return True
+        delay = self.retry_backoff * (2 ** (attempts - 1))
+        self.conn.execute(
+            "UPDATE notifications SET attempts = ?, available_at = ?, last_error = ?, updated = ? WHERE id = ?",
+            (attempts, now + delay, error, now, notification['id'])
+        )
+        self.logger.warning(f"Notification {notification['id']} failed (attempt {attempts}), "
+                            f"retrying in {delay:.0f}s: {error}")
+        return False
+
+    def dead_letters(self) -> list:
+        """
+        Tasks that exhausted their attempts.
+
+        Returns:
+            list: Dictionaries with 'id', 'key', 'attempts' and 'error'
+        """
+        rows = self.conn.execute(
+            "SELECT id, key, attempts, last_error FROM tasks WHERE state = 'dead' ORDER BY id"
+        ).fetchall()
+        return [{'id': id_, 'key': key, 'attempts': attempts, 'error': error} for id_, key, attempts, error in rows]
+
+    def requeue_dead(self) -> int:
+        """
+        Give the dead-lettered tasks a new set of attempts.
+
+        Returns:
+            int: Number of requeued tasks
+        """
+        now = time.time()
+        return self.conn.execute(
+            "UPDATE tasks SET state = 'pending', attempts = 0, available_at = ?, updated = ? WHERE state = 'dead'",
+            (now, now)
+        ).rowcount
+
+    def prune(self, retention_days: float = QUEUE_RETENTION_DAYS) -> int:
+        """
+        Delete done tasks, aggregated results and enqueued notifications older than the retention period.
+        Keys of pruned tasks can be enqueued again.
+
+        Returns:
+            int: Number of pruned tasks
+        """
+        cutoff = time.time() - retention_days * 86400
+        conn = self._transaction()
+        try:
+            conn.execute("DELETE FROM results WHERE aggregated = 1 AND created < ?", (cutoff,))
+            conn.execute("DELETE FROM notifications WHERE state = 'done' AND updated < ?", (cutoff,))
+            pruned = conn.execute(
+                "DELETE FROM tasks WHERE state = 'done' AND updated < ? "
+                "AND id NOT IN (SELECT task_id FROM results)", (cutoff,)
+            ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if pruned:
+            self.logger.info(f"Pruned {pruned} completed tasks from the work queue")
+        return pruned
+
+    def stats(self) -> dict:
+        """
+        Number of tasks per state, results waiting for aggregation and notifications waiting to be enqueued.
+        """
+        stats = {'pending': 0, 'leased': 0, 'done': 0, 'dead': 0}
+        stats.update(dict(self.conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall()))
+        stats['results_pending'] = self.conn.execute(
+            "SELECT COUNT(*) FROM results WHERE aggregated = 0"
+        ).fetchone()[0]
+        stats['notifications_pending'] = self.conn.execute(
+            "SELECT COUNT(*) FROM notifications WHERE state = 'pending'"
+        ).fetchone()[0]
+        return stats
+
+    def close(self) -> None:
+        """
+        Close the queue.
+        """
+        self.conn.close()
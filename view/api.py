@@ -0,0 +1,444 @@
+"""
+Module name: api.py
+Author: Michele Grieco
+Description:
+    This module provides a read-only JSON API over the results written by the analysis, for downstream
+    consumers that would otherwise parse reputation_scores.csv and the detailed_results_*.csv files on
+    every poll. A ResultsStore loads the files once and reloads only what changed (by modification time
+    and size, checked at most once per API_REVALIDATE_SECONDS; detailed results files are loaded one by
+    one as they appear), and keeps the last good data if a file is read while being written. Responses
+    are cached in process until the data changes and carry an ETag, so polling clients sending
+    If-None-Match get a 304 without a body. Articles are paginated with an opaque cursor, stable while
+    new results are added.
+    Endpoints:
+      GET /api/score/current                                     latest score and running scores
+      GET /api/score/history?start=&end=&resolution=raw|hour|day|week
+      GET /api/articles?limit=&cursor=&label=&start=&end=
+Usage:
+    from view.api import run_api
+    run_api()  # or: python main.py --api
+"""
+
+import base64
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+import pandas as pd # for reading results and resampling history
+from configuration.config import (
+    DATA_DIRECTORY, RESULTS_FILE, SCORE_STATE_FILE, API_HOST, API_PORT, API_PAGE_SIZE,
+    API_MAX_PAGE_SIZE, API_REVALIDATE_SECONDS
+)
+from tools.article import sentiment_label
+from tools.incremental_score import IncrementalScoreEngine
+
+# History resolutions and their pandas resampling rules
+RESOLUTIONS = {'hour': 'h', 'day': 'D', 'week': 'W'}
+
+
+class BadRequest(ValueError):
+    """
+    Invalid query parameter, answered with a 400.
+    """
+
+
+def _signature(path: str) -> Optional[tuple]:
+    """
+    Modification time and size of a file, None if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _records(df: pd.DataFrame) -> list:
+    """
+    Convert a DataFrame to JSON-ready records, with None for missing values.
+    """
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def _parse_time(value: Optional[str], name: str) -> Optional[str]:
+    """
+    Parse a time range bound into the "YYYY-MM-DD HH:MM:SS" format of the result files.
+    """
+    if not value:
+        return None
+    try:
+        return pd.Timestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        raise BadRequest(f"Invalid {name}: {value!r}")
+
+
+def encode_cursor(key: tuple) -> str:
+    """
+    Encode the sort key of the last article of a page as an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decode a cursor produced by encode_cursor.
+    """
+    try:
+        timestamp, filename, row = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(timestamp), str(filename), int(row)
+    except (ValueError, TypeError):
+        raise BadRequest("Invalid cursor")
+
+
+class ResultsStore:
+    """
+    Class caching the result files in memory and reloading them only when they change.
+    """
+
+    def __init__(self, directory: str = DATA_DIRECTORY,
+                 results_file: str = RESULTS_FILE,
+                 state_file: str = SCORE_STATE_FILE,
+                 revalidate_seconds: float = API_REVALIDATE_SECONDS) -> None:
+        """
+        Initialize the store.
+
+        Args:
+            directory (str): Directory of the detailed_results_*.csv files
+            results_file (str): CSV file of the score history
+            state_file (str): State file of the incremental score engine
+            revalidate_seconds (float): Minimum delay between two checks of the files
+        """
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.results_file = results_file
+        self.state_file = state_file
+        self.revalidate_seconds = revalidate_seconds
+
+        self.lock = threading.Lock()
+        self.checked = 0.0
+        self.version = None
+        self.scores = pd.DataFrame({'timestamp': pd.to_datetime([]), 'score': []})
+        self.scores_signature = None
+        self.engine = None
+        self.state_signature = None
+        self.detail_files = {}  # filename -> (signature, DataFrame)
+        self.articles = pd.DataFrame()
+        self.article_keys = []  # (timestamp, file, row) of each article, ascending
+        self.views = {}  # (label, start, end) -> (articles, keys) for filtered listings
+
+    def refresh(self) -> str:
+        """
+        Reload the files that changed since the last check.
+
+        Returns:
+            str: Version of the data, changing whenever a file changes
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.version is not None and now - self.checked < self.revalidate_seconds:
+                return self.version
+            self.checked = now
+
+            signature = _signature(self.results_file)
+            if signature != self.scores_signature:
+                self._load_scores(signature)
+            signature = _signature(self.state_file)
+            if signature != self.state_signature:
+                self.engine = IncrementalScoreEngine(state_file=self.state_file)
+                self.state_signature = signature
+
+            signatures = {}
+            for path in glob.glob(os.path.join(self.directory, "detailed_results_*.csv")):
+                signatures[os.path.basename(path)] = _signature(path)
+            if {name: entry[0] for name, entry in self.detail_files.items()} != signatures:
+                self._load_articles(signatures)
+
+            state = [self.scores_signature, self.state_signature, sorted(signatures.items())]
+            self.version = hashlib.sha1(repr(state).encode('utf-8')).hexdigest()[:16]
+            return self.version
+
+    def _load_scores(self, signature: Optional[tuple]) -> None:
+        """
+        Load the score history, keeping the previous one if the file cannot be parsed.
+        """
+        if signature is None:
+            self.scores = pd.DataFrame({'timestamp': pd.to_datetime([]), 'score': []})
+            self.scores_signature = None
+            return
+        try:
+            df = pd.read_csv(self.results_file)
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            self.scores = df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+            self.scores_signature = signature
+        except Exception as e:
+            self.logger.warning(f"Error reading {self.results_file}, serving the previous scores: {e}")
+
+    def _load_articles(self, signatures: dict) -> None:
+        """
+        Load new or changed detailed results files and drop the removed ones.
+        """
+        for name in list(self.detail_files):
+            if name not in signatures:
+                del self.detail_files[name]
+        for name, signature in signatures.items():
+            if name in self.detail_files and self.detail_files[name][0] == signature:
+                continue
+            try:
+                df = pd.read_csv(os.path.join(self.directory, name))
+            except Exception as e:
+                self.logger.warning(f"Error reading {name}, skipping it until it changes: {e}")
+                df = self.detail_files.get(name, (None, pd.DataFrame()))[1]
+            df['file'] = name
+            df['row'] = range(len(df))
+            self.detail_files[name] = (signature, df)
+
+        frames = [df for _, df in self.detail_files.values() if not df.empty]
+        if frames:
+            articles = pd.concat(frames, ignore_index=True)
+            articles['timestamp'] = articles['timestamp'].astype(str)
+            articles = articles.sort_values(['timestamp', 'file', 'row'], kind='stable').reset_index(drop=True)
+        else:
+            articles = pd.DataFrame(columns=['timestamp', 'file', 'row'])
+        self.articles = articles
+        self.article_keys = list(zip(articles['timestamp'], articles['file'], articles['row'].astype(int)))
+        self.views = {}
+        self.logger.info(f"Loaded {len(articles)} article results from {len(frames)} files")
+
+    def current(self) -> dict:
+        """
+        Latest reputation score and running scores.
+        """
+        with self.lock:
+            result = {'timestamp': None, 'score': None, 'label': None, 'runs': len(self.scores)}
+            if not self.scores.empty:
+                last = self.scores.iloc[-1]
+                result['timestamp'] = last['timestamp'].strftime("%Y-%m-%d %H:%M:%S")
+                result['score'] = float(last['score'])
+                result['label'] = sentiment_label(result['score'])
+            result['running'] = self.engine.snapshot() if self.engine else None
+            return result
+
+    def history(self, start: Optional[str], end: Optional[str], resolution: str) -> dict:
+        """
+        Score history in a time range, raw or averaged per hour, day or week.
+        """
+        if resolution != 'raw' and resolution not in RESOLUTIONS:
+            raise BadRequest(f"Invalid resolution: {resolution!r}")
+        with self.lock:
+            df = self.scores
+        if start:
+            df = df[df['timestamp'] >= pd.Timestamp(start)]
+        if end:
+            df = df[df['timestamp'] <= pd.Timestamp(end)]
+
+        if resolution == 'raw' or df.empty:
+            points = pd.DataFrame({'timestamp': df['timestamp'], 'score': df['score'], 'runs': 1})
+        else:
+            grouped = df.set_index('timestamp')['score'].resample(RESOLUTIONS[resolution])
+            points = pd.DataFrame({'score': grouped.mean(), 'runs': grouped.count()}).reset_index()
+            points = points[points['runs'] > 0]
+        points['timestamp'] = points['timestamp'].dt.strftime("%Y-%m-%d %H:%M:%S")
+        return {'resolution': resolution, 'points': _records(points)}
+
+    def _view(self, label: Optional[str], start: Optional[str], end: Optional[str]) -> tuple:
+        """
+        Articles and sort keys matching the filters, cached until the data changes.
+        """
+        if not (label or start or end):
+            return self.articles, self.article_keys
+        view = self.views.get((label, start, end))
+        if view is None:
+            mask = pd.Series(True, index=self.articles.index)
+            if label:
+                mask &= self.articles.get('sentiment_label', pd.Series(dtype=object)).str.lower() == label.lower()
+            if start:
+                mask &= self.articles['timestamp'] >= start
+            if end:
+                mask &= self.articles['timestamp'] <= end
+            articles = self.articles[mask].reset_index(drop=True)
+            keys = [key for key, keep in zip(self.article_keys, mask) if keep]
+            view = self.views[(label, start, end)] = (articles, keys)
+        return view
+
+    def article_page(self, limit: int, cursor: Optional[str], label: Optional[str],
+                     start: Optional[str], end: Optional[str]) -> dict:
+        """
+        A page of article results, newest first.
+        """
+        with self.lock:
+            articles, keys = self._view(label, start, end)
+        stop = bisect_left(keys, decode_cursor(cursor)) if cursor else len(keys)
+        first = max(stop - limit, 0)
+        page = articles.iloc[first:stop].iloc[::-1]
+        next_cursor = encode_cursor(keys[first]) if first > 0 else None
+        return {
+            'items': _records(page.drop(columns=['file', 'row'])),
+            'next_cursor': next_cursor,
+            'total': len(keys)
+        }
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of the JSON API, serving cached responses with ETags.
+    """
+
+    server_version = "RepScanAPI/1.0"
+
+    def do_GET(self) -> None:
+        """
+        Route a GET request, answering 304 when the client already has the response.
+        """
+        api = self.server.api
+        url = urlsplit(self.path)
+        try:
+            status, body, etag = api.respond(url.path, url.query)
+        except Exception as e:
+            api.logger.error(f"Error serving {self.path}: {e}")
+            status, body, etag = 500, json.dumps({'error': 'Internal server error'}).encode('utf-8'), None
+
+        if etag and etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        """
+        Log requests at debug level instead of writing them to stderr.
+        """
+        self.server.api.logger.debug(format % args)
+
+
+class ReputationAPI:
+    """
+    Class running the JSON API server.
+    """
+
+    def __init__(self, host: str = API_HOST, port: int = API_PORT, store: Optional[ResultsStore] = None) -> None:
+        """
+        Initialize the API.
+
+        Args:
+            host (str): Address to listen on
+            port (int): Port to listen on
+            store (ResultsStore, optional): Source of the results, a new store on the data directory if None
+        """
+        self.logger = logging.getLogger(__name__)
+        self.host = host
+        self.port = port
+        self.store = store or ResultsStore()
+        self.cache = {}  # (path, query) -> (version, status, body, etag)
+        self.cache_lock = threading.Lock()
+        self.server = None
+
+    def respond(self, path: str, query: str) -> tuple:
+        """
+        Build the response to a request, reusing the cached one while the data is unchanged.
+
+        Args:
+            path (str): Request path
+            query (str): Raw query string
+
+        Returns:
+            tuple: (status, JSON body, ETag or None)
+        """
+        version = self.store.refresh()
+        if path == '/api/score/current':
+            # Running windows expire by the hour, even without new data
+            version = f"{version}-{int(time.time() // 3600)}"
+
+        cache_key = (path, query)
+        cached = self.cache.get(cache_key)
+        if cached and cached[0] == version:
+            return cached[1:]
+
+        try:
+            status, payload = 200, self._route(path, parse_qs(query))
+        except BadRequest as e:
+            status, payload = 400, {'error': str(e)}
+        if payload is None:
+            status, payload = 404, {'error': f"Unknown endpoint: {path}"}
+
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        etag = f'"{hashlib.sha1(body).hexdigest()}"' if status == 200 else None
+        with self.cache_lock:
+            if any(entry[0] != version for entry in self.cache.values()):
+                # Drop the responses of previous data versions
+                self.cache = {key: entry for key, entry in self.cache.items() if entry[0] == version}
+            self.cache[cache_key] = (version, status, body, etag)
+        return status, body, etag
+
+    def _route(self, path: str, params: dict) -> Optional[dict]:
+        """
+        Compute the payload of an endpoint, None for unknown paths.
+        """
+        def param(name: str) -> Optional[str]:
+            values = params.get(name)
+            return values[-1] if values else None
+
+        if path == '/api/score/current':
+            return self.store.current()
+        if path == '/api/score/history':
+            return self.store.history(_parse_time(param('start'), 'start'), _parse_time(param('end'), 'end'),
+                                      param('resolution') or 'raw')
+        if path == '/api/articles':
+            try:
+                limit = int(param('limit') or API_PAGE_SIZE)
+            except ValueError:
+                raise BadRequest(f"Invalid limit: {param('limit')!r}")
+            if not 1 <= limit <= API_MAX_PAGE_SIZE:
+                raise BadRequest(f"limit must be between 1 and {API_MAX_PAGE_SIZE}")
+            return self.store.article_page(limit, param('cursor'), param('label'),
+                                           _parse_time(param('start'), 'start'), _parse_time(param('end'), 'end'))
+        return None
+
+    def serve_forever(self) -> None:
+        """
+        Serve requests until interrupted.
+        """
+        self.server = ThreadingHTTPServer((self.host, self.port), APIRequestHandler)
+        self.server.daemon_threads = True
+        self.server.api = self
+        self.logger.info(f"RepScan API listening on http://{self.host}:{self.server.server_address[1]}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+    def close(self) -> None:
+        """
+        Stop the server.
+        """
+        if self.server:
+            self.server.shutdown()
+
+
+def run_api() -> None:
+    """
+    Create and run the JSON API
+    Args:
+        None
+    Returns:
+        None
+    """
+    api = ReputationAPI()
+    try:
+        api.serve_forever()
+    except KeyboardInterrupt:
+        pass
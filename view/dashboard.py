@@ -19,7 +19,7 @@ from datetime import datetime, timedelta
 import numpy as np # for numerical operations
 from configuration.config import DASHBOARD_TITLE, TARGET_COMPANY
 from tools.score_calculator import ReputationScoreCalculator
-from tools.sentiment_analysis import SentimentAnalyzer
+from tools.article import sentiment_label
 from typing import Optional
 
 class ReputationDashboard:
@@ -81,7 +81,7 @@ class ReputationDashboard:
         self.df['timestamp'] = pd.to_datetime(self.df['datetime'])
         
         # Add sentiment labels
-        self.df['sentiment_label'] = self.df['score'].apply(SentimentAnalyzer.get_sentiment_label)
+        self.df['sentiment_label'] = self.df['score'].apply(sentiment_label)
         
         return True
         